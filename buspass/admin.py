@@ -1,8 +1,106 @@
-import json
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.contrib.auth.hashers import make_password
 from django import forms
-from .models import Student, Route, RoutePrice, BusPass, MultiSemesterBusPassApplication
+from django.utils import timezone
+from django.core.exceptions import FieldDoesNotExist
+from django.core.paginator import Paginator
+from django.urls import reverse
+from django.utils.html import format_html_join
+from django.utils.safestring import mark_safe
+from .models import Tenant, Student, Route, RoutePrice, RouteStop, BusPass, MultiSemesterBusPassApplication, RouteSeatCounter, WaitlistEntry, PassAuditLog, StudentPassSummary, BackgroundJob, Notification, ArchivedBusPass, ArchivedMultiSemesterApplication, ScanEvent
+from .approvals import (
+    approve_passes, reject_passes, approve_applications, reject_applications, log_status_change,
+)
+from .capacity import is_route_full
+from .utils import parse_semesters
+from .paginators import LargeTablePaginator
+from .search import student_search_filter
+from .jobs import submit_job, retry_failed_items
+from .duplicates import get_duplicate_receipts
+from .archive import student_pass_history
+from .notifications import enqueue_notifications
+
+# Selections larger than this are handed to the background job runner
+# instead of being processed inside the admin request
+BACKGROUND_ACTION_THRESHOLD = 200
+
+
+class PerformantAdminMixin:
+    """Changelist defaults for tables that grow every semester
+
+    Foreign keys shown in list_display are joined in the changelist query,
+    counts come from LargeTablePaginator and the extra unfiltered COUNT(*)
+    Django runs for the "N total" link is skipped.
+    """
+    paginator = LargeTablePaginator
+    show_full_result_count = False
+
+    def get_list_select_related(self, request):
+        if self.list_select_related:
+            return self.list_select_related
+        related = []
+        for name in self.list_display:
+            try:
+                field = self.model._meta.get_field(name)
+            except FieldDoesNotExist:
+                continue
+            if field.many_to_one or field.one_to_one:
+                related.append(name)
+        return related
+
+    def get_paginator(self, request, queryset, per_page, orphans=0, allow_empty_first_page=True):
+        if self.list_editable:
+            # Editable changelists need a real queryset for their formset
+            return Paginator(queryset, per_page, orphans, allow_empty_first_page)
+        return super().get_paginator(request, queryset, per_page, orphans, allow_empty_first_page)
+
+
+def record_form_status_change(obj, form, user):
+    # Fill the audit columns when staff change the status from the change form
+    if 'status' not in form.changed_data:
+        return
+    if obj.status == 'approved':
+        obj.approved_by = user
+        obj.approved_at = timezone.now()
+    elif obj.status == 'rejected':
+        obj.rejected_by = user
+        obj.rejected_at = timezone.now()
+
+
+def format_duplicate_receipts(obj):
+    # Links to the other passes and applications whose receipt matches this one
+    if not obj.pk:
+        return "-"
+    matches = get_duplicate_receipts(obj)
+    if not matches:
+        return "-"
+    return format_html_join(
+        mark_safe('<br>'), '<a href="{}">{} ({}, {})</a>',
+        (
+            (reverse(f'admin:buspass_{"buspass" if match.pass_type == "bus_pass" else "multisemesterbuspassapplication"}_change', args=[match.object_id]),
+             match.student.fullname, match.get_pass_type_display(), match.get_hash_kind_display())
+            for match in matches
+        ),
+    )
+
+
+def submit_large_selection(model_admin, request, queryset, kind):
+    """Queue kind as a background job when the pending selection is large; returns the job or None"""
+    object_ids = list(queryset.filter(status='pending').values_list('pk', flat=True))
+    if len(object_ids) <= BACKGROUND_ACTION_THRESHOLD:
+        return None
+    job = submit_job(kind, object_ids, request.user)
+    model_admin.message_user(request, f"{len(object_ids)} items were queued as background job {job.pk}; track it under Background jobs.")
+    return job
+
+
+class StudentSearchMixin:
+    """Search a changelist by its student's ID, name, mobile, email or Aadhar through the student search index"""
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        return queryset.filter(student__in=Student.objects.filter(student_search_filter(search_term)).values('pk')), False
 
 
 class StudentAdminForm(forms.ModelForm):
@@ -17,21 +115,72 @@ class StudentAdminForm(forms.ModelForm):
         # Hash the password before saving
         if self.cleaned_data.get('password'):
             student.password = make_password(self.cleaned_data['password'])
+        if student.route and not student.route1:
+            student.route1 = student.route.name
         if commit:
             student.save()
         return student
 
 
+class BusPassAdminForm(forms.ModelForm):
+
+    class Meta:
+        model = BusPass
+        fields = '__all__'
+
+    def clean(self):
+        cleaned_data = super().clean()
+        route, semester = cleaned_data.get('route'), cleaned_data.get('semester')
+        previous_status = None if self.instance._state.adding else self.instance.status
+        # Reported on the form; the seat itself is taken under lock when the pass is saved
+        if cleaned_data.get('status') == 'approved' and previous_status != 'approved' and route and semester:
+            if is_route_full(route, semester):
+                raise forms.ValidationError(f"{route.name} is full for {semester}; the pass cannot be approved.")
+        return cleaned_data
+
+
+@admin.register(Tenant)
+class TenantAdmin(admin.ModelAdmin):
+    list_display = ['name', 'slug', 'domain', 'is_active', 'created_at']
+    list_filter = ['is_active']
+    search_fields = ['name', 'slug', 'domain']
+    prepopulated_fields = {'slug': ['name']}
+    readonly_fields = ['created_at']
+
+
 @admin.register(Student)
-class StudentAdmin(admin.ModelAdmin):
+class StudentAdmin(PerformantAdminMixin, admin.ModelAdmin):
     form = StudentAdminForm
-    list_display = ['id', 'fullname', 'class_name', 'clgid', 'mobile', 'email', 'route1', 'created_at']
-    list_filter = ['class_name', 'route1', 'created_at']
+    list_display = ['id', 'fullname', 'class_name', 'clgid', 'mobile', 'email', 'route', 'created_at']
+    list_filter = ['class_name', 'route', 'created_at']
+    # Searches are answered by the student search index, see get_search_results
     search_fields = ['id', 'fullname', 'mobile', 'email', 'aadhar']
-    readonly_fields = ['created_at', 'updated_at']
+    readonly_fields = ['created_at', 'updated_at', 'get_pass_history']
     ordering = ['id']
     list_per_page = 25
     
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        return queryset.filter(student_search_filter(search_term)), False
+    
+    def get_pass_history(self, obj):
+        # Live and archived passes, so older years stay visible after archiving
+        if not obj.pk:
+            return "-"
+        history = student_pass_history(obj)
+        if not history:
+            return "-"
+        return format_html_join(
+            mark_safe('<br>'), '{} &middot; {} &middot; {} (expires {}){}',
+            (
+                (bus_pass.semester, bus_pass.route.name if bus_pass.route else '-', bus_pass.get_status_display(), bus_pass.expiry_date,
+                 ' [archived]' if isinstance(bus_pass, ArchivedBusPass) else '')
+                for bus_pass in history
+            ),
+        )
+    get_pass_history.short_description = "Pass history"
+    
     # Show password field as password input in admin
     def get_fields(self, request, obj=None):
         fields = super().get_fields(request, obj)
@@ -41,9 +190,17 @@ class StudentAdmin(admin.ModelAdmin):
         return fields
 
 
+class RouteStopInline(admin.TabularInline):
+    model = RouteStop
+    fields = ['sequence', 'name', 'arrival_time']
+    ordering = ['sequence']
+    extra = 1
+
+
 @admin.register(Route)
-class RouteAdmin(admin.ModelAdmin):
-    list_display = ['name', 'source', 'destination', 'driver_name', 'driver_contact', 'arrival_time_at_source', 'arrival_time_at_destination', 'is_active', 'created_at']
+class RouteAdmin(PerformantAdminMixin, admin.ModelAdmin):
+    inlines = [RouteStopInline]
+    list_display = ['name', 'source', 'destination', 'driver_name', 'driver_contact', 'arrival_time_at_source', 'arrival_time_at_destination', 'capacity', 'is_active', 'created_at']
     list_filter = ['is_active', 'created_at']
     search_fields = ['name', 'source', 'destination', 'driver_name', 'driver_contact']
     readonly_fields = ['created_at', 'updated_at']
@@ -52,7 +209,7 @@ class RouteAdmin(admin.ModelAdmin):
     
     fieldsets = (
         ('Route Information', {
-            'fields': ('name', 'source', 'destination', 'is_active')
+            'fields': ('name', 'source', 'destination', 'capacity', 'is_active')
         }),
         ('Driver Information', {
             'fields': ('driver_name', 'driver_contact')
@@ -68,8 +225,9 @@ class RouteAdmin(admin.ModelAdmin):
 
 
 @admin.register(RoutePrice)
-class RoutePriceAdmin(admin.ModelAdmin):
+class RoutePriceAdmin(PerformantAdminMixin, admin.ModelAdmin):
     list_display = ['route', 'semester', 'price', 'created_at']
+    list_select_related = ['route']
     list_filter = ['route', 'semester', 'created_at']
     search_fields = ['route__name', 'route__source', 'route__destination', 'semester']
     readonly_fields = ['created_at', 'updated_at']
@@ -77,36 +235,84 @@ class RoutePriceAdmin(admin.ModelAdmin):
     list_per_page = 25
 
 
+@admin.register(RouteSeatCounter)
+class RouteSeatCounterAdmin(PerformantAdminMixin, admin.ModelAdmin):
+    list_display = ['route', 'semester', 'seats_taken', 'get_capacity', 'seats_available', 'updated_at']
+    list_filter = ['semester', 'route']
+    search_fields = ['route__name', 'route__source', 'route__destination']
+    readonly_fields = ['seats_taken', 'updated_at']
+    list_select_related = ['route']
+    ordering = ['route', 'semester']
+    list_per_page = 25
+
+    def get_capacity(self, obj):
+        return obj.route.capacity
+    get_capacity.short_description = "Capacity"
+
+
+@admin.register(WaitlistEntry)
+class WaitlistEntryAdmin(PerformantAdminMixin, admin.ModelAdmin):
+    list_display = ['student', 'route', 'semester', 'created_at', 'promoted_at']
+    list_filter = ['semester', 'route', 'promoted_at']
+    search_fields = ['student__fullname', 'student__id', 'route__name']
+    readonly_fields = ['promoted_pass', 'promoted_at', 'created_at']
+    list_select_related = ['student', 'route']
+    ordering = ['created_at']
+    list_per_page = 25
+
+
 @admin.register(BusPass)
-class BusPassAdmin(admin.ModelAdmin):
-    list_display = ['student', 'route', 'semester', 'status', 'issue_date', 'expiry_date', 'created_at']
-    list_filter = ['status', 'route', 'semester', 'issue_date', 'created_at']
-    search_fields = ['student__fullname', 'student__id', 'student__mobile', 'student__email']
-    readonly_fields = ['id', 'created_at', 'updated_at', 'issue_date']
+class BusPassAdmin(StudentSearchMixin, PerformantAdminMixin, admin.ModelAdmin):
+    form = BusPassAdminForm
+    list_display = ['student', 'route', 'semester', 'status', 'receipt_duplicate', 'issue_date', 'expiry_date', 'created_at']
+    list_select_related = ['student', 'route']
+    list_filter = ['status', 'receipt_duplicate', 'route', 'semester', 'issue_date', 'created_at']
+    # Searches are answered by the student search index, see StudentSearchMixin
+    search_fields = ['student__id', 'student__fullname', 'student__mobile', 'student__email']
+    readonly_fields = ['id', 'created_at', 'updated_at', 'issue_date', 'receipt_duplicate', 'get_duplicate_receipts']
     ordering = ['-created_at']
     list_per_page = 25
     
     # Add custom actions
     actions = ['approve_selected', 'reject_selected']
     
+    def get_duplicate_receipts(self, obj):
+        return format_duplicate_receipts(obj)
+    get_duplicate_receipts.short_description = "Matching receipts"
+    
     def approve_selected(self, request, queryset):
-        queryset.update(status='approved')
-        self.message_user(request, "Selected bus passes have been approved.")
+        if submit_large_selection(self, request, queryset, 'approve_passes'):
+            return
+        approved, left_pending = approve_passes(queryset, request.user)
+        self.message_user(request, f"{approved} pending bus passes have been approved.")
+        if left_pending:
+            self.message_user(request, f"{left_pending} bus passes were left pending because their route is full for that semester.", messages.WARNING)
     
     def reject_selected(self, request, queryset):
-        queryset.update(status='rejected')
-        self.message_user(request, "Selected bus passes have been rejected.")
+        if submit_large_selection(self, request, queryset, 'reject_passes'):
+            return
+        rejected = reject_passes(queryset, request.user)
+        self.message_user(request, f"{rejected} pending bus passes have been rejected.")
+    
+    def save_model(self, request, obj, form, change):
+        record_form_status_change(obj, form, request.user)
+        super().save_model(request, obj, form, change)
+        if change and 'status' in form.changed_data and obj.status in ('approved', 'rejected'):
+            log_status_change('bus_pass', [obj.pk], obj.status, request.user)
+            enqueue_notifications('bus_pass', [(obj.pk, obj.student_id)], obj.status)
     
     approve_selected.short_description = "Approve selected bus passes"
     reject_selected.short_description = "Reject selected bus passes"
 
 
 @admin.register(MultiSemesterBusPassApplication)
-class MultiSemesterBusPassApplicationAdmin(admin.ModelAdmin):
-    list_display = ['student', 'route', 'get_semesters_display', 'total_amount', 'status', 'issue_date', 'created_at']
-    list_filter = ['status', 'route', 'issue_date', 'created_at']
-    search_fields = ['student__fullname', 'student__id', 'student__mobile', 'student__email']
-    readonly_fields = ['id', 'created_at', 'updated_at', 'issue_date']
+class MultiSemesterBusPassApplicationAdmin(StudentSearchMixin, PerformantAdminMixin, admin.ModelAdmin):
+    list_display = ['student', 'route', 'get_semesters_display', 'total_amount', 'status', 'receipt_duplicate', 'issue_date', 'created_at']
+    list_select_related = ['student', 'route']
+    list_filter = ['status', 'receipt_duplicate', 'route', 'issue_date', 'created_at']
+    # Searches are answered by the student search index, see StudentSearchMixin
+    search_fields = ['student__id', 'student__fullname', 'student__mobile', 'student__email']
+    readonly_fields = ['id', 'created_at', 'updated_at', 'issue_date', 'receipt_duplicate', 'get_duplicate_receipts']
     ordering = ['-created_at']
     list_per_page = 25
     
@@ -114,72 +320,166 @@ class MultiSemesterBusPassApplicationAdmin(admin.ModelAdmin):
     actions = ['approve_selected', 'reject_selected']
     
     def get_semesters_display(self, obj):
-        try:
-            semesters_list = json.loads(obj.semesters)
-            return ", ".join(semesters_list)
-        except (json.JSONDecodeError, TypeError):
-            return obj.semesters
+        semesters_list = parse_semesters(obj.semesters)
+        return ", ".join(semesters_list) if semesters_list else obj.semesters
     get_semesters_display.short_description = "Semesters"
     
+    def get_duplicate_receipts(self, obj):
+        return format_duplicate_receipts(obj)
+    get_duplicate_receipts.short_description = "Matching receipts"
+    
     def approve_selected(self, request, queryset):
-        for application in queryset:
-            application.status = 'approved'
-            application.save()
-            # Create individual BusPass records for each semester
-            try:
-                semesters_list = json.loads(application.semesters)
-            except json.JSONDecodeError:
-                semesters_list = []
-            
-            for semester in semesters_list:
-                # Get the route price for this semester
-                route_price = RoutePrice.objects.get(route=application.route, semester=semester)
-                
-                # Calculate expiry date based on semester
-                from datetime import date
-                year = date.today().year
-                if semester == 'Semester-1':
-                    expiry_month = 6
-                    expiry_day = 30
-                elif semester == 'Semester-2':
-                    expiry_month = 12
-                    expiry_day = 31
-                elif semester == 'Semester-3':
-                    expiry_month = 6
-                    expiry_day = 30
-                elif semester == 'Semester-4':
-                    expiry_month = 12
-                    expiry_day = 31
-                elif semester == 'Semester-5':
-                    expiry_month = 6
-                    expiry_day = 30
-                elif semester == 'Semester-6':
-                    expiry_month = 12
-                    expiry_day = 31
-                else:
-                    expiry_month = 12
-                    expiry_day = 31
-                
-                expiry_date = date(year, expiry_month, expiry_day)
-                
-                # Create individual bus pass
-                BusPass.objects.create(
-                    student=application.student,
-                    route=application.route,
-                    semester=semester,
-                    issue_date=application.issue_date,
-                    expiry_date=expiry_date,
-                    status='approved',
-                    payment_receipt=application.payment_receipt,
-                    approved_by=request.user,
-                    approved_at=application.approved_at or application.created_at,
-                )
-        self.message_user(request, f"{queryset.count()} multi-semester applications have been approved and individual bus passes created.")
+        if submit_large_selection(self, request, queryset, 'approve_applications'):
+            return
+        approved, passes_created, left_pending = approve_applications(queryset, request.user)
+        self.message_user(request, f"{approved} pending multi-semester applications have been approved and {passes_created} individual bus passes created.")
+        if left_pending:
+            self.message_user(request, f"{left_pending} applications were left pending because their route is full for one of their semesters.", messages.WARNING)
     
     def reject_selected(self, request, queryset):
-        queryset.update(status='rejected')
-        self.message_user(request, f"{queryset.count()} multi-semester applications have been rejected.")
+        if submit_large_selection(self, request, queryset, 'reject_applications'):
+            return
+        rejected = reject_applications(queryset, request.user)
+        self.message_user(request, f"{rejected} pending multi-semester applications have been rejected.")
+    
+    def save_model(self, request, obj, form, change):
+        record_form_status_change(obj, form, request.user)
+        super().save_model(request, obj, form, change)
+        if change and 'status' in form.changed_data and obj.status in ('approved', 'rejected'):
+            log_status_change('multi_semester', [obj.pk], obj.status, request.user)
+            enqueue_notifications('multi_semester', [(obj.pk, obj.student_id)], obj.status)
     
     approve_selected.short_description = "Approve selected multi-semester applications and create individual passes"
     reject_selected.short_description = "Reject selected multi-semester applications"
 
+
+
+@admin.register(PassAuditLog)
+class PassAuditLogAdmin(PerformantAdminMixin, admin.ModelAdmin):
+    list_display = ['created_at', 'pass_type', 'object_id', 'action', 'performed_by']
+    list_filter = ['pass_type', 'action']
+    date_hierarchy = 'created_at'
+    readonly_fields = ['pass_type', 'object_id', 'action', 'performed_by', 'created_at']
+    ordering = ['-created_at']
+    list_per_page = 50
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(StudentPassSummary)
+class StudentPassSummaryAdmin(PerformantAdminMixin, admin.ModelAdmin):
+    list_display = ['student', 'total_passes', 'approved_passes', 'pending_passes', 'rejected_passes', 'pending_applications', 'next_expiry', 'updated_at']
+    search_fields = ['student__id__exact']
+    readonly_fields = [field.name for field in StudentPassSummary._meta.fields]
+    ordering = ['student']
+    list_per_page = 25
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(BackgroundJob)
+class BackgroundJobAdmin(PerformantAdminMixin, admin.ModelAdmin):
+    list_display = ['created_at', 'kind', 'status', 'get_progress', 'failed_items', 'get_throughput', 'submitted_by', 'locked_by', 'finished_at']
+    list_filter = ['status', 'kind']
+    readonly_fields = [field.name for field in BackgroundJob._meta.fields]
+    ordering = ['-created_at']
+    list_per_page = 50
+    actions = ['retry_failed']
+
+    def get_progress(self, obj):
+        if not obj.total_items:
+            return "-"
+        return f"{obj.processed_items}/{obj.total_items} ({obj.processed_items * 100 // obj.total_items}%)"
+    get_progress.short_description = "Progress"
+
+    def get_throughput(self, obj):
+        throughput = obj.throughput
+        return f"{throughput:.1f}/s" if throughput is not None else "-"
+    get_throughput.short_description = "Throughput"
+
+    def retry_failed(self, request, queryset):
+        requeued = sum(retry_failed_items(job) for job in queryset.exclude(status='running'))
+        self.message_user(request, f"{requeued} failed items have been queued for another attempt.")
+    retry_failed.short_description = "Retry failed items of selected jobs"
+
+    def has_add_permission(self, request):
+        return False
+
+
+class ArchiveAdminMixin(StudentSearchMixin):
+    """Read-only changelist over an archive table, searched through the student index"""
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ArchivedBusPass)
+class ArchivedBusPassAdmin(ArchiveAdminMixin, PerformantAdminMixin, admin.ModelAdmin):
+    list_display = ['student', 'route', 'semester', 'status', 'academic_year', 'issue_date', 'expiry_date', 'archived_at']
+    # Filtering on academic_year lets PostgreSQL scan a single partition
+    list_filter = ['academic_year', 'status', 'semester', 'route']
+    search_fields = ['student__id']
+    readonly_fields = [field.name for field in ArchivedBusPass._meta.fields]
+    ordering = ['-expiry_date']
+    list_per_page = 50
+
+
+@admin.register(ArchivedMultiSemesterApplication)
+class ArchivedMultiSemesterApplicationAdmin(ArchiveAdminMixin, PerformantAdminMixin, admin.ModelAdmin):
+    list_display = ['student', 'route', 'get_semesters_display', 'total_amount', 'status', 'academic_year', 'issue_date', 'archived_at']
+    list_filter = ['academic_year', 'status', 'route']
+    search_fields = ['student__id']
+    readonly_fields = [field.name for field in ArchivedMultiSemesterApplication._meta.fields]
+    ordering = ['-issue_date']
+    list_per_page = 50
+
+    def get_semesters_display(self, obj):
+        semesters_list = parse_semesters(obj.semesters)
+        return ", ".join(semesters_list) if semesters_list else obj.semesters
+    get_semesters_display.short_description = "Semesters"
+
+
+@admin.register(Notification)
+class NotificationAdmin(PerformantAdminMixin, admin.ModelAdmin):
+    list_display = ['created_at', 'student', 'channel', 'pass_type', 'action', 'status', 'attempts', 'sent_at']
+    list_filter = ['status', 'channel', 'action']
+    search_fields = ['student__id__exact']
+    readonly_fields = [field.name for field in Notification._meta.fields]
+    ordering = ['-created_at']
+    list_per_page = 50
+    actions = ['retry_selected']
+
+    def retry_selected(self, request, queryset):
+        retried = queryset.filter(status='failed').update(status='pending', attempts=0, available_at=timezone.now(), error='')
+        self.message_user(request, f"{retried} failed notifications have been queued for another attempt.")
+    retry_selected.short_description = "Retry selected failed notifications"
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(ScanEvent)
+class ScanEventAdmin(PerformantAdminMixin, admin.ModelAdmin):
+    list_display = ['scanned_at', 'pass_id', 'route', 'accepted']
+    list_filter = ['accepted', 'route']
+    search_fields = ['pass_id__exact']
+    readonly_fields = ['pass_id', 'route', 'scanned_at', 'accepted']
+    ordering = ['-scanned_at']
+    list_per_page = 50
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
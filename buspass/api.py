@@ -0,0 +1,149 @@
+import hashlib
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import permissions, viewsets
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+from rest_framework.routers import DefaultRouter
+from .models import Student, BusPass, MultiSemesterBusPassApplication
+from .catalog import get_active_routes, get_catalog_version
+from .serializers import (
+    RouteSerializer, StudentSerializer, BusPassSerializer, MultiSemesterApplicationSerializer,
+)
+
+
+def get_api_student_id(request):
+    """Return the logged-in student's ID for student sessions, or None"""
+    if request.session.get('student_logged_in'):
+        return request.session.get('student_id')
+    return None
+
+
+class IsStudentOrStaff(permissions.BasePermission):
+    """Staff users (Django auth) or students logged in through the student login"""
+
+    def has_permission(self, request, view):
+        return bool(request.user and request.user.is_staff) or get_api_student_id(request) is not None
+
+
+class NewestFirstCursorPagination(CursorPagination):
+    # Walks the (-created_at) indexes instead of counting and offsetting
+    ordering = '-created_at'
+    page_size = 25
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class RouteCursorPagination(NewestFirstCursorPagination):
+    ordering = 'name'
+
+
+class ConditionalReadOnlyViewSet(viewsets.ReadOnlyModelViewSet):
+    """Read-only viewset that answers If-None-Match with 304 before serializing anything
+
+    List ETags come from the primary keys and updated_at of the rows on the
+    requested page, which the cursor page query fetches anyway, so a 304
+    costs no query over the rest of the table. Detail ETags come from the
+    object's updated_at.
+    """
+
+    def get_etag_parts(self, request, page):
+        return [(obj.pk, obj.updated_at) for obj in page]
+
+    def get_object_etag_parts(self, request, queryset, pk):
+        return [queryset.filter(pk=pk).values_list('updated_at', flat=True).first()]
+
+    def _etag(self, request, parts):
+        viewer = request.user.pk if request.user.is_staff else get_api_student_id(request)
+        raw = '|'.join(str(part) for part in [viewer, request.get_full_path(), *parts])
+        return quote_etag(hashlib.md5(raw.encode()).hexdigest())
+
+    def _conditional(self, request, etag, render):
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = Response(status=304)
+        else:
+            response = render()
+        response['ETag'] = etag
+        # Clients may keep responses but must revalidate them
+        patch_cache_control(response, private=True, max_age=0)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        page = self.paginate_queryset(self.filter_queryset(self.get_queryset()))
+        etag = self._etag(request, self.get_etag_parts(request, page))
+        return self._conditional(request, etag, lambda: self.get_paginated_response(self.get_serializer(page, many=True).data))
+
+    def retrieve(self, request, *args, **kwargs):
+        parts = self.get_object_etag_parts(request, self.filter_queryset(self.get_queryset()), kwargs[self.lookup_field])
+        if parts == [None]:
+            # Unknown or not visible to this viewer; let get_object() raise the 404
+            return super().retrieve(request, *args, **kwargs)
+        etag = self._etag(request, parts)
+        return self._conditional(request, etag, lambda: super(ConditionalReadOnlyViewSet, self).retrieve(request, *args, **kwargs))
+
+
+class RouteViewSet(ConditionalReadOnlyViewSet):
+    serializer_class = RouteSerializer
+    pagination_class = RouteCursorPagination
+    permission_classes = [permissions.AllowAny]
+
+    def get_queryset(self):
+        return get_active_routes()
+
+    def get_etag_parts(self, request, page):
+        # Prices are not part of a route's updated_at; any Route or RoutePrice change moves the catalog version on
+        return [get_catalog_version()]
+
+    def get_object_etag_parts(self, request, queryset, pk):
+        if not queryset.filter(pk=pk).exists():
+            return [None]
+        return [get_catalog_version()]
+
+
+class StudentViewSet(ConditionalReadOnlyViewSet):
+    serializer_class = StudentSerializer
+    pagination_class = NewestFirstCursorPagination
+    permission_classes = [IsStudentOrStaff]
+
+    def get_queryset(self):
+        queryset = Student.objects.all()
+        if not self.request.user.is_staff:
+            queryset = queryset.filter(pk=get_api_student_id(self.request))
+        return queryset
+
+
+class StudentScopedViewSet(ConditionalReadOnlyViewSet):
+    """Staff see every row (optionally ?student=<id>); students only their own"""
+    pagination_class = NewestFirstCursorPagination
+    permission_classes = [IsStudentOrStaff]
+    model = None
+
+    def get_queryset(self):
+        queryset = self.model.objects.select_related('student', 'route')
+        if self.request.user.is_staff:
+            student_id = self.request.query_params.get('student')
+            if student_id:
+                queryset = queryset.filter(student_id=student_id)
+        else:
+            queryset = queryset.filter(student_id=get_api_student_id(self.request))
+        status = self.request.query_params.get('status')
+        if status:
+            queryset = queryset.filter(status=status)
+        return queryset
+
+
+class BusPassViewSet(StudentScopedViewSet):
+    serializer_class = BusPassSerializer
+    model = BusPass
+
+
+class MultiSemesterApplicationViewSet(StudentScopedViewSet):
+    serializer_class = MultiSemesterApplicationSerializer
+    model = MultiSemesterBusPassApplication
+
+
+router = DefaultRouter()
+router.register('routes', RouteViewSet, basename='api-route')
+router.register('students', StudentViewSet, basename='api-student')
+router.register('passes', BusPassViewSet, basename='api-pass')
+router.register('applications', MultiSemesterApplicationViewSet, basename='api-application')
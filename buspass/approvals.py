@@ -0,0 +1,166 @@
+from django.db import transaction
+from django.utils import timezone
+from .models import BusPass, MultiSemesterBusPassApplication, PassAuditLog
+from .capacity import allocate_seats, release_seats
+from .summaries import refresh_student_summaries
+from .utils import get_semester_expiry_date, parse_semesters
+from .notifications import enqueue_notifications
+from .events import send_status_changes
+
+AUDIT_LOG_BATCH_SIZE = 500
+
+
+def log_status_change(pass_type, object_ids, action, user, timestamp=None):
+    """Append one audit row per object in batched INSERTs"""
+    timestamp = timestamp or timezone.now()
+    PassAuditLog.objects.bulk_create(
+        [
+            PassAuditLog(pass_type=pass_type, object_id=object_id, action=action, performed_by=user, created_at=timestamp)
+            for object_id in object_ids
+        ],
+        batch_size=AUDIT_LOG_BATCH_SIZE,
+    )
+
+
+def _audit_fields(action, user, timestamp):
+    if action == 'approved':
+        return {'approved_by': user, 'approved_at': timestamp}
+    return {'rejected_by': user, 'rejected_at': timestamp}
+
+
+def set_pass_status(queryset, action, user):
+    """Approve or reject the still-pending bus passes in queryset with one UPDATE
+
+    Approvals only take free seats, oldest pass first; passes that don't fit
+    on their route stay pending. Returns (passes changed, passes left pending
+    for lack of seats).
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        pending = queryset.filter(status='pending')
+        passes = list(pending.select_for_update().order_by('created_at').values_list('pk', 'student_id', 'route_id', 'semester'))
+        if not passes:
+            return 0, 0
+        left_pending = 0
+        if action == 'approved':
+            granted = allocate_seats([(bus_pass, [bus_pass[2:]]) for bus_pass in passes])
+            left_pending = len(passes) - len(granted)
+            passes = granted
+            if not passes:
+                return 0, left_pending
+        passes = [(pk, student_id) for pk, student_id, route_id, semester in passes]
+        student_ids = {student_id for pk, student_id in passes}
+        updated = BusPass.objects.filter(pk__in=[pk for pk, student_id in passes]).update(
+            status=action, updated_at=now, **_audit_fields(action, user, now)
+        )
+        log_status_change('bus_pass', [pk for pk, student_id in passes], action, user, now)
+        enqueue_notifications('bus_pass', passes, action, now)
+        send_status_changes(('bus_pass', pk, student_id, action) for pk, student_id in passes)
+        # update() skips signals, so refresh the dashboard summaries here
+        refresh_student_summaries(student_ids)
+    return updated, left_pending
+
+
+def approve_passes(queryset, user):
+    """Returns (passes approved, passes left pending because their route is full)"""
+    return set_pass_status(queryset, 'approved', user)
+
+
+def reject_passes(queryset, user):
+    return set_pass_status(queryset, 'rejected', user)[0]
+
+
+def approve_applications(queryset, user):
+    """Approve pending multi-semester applications and create their bus passes
+
+    An application is only approved if its route has a free seat in every
+    semester it adds; the others stay pending. Returns (applications
+    approved, bus passes created, applications left pending for lack of
+    seats).
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        pending = queryset.filter(status='pending')
+        applications = list(
+            pending.select_for_update().order_by('created_at')
+            .only('id', 'tenant_id', 'student_id', 'route_id', 'semesters', 'payment_receipt')
+        )
+        if not applications:
+            return 0, 0, 0
+
+        # Semesters the student already holds a live pass for are not issued twice
+        active_passes = set(
+            BusPass.objects.filter(
+                student_id__in={application.student_id for application in applications},
+                status__in=['pending', 'approved'],
+            ).values_list('student_id', 'route_id', 'semester')
+        )
+        new_semesters = {
+            application.pk: [
+                semester for semester in parse_semesters(application.semesters)
+                if (application.student_id, application.route_id, semester) not in active_passes
+            ]
+            for application in applications
+        }
+        granted = allocate_seats([
+            (application, [(application.route_id, semester) for semester in new_semesters[application.pk]])
+            for application in applications
+        ])
+        left_pending = len(applications) - len(granted)
+        applications = granted
+        if not applications:
+            return 0, 0, left_pending
+        updated = MultiSemesterBusPassApplication.objects.filter(pk__in=[application.pk for application in applications]).update(
+            status='approved', updated_at=now, **_audit_fields('approved', user, now)
+        )
+
+        # Create individual BusPass records for each semester
+        bus_passes = []
+        for application in applications:
+            for semester in new_semesters[application.pk]:
+                key = (application.student_id, application.route_id, semester)
+                if key in active_passes:
+                    # Overlapping applications of one student: the seat was taken twice
+                    release_seats(application.route_id, semester)
+                    continue
+                active_passes.add(key)
+                bus_passes.append(BusPass(
+                    # bulk_create skips save(), so the tenant is copied here
+                    tenant_id=application.tenant_id,
+                    student_id=application.student_id,
+                    route_id=application.route_id,
+                    semester=semester,
+                    expiry_date=get_semester_expiry_date(semester),
+                    status='approved',
+                    payment_receipt=application.payment_receipt.name,
+                    approved_by=user,
+                    approved_at=now,
+                ))
+        # Seats were counted by allocate_seats, so skipping the signals is fine
+        BusPass.objects.bulk_create(bus_passes, batch_size=AUDIT_LOG_BATCH_SIZE)
+
+        log_status_change('multi_semester', [application.pk for application in applications], 'approved', user, now)
+        enqueue_notifications('multi_semester', [(application.pk, application.student_id) for application in applications], 'approved', now)
+        log_status_change('bus_pass', [bus_pass.pk for bus_pass in bus_passes], 'approved', user, now)
+        send_status_changes(
+            [('multi_semester', application.pk, application.student_id, 'approved') for application in applications]
+            + [('bus_pass', bus_pass.pk, bus_pass.student_id, 'approved') for bus_pass in bus_passes]
+        )
+        refresh_student_summaries(application.student_id for application in applications)
+    return updated, len(bus_passes), left_pending
+
+
+def reject_applications(queryset, user):
+    """Reject pending multi-semester applications with one UPDATE"""
+    now = timezone.now()
+    with transaction.atomic():
+        pending = queryset.filter(status='pending')
+        applications = list(pending.select_for_update().values_list('pk', 'student_id'))
+        if not applications:
+            return 0
+        updated = pending.update(status='rejected', updated_at=now, **_audit_fields('rejected', user, now))
+        log_status_change('multi_semester', [pk for pk, student_id in applications], 'rejected', user, now)
+        enqueue_notifications('multi_semester', applications, 'rejected', now)
+        send_status_changes(('multi_semester', pk, student_id, 'rejected') for pk, student_id in applications)
+        refresh_student_summaries(student_id for pk, student_id in applications)
+    return updated
@@ -0,0 +1,141 @@
+from datetime import date
+from itertools import chain
+from django.db import connection, models, transaction
+from .models import Student, BusPass, MultiSemesterBusPassApplication, ArchivedBusPass, ArchivedMultiSemesterApplication
+from .summaries import refresh_student_summaries
+from .utils import explicit_timestamps
+
+ARCHIVE_BATCH_SIZE = 1000
+
+
+def _archived_fields(archive_model):
+    # Every live column is archived; the tenant comes from the student
+    return [
+        field.attname for field in archive_model._meta.concrete_fields
+        if field.name not in ('academic_year', 'archived_at')
+    ]
+
+
+ARCHIVED_PASS_FIELDS = _archived_fields(ArchivedBusPass)
+ARCHIVED_APPLICATION_FIELDS = _archived_fields(ArchivedMultiSemesterApplication)
+
+_partitions = set()
+
+
+def current_academic_year():
+    # Passes expire at the end of June or December, so a pass belongs to the
+    # calendar year of its expiry date
+    return date.today().year
+
+
+def ensure_archive_partition(model, year):
+    """Create the PostgreSQL partition holding academic_year=year, if it is missing"""
+    if connection.vendor != 'postgresql':
+        return
+    table = model._meta.db_table
+    if (table, year) in _partitions:
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE TABLE IF NOT EXISTS {table}_y{int(year)} PARTITION OF {table} FOR VALUES IN ({int(year)})'
+        )
+    _partitions.add((table, year))
+
+
+def _delete_rows(model, ids):
+    """Delete rows by primary key in one statement, without loading them or sending signals
+
+    Archived and restored rows hold no seats, so the only work the signals
+    would do is the summary refresh the callers do per batch. References to
+    the rows (all SET_NULL) are cleared first.
+    """
+    for relation in model._meta.related_objects:
+        if relation.on_delete is models.SET_NULL:
+            relation.related_model._base_manager.filter(**{f'{relation.field.name}__in': ids}).update(**{relation.field.name: None})
+    model._base_manager.filter(pk__in=ids)._raw_delete(model._base_manager.db)
+
+
+def _move_rows(queryset, archive_model, fields, year_of, batch_size):
+    """Copy rows of queryset into archive_model in batches and delete them from the live table"""
+    total = 0
+    while True:
+        with transaction.atomic():
+            rows = list(queryset.order_by('pk').values(*fields)[:batch_size])
+            if not rows:
+                break
+            archived = [archive_model(academic_year=year_of(row), **row) for row in rows]
+            for year in {row.academic_year for row in archived}:
+                ensure_archive_partition(archive_model, year)
+            archive_model.objects.bulk_create(archived, ignore_conflicts=True)
+            _delete_rows(queryset.model, [row['id'] for row in rows])
+            refresh_student_summaries({row['student_id'] for row in rows})
+        total += len(rows)
+    return total
+
+
+def _restore_rows(queryset, live_model, fields, batch_size):
+    """Copy archived rows of queryset back into live_model and delete them from the archive"""
+    total = 0
+    while True:
+        with transaction.atomic():
+            rows = list(queryset.order_by('pk').values(*fields)[:batch_size])
+            if not rows:
+                break
+            tenants = dict(Student.unscoped.filter(pk__in={row['student_id'] for row in rows}).values_list('pk', 'tenant_id'))
+            for row in rows:
+                # Rows archived before updated_at was kept have none
+                row['updated_at'] = row['updated_at'] or row['created_at']
+            with explicit_timestamps(live_model):
+                live_model.unscoped.bulk_create(
+                    [live_model(tenant_id=tenants[row['student_id']], **row) for row in rows], ignore_conflicts=True,
+                )
+            _delete_rows(queryset.model, [row['id'] for row in rows])
+            refresh_student_summaries(tenants)
+        total += len(rows)
+    return total
+
+
+def archive_passes(queryset, batch_size=ARCHIVE_BATCH_SIZE):
+    """Move the expired or rejected passes in queryset to the archive; returns how many moved"""
+    return _move_rows(
+        queryset.filter(status__in=['expired', 'rejected']), ArchivedBusPass, ARCHIVED_PASS_FIELDS,
+        lambda row: row['expiry_date'].year, batch_size,
+    )
+
+
+def archive_applications(queryset, batch_size=ARCHIVE_BATCH_SIZE):
+    """Move the decided applications in queryset to the archive; returns how many moved"""
+    return _move_rows(
+        queryset.filter(status__in=['approved', 'rejected']), ArchivedMultiSemesterApplication, ARCHIVED_APPLICATION_FIELDS,
+        lambda row: row['issue_date'].year, batch_size,
+    )
+
+
+def archive_academic_years(before_year, batch_size=ARCHIVE_BATCH_SIZE):
+    """Archive finished passes and applications of every academic year before before_year
+
+    Returns (passes moved, applications moved).
+    """
+    start = date(before_year, 1, 1)
+    passes = archive_passes(BusPass.objects.filter(expiry_date__lt=start), batch_size)
+    applications = archive_applications(MultiSemesterBusPassApplication.objects.filter(issue_date__lt=start), batch_size)
+    return passes, applications
+
+
+def restore_passes(queryset, batch_size=ARCHIVE_BATCH_SIZE):
+    """Move the archived passes in queryset back to the live table; returns how many moved"""
+    return _restore_rows(queryset, BusPass, ARCHIVED_PASS_FIELDS, batch_size)
+
+
+def restore_applications(queryset, batch_size=ARCHIVE_BATCH_SIZE):
+    """Move the archived applications in queryset back to the live table; returns how many moved"""
+    return _restore_rows(queryset, MultiSemesterBusPassApplication, ARCHIVED_APPLICATION_FIELDS, batch_size)
+
+
+def student_pass_history(student):
+    """Return all of a student's passes, live and archived, newest expiry first"""
+    history = chain(
+        BusPass.objects.filter(student=student).select_related('route'),
+        ArchivedBusPass.objects.filter(student=student).select_related('route'),
+    )
+    return sorted(history, key=lambda bus_pass: bus_pass.expiry_date, reverse=True)
@@ -0,0 +1,168 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+# Expired and surplus rows are culled once every this many writes per connection
+CULL_EVERY = 200
+# SQLite limits the number of bound parameters in one statement
+MAX_KEYS_PER_QUERY = 500
+
+
+class SQLiteCache(BaseCache):
+    """Cache stored in one SQLite file, shared by every worker process on the host
+
+    Unlike LocMemCache, a value computed (or invalidated) by one gunicorn
+    worker is seen by the others. The file is opened in WAL mode so readers
+    never wait for a writer; each thread of each process keeps its own
+    connection, reopened after a fork.
+    """
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self.path = os.path.abspath(location)
+        self._local = threading.local()
+
+    @property
+    def _connection(self):
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL) WITHOUT ROWID'
+            )
+            connection.execute('CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)')
+            local.connection = connection
+            local.pid = os.getpid()
+            local.writes = 0
+        return local.connection
+
+    def _dumps(self, value):
+        return pickle.dumps(value, self.pickle_protocol)
+
+    def _wrote(self, count=1):
+        self._local.writes += count
+        if self._local.writes >= CULL_EVERY:
+            self._local.writes = 0
+            self._cull()
+
+    def _cull(self):
+        connection = self._connection
+        connection.execute('DELETE FROM cache WHERE expires <= ?', [time.time()])
+        count = connection.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        if count > self._max_entries:
+            # Drop the entries closest to expiring, keeping those without a timeout longest
+            connection.execute(
+                'DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY expires IS NULL, expires LIMIT ?)',
+                [count // self._cull_frequency if self._cull_frequency else count],
+            )
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        row = self._connection.execute(
+            'SELECT value FROM cache WHERE key = ? AND (expires IS NULL OR expires > ?)', [key, time.time()]
+        ).fetchone()
+        return default if row is None else pickle.loads(row[0])
+
+    def get_many(self, keys, version=None):
+        keys = {self.make_and_validate_key(key, version=version): key for key in keys}
+        found = {}
+        names = list(keys)
+        now = time.time()
+        for start in range(0, len(names), MAX_KEYS_PER_QUERY):
+            chunk = names[start:start + MAX_KEYS_PER_QUERY]
+            rows = self._connection.execute(
+                f"SELECT key, value FROM cache WHERE key IN ({', '.join('?' * len(chunk))}) AND (expires IS NULL OR expires > ?)",
+                [*chunk, now],
+            )
+            found.update((keys[key], pickle.loads(value)) for key, value in rows)
+        return found
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._connection.execute(
+            'SELECT 1 FROM cache WHERE key = ? AND (expires IS NULL OR expires > ?)', [key, time.time()]
+        ).fetchone() is not None
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        self._connection.execute(
+            'INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)',
+            [key, self._dumps(value), self.get_backend_timeout(timeout)],
+        )
+        self._wrote()
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires = self.get_backend_timeout(timeout)
+        rows = [(self.make_and_validate_key(key, version=version), self._dumps(value), expires) for key, value in data.items()]
+        connection = self._connection
+        connection.execute('BEGIN')
+        try:
+            connection.executemany('INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)', rows)
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+        self._wrote(len(rows))
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        # Only replaces a row that has already expired, atomically across processes
+        cursor = self._connection.execute(
+            'INSERT INTO cache (key, value, expires) VALUES (?, ?, ?) '
+            'ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires = excluded.expires '
+            'WHERE cache.expires <= ?',
+            [key, self._dumps(value), self.get_backend_timeout(timeout), time.time()],
+        )
+        self._wrote()
+        return cursor.rowcount > 0
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        cursor = self._connection.execute(
+            'UPDATE cache SET expires = ? WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            [self.get_backend_timeout(timeout), key, time.time()],
+        )
+        return cursor.rowcount > 0
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        connection = self._connection
+        # BEGIN IMMEDIATE takes the write lock first, so concurrent increments can't be lost
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            row = connection.execute(
+                'SELECT value FROM cache WHERE key = ? AND (expires IS NULL OR expires > ?)', [key, time.time()]
+            ).fetchone()
+            if row is None:
+                raise ValueError(f"Key '{key}' not found")
+            value = pickle.loads(row[0]) + delta
+            connection.execute('UPDATE cache SET value = ? WHERE key = ?', [self._dumps(value), key])
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+        return value
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._connection.execute('DELETE FROM cache WHERE key = ?', [key]).rowcount > 0
+
+    def delete_many(self, keys, version=None):
+        self._connection.executemany(
+            'DELETE FROM cache WHERE key = ?', [(self.make_and_validate_key(key, version=version),) for key in keys]
+        )
+
+    def clear(self):
+        self._connection.execute('DELETE FROM cache')
+
+    def close(self, **kwargs):
+        # Connections are reused across requests; Django calls close() after each one
+        pass
@@ -0,0 +1,162 @@
+import threading
+import time
+from collections import Counter
+from django.core.cache import cache as default_cache
+from django.db import transaction
+
+# How long one worker may hold the right to recompute a missing value, and
+# how long the others wait for it before computing it themselves
+RECOMPUTE_LOCK_TIMEOUT = 30
+RECOMPUTE_WAIT = 5
+RECOMPUTE_POLL_INTERVAL = 0.05
+# Per-process metrics are added to the shared counters at most this often
+METRICS_FLUSH_INTERVAL = 10
+METRIC_EVENTS = ('hits', 'misses', 'waits', 'computes')
+METRIC_NAMESPACES_KEY = 'buspass:metrics:namespaces'
+
+_MISSING = object()
+_local_locks = {}
+_local_locks_guard = threading.Lock()
+_metrics = Counter()
+_metrics_guard = threading.Lock()
+_metrics_flushed_at = [time.monotonic()]
+_metric_namespaces = set()
+
+
+def version_key(namespace):
+    return f'buspass:version:{namespace}'
+
+
+def get_version(namespace, cache=default_cache, prefix='-'):
+    """Return the current version of a cache namespace, starting one if there is none
+
+    Every value cached under the namespace has the version in its key, so
+    bumping the version invalidates all of them at once, in every worker.
+    """
+    version = cache.get(version_key(namespace))
+    if version is None:
+        cache.add(version_key(namespace), f'{prefix}-{time.time_ns()}', None)
+        version = cache.get(version_key(namespace))
+    return version
+
+
+def bump_versions(namespaces, cache=default_cache, prefix='-'):
+    """Move the given namespaces on to new versions right away"""
+    version = f'{prefix}-{time.time_ns()}'
+    cache.set_many({version_key(namespace): version for namespace in namespaces}, None)
+
+
+def bump_versions_on_commit(namespaces, cache=default_cache, prefix='-'):
+    """Bump once the current transaction commits, so no reader caches the old rows under the new version"""
+    namespaces = list(namespaces)
+    if namespaces:
+        transaction.on_commit(lambda: bump_versions(namespaces, cache, prefix))
+
+
+def _metric_namespace(namespace):
+    # 'student:S1' and 'student:S2' are counted together as 'student'
+    return namespace.split(':', 1)[0]
+
+
+def record(namespace, event, count=1):
+    with _metrics_guard:
+        _metrics[_metric_namespace(namespace), event] += count
+        if time.monotonic() - _metrics_flushed_at[0] < METRICS_FLUSH_INTERVAL:
+            return
+        _metrics_flushed_at[0] = time.monotonic()
+        pending = dict(_metrics)
+        _metrics.clear()
+    flush_metrics(pending)
+
+
+def flush_metrics(pending=None):
+    """Add this process's counts to the shared counters read by get_metrics()"""
+    if pending is None:
+        with _metrics_guard:
+            pending = dict(_metrics)
+            _metrics.clear()
+    new_namespaces = {namespace for namespace, event in pending} - _metric_namespaces
+    if new_namespaces:
+        known = default_cache.get(METRIC_NAMESPACES_KEY) or set()
+        default_cache.set(METRIC_NAMESPACES_KEY, known | new_namespaces, None)
+        _metric_namespaces.update(new_namespaces)
+    for (namespace, event), count in pending.items():
+        key = f'buspass:metrics:{namespace}:{event}'
+        default_cache.add(key, 0, None)
+        try:
+            default_cache.incr(key, count)
+        except ValueError:
+            # Evicted between add and incr; losing one interval of counts is fine
+            pass
+
+
+def get_metrics():
+    """Return {namespace: {event: count}} summed over every process sharing the cache"""
+    flush_metrics()
+    namespaces = sorted(default_cache.get(METRIC_NAMESPACES_KEY) or ())
+    keys = [f'buspass:metrics:{namespace}:{event}' for namespace in namespaces for event in METRIC_EVENTS]
+    counts = default_cache.get_many(keys)
+    return {
+        namespace: {event: counts.get(f'buspass:metrics:{namespace}:{event}', 0) for event in METRIC_EVENTS}
+        for namespace in namespaces
+    }
+
+
+def reset_metrics():
+    namespaces = default_cache.get(METRIC_NAMESPACES_KEY) or ()
+    default_cache.delete_many(
+        [f'buspass:metrics:{namespace}:{event}' for namespace in namespaces for event in METRIC_EVENTS]
+        + [METRIC_NAMESPACES_KEY]
+    )
+    _metric_namespaces.clear()
+
+
+def _local_lock(key):
+    with _local_locks_guard:
+        lock = _local_locks.get(key)
+        if lock is None:
+            lock = _local_locks[key] = threading.Lock()
+        return lock
+
+
+def get_or_compute(namespace, key, compute, timeout, cache=default_cache, version=None):
+    """Return the cached value of key in namespace, computing it on a miss
+
+    Only one caller recomputes a missing value: threads of a worker queue
+    on a local lock and workers race for a short-lived lock entry in the
+    shared cache, while the losers poll for the winner's result (and
+    compute it themselves if it takes longer than RECOMPUTE_WAIT).
+    """
+    version = version or get_version(namespace, cache)
+    cache_key = f'buspass:{namespace}:{version}:{key}'
+    value = cache.get(cache_key, _MISSING)
+    if value is not _MISSING:
+        record(namespace, 'hits')
+        return value
+    record(namespace, 'misses')
+
+    with _local_lock(cache_key):
+        value = cache.get(cache_key, _MISSING)
+        if value is not _MISSING:
+            record(namespace, 'waits')
+            return value
+        lock_key = f'{cache_key}:lock'
+        locked = cache.add(lock_key, 1, RECOMPUTE_LOCK_TIMEOUT)
+        if not locked:
+            deadline = time.monotonic() + RECOMPUTE_WAIT
+            while time.monotonic() < deadline:
+                time.sleep(RECOMPUTE_POLL_INTERVAL)
+                value = cache.get(cache_key, _MISSING)
+                if value is not _MISSING:
+                    record(namespace, 'waits')
+                    return value
+        try:
+            value = compute()
+            cache.set(cache_key, value, timeout)
+            record(namespace, 'computes')
+        finally:
+            if locked:
+                cache.delete(lock_key)
+    with _local_locks_guard:
+        _local_locks.pop(cache_key, None)
+    return value
@@ -0,0 +1,190 @@
+from collections import Counter
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+from .models import Route, RouteSeatCounter, WaitlistEntry, BusPass
+from .utils import get_semester_expiry_date, generate_qr_code
+
+
+def get_seats_taken(route_id, semester):
+    """Return the number of approved seats on a route for a semester"""
+    counter = RouteSeatCounter.objects.filter(route_id=route_id, semester=semester).values_list('seats_taken', flat=True).first()
+    return counter or 0
+
+
+def get_seats_available(route, semester):
+    """Return the number of free seats on a route for a semester"""
+    return max(route.capacity - get_seats_taken(route.id, semester), 0)
+
+
+def get_seat_map(routes):
+    """Return {route_id: {semester: seats_available}} for the given routes in one query
+
+    Route/semester pairs without a counter have no approved passes yet and are
+    left out; callers fall back to the route capacity.
+    """
+    seat_map = {}
+    counters = RouteSeatCounter.objects.filter(route__in=routes).values_list(
+        'route_id', 'semester', 'seats_taken', 'route__capacity'
+    )
+    for route_id, semester, seats_taken, capacity in counters:
+        seat_map.setdefault(route_id, {})[semester] = max(capacity - seats_taken, 0)
+    return seat_map
+
+
+class RouteFull(Exception):
+    """Raised when a pass is approved on a route with no free seat left for its semester"""
+
+
+class _SeatsChanged(Exception):
+    pass
+
+
+def _lock_seat_counters(pairs):
+    # Counters must exist to be locked; ignore_conflicts covers a concurrent insert
+    RouteSeatCounter.objects.bulk_create(
+        [RouteSeatCounter(route_id=route_id, semester=semester) for route_id, semester in pairs], ignore_conflicts=True,
+    )
+    counters = RouteSeatCounter.objects.select_for_update(of=('self',)).filter(
+        route_id__in={route_id for route_id, semester in pairs}, semester__in={semester for route_id, semester in pairs},
+    )
+    capacities = dict(Route.unscoped.filter(pk__in={route_id for route_id, semester in pairs}).values_list('pk', 'capacity'))
+    return {
+        (route_id, semester): (capacities[route_id], seats_taken)
+        for route_id, semester, seats_taken in counters.values_list('route_id', 'semester', 'seats_taken')
+    }
+
+
+def allocate_seats(requests):
+    """Take seats for as many requests as the routes have room for, in order
+
+    requests is a list of (item, [(route_id, semester), ...]); an item gets
+    all of its seats or none. Returns the items that got their seats; the
+    others should stay pending. Counters only grow through UPDATEs guarded
+    by seats_taken + n <= capacity, so concurrent approvals can never fill
+    a route past its capacity.
+    """
+    pairs = {pair for item, item_pairs in requests for pair in item_pairs}
+    if not pairs:
+        return [item for item, item_pairs in requests]
+    while True:
+        try:
+            with transaction.atomic():
+                counters = _lock_seat_counters(pairs)
+                granted = []
+                taken = Counter()
+                for item, item_pairs in requests:
+                    needed = Counter(item_pairs)
+                    if all(taken[pair] + count <= counters[pair][0] - counters[pair][1] for pair, count in needed.items()):
+                        taken.update(needed)
+                        granted.append(item)
+                now = timezone.now()
+                for (route_id, semester), count in taken.items():
+                    capacity = counters[route_id, semester][0]
+                    updated = RouteSeatCounter.objects.filter(
+                        route_id=route_id, semester=semester, seats_taken__lte=capacity - count,
+                    ).update(seats_taken=F('seats_taken') + count, updated_at=now)
+                    if not updated:
+                        # Another approval took seats after we read the counter; plan again
+                        raise _SeatsChanged
+                return granted
+        except _SeatsChanged:
+            continue
+
+
+def release_seats(route_id, semester, count=1, promote=True):
+    """Atomically free seats on a route and promote waitlisted students into them
+
+    Pass promote=False when the seats belong to a semester that has ended.
+    """
+    if count <= 0:
+        return
+    with transaction.atomic():
+        released = RouteSeatCounter.objects.filter(
+            route_id=route_id, semester=semester, seats_taken__gte=count
+        ).update(seats_taken=F('seats_taken') - count, updated_at=timezone.now())
+        if not released:
+            # Never let the counter go negative
+            RouteSeatCounter.objects.filter(route_id=route_id, semester=semester).update(
+                seats_taken=0, updated_at=timezone.now()
+            )
+        if promote:
+            promote_waitlist(route_id, semester, count)
+
+
+def apply_status_counts(status_counts, old_status, new_status):
+    """Update seat counters for passes moving from old_status to new_status
+
+    status_counts is an iterable of (route_id, semester, count) tuples.
+    Approvals take their seats through allocate_seats and raise RouteFull
+    when the route has no room for them.
+    """
+    for route_id, semester, count in status_counts:
+        if new_status == 'approved' and old_status != 'approved':
+            if count > 0 and not allocate_seats([(route_id, [(route_id, semester)] * count)]):
+                raise RouteFull(route_id, semester)
+        elif old_status == 'approved' and new_status != 'approved':
+            release_seats(route_id, semester, count)
+
+
+def group_by_route_semester(queryset):
+    """Return (route_id, semester, count) tuples for a BusPass queryset"""
+    return queryset.order_by().values_list('route_id', 'semester').annotate(count=Count('id'))
+
+
+def add_to_waitlist(student, route, semester):
+    """Queue a student for a full route, ignoring repeated requests"""
+    entry, created = WaitlistEntry.objects.get_or_create(
+        student=student, route=route, semester=semester, promoted_at__isnull=True,
+    )
+    return entry, created
+
+
+def promote_waitlist(route_id, semester, count=1):
+    """Turn the oldest waitlist entries for a route into pending bus passes"""
+    promoted = []
+    with transaction.atomic():
+        entries = (
+            WaitlistEntry.objects.select_for_update()
+            .filter(route_id=route_id, semester=semester, promoted_at__isnull=True)
+            .select_related('student', 'route')
+        )
+        for entry in entries:
+            if len(promoted) >= count:
+                break
+            entry.promoted_at = timezone.now()
+            has_active_pass = BusPass.objects.filter(
+                student=entry.student, route_id=route_id, semester=semester, status__in=['pending', 'approved']
+            ).exists()
+            if has_active_pass:
+                # The student got a pass some other way; close the entry without using the seat
+                entry.save(update_fields=['promoted_at'])
+                continue
+            bus_pass = BusPass.objects.create(
+                student=entry.student,
+                route=entry.route,
+                semester=semester,
+                expiry_date=get_semester_expiry_date(semester),
+                status='pending',
+            )
+            generate_qr_code(bus_pass)
+            entry.promoted_pass = bus_pass
+            entry.save(update_fields=['promoted_pass', 'promoted_at'])
+            promoted.append(bus_pass)
+    return promoted
+
+
+def rebuild_seat_counters():
+    """Recompute every seat counter from the approved bus passes"""
+    with transaction.atomic():
+        RouteSeatCounter.objects.all().update(seats_taken=0)
+        approved = group_by_route_semester(BusPass.objects.filter(status='approved'))
+        for route_id, semester, count in approved:
+            RouteSeatCounter.objects.update_or_create(
+                route_id=route_id, semester=semester, defaults={'seats_taken': count}
+            )
+
+
+def is_route_full(route, semester):
+    return get_seats_available(route, semester) <= 0
+
@@ -0,0 +1,49 @@
+from .models import Route, RoutePrice
+from .caching import bump_versions_on_commit, get_or_compute, get_version
+from .tenancy import get_current_tenant, get_tenant_cache, get_tenant_key
+
+CATALOG_NAMESPACE = 'catalog'
+# Rendered route fragments and the price map are cached under the catalog version,
+# so they can live long; a Route or RoutePrice change moves the version on
+CATALOG_CACHE_TIMEOUT = 60 * 60
+
+
+def get_catalog_version():
+    """Return the current tenant's catalog version
+
+    The version starts with the tenant slug, so everything keyed on it (the
+    price caches, template fragments, ETags) is kept apart per campus.
+    """
+    return get_version(CATALOG_NAMESPACE, get_tenant_cache(), get_tenant_key())
+
+
+def bump_catalog_version(tenant=None):
+    """Move the catalog version of tenant (the current one by default) on once the change commits
+
+    The unscoped catalog used outside requests spans every campus, so its
+    version moves with each of them.
+    """
+    tenant = tenant or get_current_tenant()
+    bump_versions_on_commit([CATALOG_NAMESPACE])
+    if tenant is not None:
+        bump_versions_on_commit([CATALOG_NAMESPACE], get_tenant_cache(tenant), tenant.slug)
+
+
+def get_active_routes():
+    """Active routes with their prices prefetched, for rendering the route catalog"""
+    return Route.objects.filter(is_active=True).prefetch_related('prices')
+
+
+def get_price_map(version=None):
+    """Return {route_id: {semester: price}} for active routes, cached per catalog version"""
+    def build():
+        price_map = {}
+        prices = RoutePrice.objects.filter(route__is_active=True).values_list('route_id', 'semester', 'price')
+        for route_id, semester, price in prices:
+            price_map.setdefault(str(route_id), {})[semester] = str(price)
+        return price_map
+
+    return get_or_compute(
+        CATALOG_NAMESPACE, 'price_map', build, CATALOG_CACHE_TIMEOUT,
+        cache=get_tenant_cache(), version=version or get_catalog_version(),
+    )
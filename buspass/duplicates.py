@@ -0,0 +1,223 @@
+import hashlib
+import threading
+from django.db import transaction
+from .models import Student, BusPass, MultiSemesterBusPassApplication, ReceiptFingerprint
+from .thumbnails import receipt_is_image
+
+# Difference hashes of two photos of the same receipt differ in only a few of
+# their 64 bits; unrelated receipts differ in around half of them
+PERCEPTUAL_DISTANCE_THRESHOLD = 6
+HASH_SIZE = 8
+# Emptied BK-tree nodes tolerated before the per-process tree is rebuilt
+REBUILD_MIN_EMPTIED = 1000
+
+PASS_MODELS = {
+    'bus_pass': BusPass,
+    'multi_semester': MultiSemesterBusPassApplication,
+}
+
+
+def pass_type_of(obj):
+    return 'bus_pass' if isinstance(obj, BusPass) else 'multi_semester'
+
+
+def difference_hash(file):
+    """Return the 64-bit difference hash of an image file as 16 hex digits"""
+    from PIL import Image, ImageOps
+
+    image = Image.open(file)
+    image.draft('L', (HASH_SIZE * 8, HASH_SIZE * 8))
+    image = ImageOps.exif_transpose(image).convert('L').resize((HASH_SIZE + 1, HASH_SIZE), Image.LANCZOS)
+    pixels = list(image.getdata())
+    bits = 0
+    for row in range(HASH_SIZE):
+        for col in range(HASH_SIZE):
+            left = pixels[row * (HASH_SIZE + 1) + col]
+            right = pixels[row * (HASH_SIZE + 1) + col + 1]
+            bits = (bits << 1) | (left > right)
+    return f'{bits:016x}'
+
+
+def content_hash(file):
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: file.read(64 * 1024), b''):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hamming_distance(a, b):
+    return bin(int(a, 16) ^ int(b, 16)).count('1')
+
+
+class BKTree:
+    """Burkhard-Keller tree over hex hashes with Hamming distance
+
+    Each child edge is labelled with its distance to the parent, so a radius
+    query only descends into edges within radius of the query's distance to
+    the node (triangle inequality) and skips most of the tree. Removed items
+    leave their node behind as a signpost for its children; emptied counts
+    them so the owner can rebuild once they pile up.
+    """
+
+    def __init__(self):
+        self.root = None
+        self.size = 0
+        self.emptied = 0
+
+    def add(self, hash_value, item):
+        self.size += 1
+        if self.root is None:
+            self.root = (hash_value, [item], {})
+            return
+        node = self.root
+        while True:
+            distance = hamming_distance(hash_value, node[0])
+            if distance == 0:
+                if not node[1]:
+                    self.emptied -= 1
+                node[1].append(item)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = (hash_value, [item], {})
+                return
+            node = child
+
+    def remove(self, hash_value, item):
+        """Drop item from the node of hash_value, if it is there"""
+        node = self.root
+        while node is not None:
+            distance = hamming_distance(hash_value, node[0])
+            if distance == 0:
+                if item in node[1]:
+                    node[1].remove(item)
+                    self.size -= 1
+                    if not node[1]:
+                        self.emptied += 1
+                return
+            node = node[2].get(distance)
+
+    def search(self, hash_value, radius):
+        """Return (hash, item) pairs for the items stored under hashes within radius of hash_value"""
+        if self.root is None:
+            return []
+        matches = []
+        candidates = [self.root]
+        while candidates:
+            node_hash, items, children = candidates.pop()
+            distance = hamming_distance(hash_value, node_hash)
+            if distance <= radius:
+                matches.extend((node_hash, item) for item in items)
+            for edge, child in children.items():
+                if distance - radius <= edge <= distance + radius:
+                    candidates.append(child)
+        return matches
+
+
+class PerceptualHashIndex:
+    """Per-process BK-tree of perceptual receipt hashes
+
+    New rows are picked up by id above the last one seen. Rows deleted in
+    this process (a replaced receipt) are removed right away; rows deleted
+    by other processes are removed when a search runs into them. The tree
+    is rebuilt from the table once emptied nodes outnumber the live hashes.
+    """
+
+    def __init__(self):
+        self.tree = BKTree()
+        self.last_id = 0
+        self.lock = threading.Lock()
+
+    def refresh(self):
+        with self.lock:
+            # Shared by every campus; find_matching_fingerprints scopes the matches
+            rows = ReceiptFingerprint.unscoped.filter(hash_kind='perceptual', id__gt=self.last_id).order_by('id').values_list('id', 'hash')
+            for fingerprint_id, hash_value in rows.iterator():
+                self.tree.add(hash_value, fingerprint_id)
+                self.last_id = fingerprint_id
+
+    def discard(self, rows):
+        """Remove (id, hash) pairs of deleted fingerprints from the tree"""
+        with self.lock:
+            for fingerprint_id, hash_value in rows:
+                self.tree.remove(hash_value, fingerprint_id)
+            if self.tree.emptied > max(self.tree.size, REBUILD_MIN_EMPTIED):
+                self.tree = BKTree()
+                self.last_id = 0
+
+    def search(self, hash_value, radius=PERCEPTUAL_DISTANCE_THRESHOLD):
+        """Return {fingerprint id: hash} of the fingerprints within radius that still exist"""
+        self.refresh()
+        candidates = {fingerprint_id: node_hash for node_hash, fingerprint_id in self.tree.search(hash_value, radius)}
+        existing = set(ReceiptFingerprint.unscoped.filter(id__in=candidates).values_list('id', flat=True))
+        stale = [(fingerprint_id, node_hash) for fingerprint_id, node_hash in candidates.items() if fingerprint_id not in existing]
+        if stale:
+            self.discard(stale)
+        return {fingerprint_id: candidates[fingerprint_id] for fingerprint_id in existing}
+
+
+perceptual_index = PerceptualHashIndex()
+
+
+def find_matching_fingerprints(fingerprint):
+    """Return the other fingerprints of the same campus whose receipts match this one"""
+    if fingerprint.hash_kind == 'perceptual':
+        matches = ReceiptFingerprint.unscoped.filter(id__in=list(perceptual_index.search(fingerprint.hash)))
+    else:
+        matches = ReceiptFingerprint.unscoped.filter(hash_kind='content', hash=fingerprint.hash)
+    # Fingerprinting runs in background jobs too, where no tenant is set
+    matches = matches.filter(student__tenant=Student.unscoped.filter(pk=fingerprint.student_id).values('tenant')[:1])
+    # Passes issued from a multi-semester application share its receipt file; that's not a reuse
+    return matches.exclude(pk=fingerprint.pk).exclude(receipt=fingerprint.receipt)
+
+
+def refresh_duplicate_flags(fingerprints):
+    """Set or clear receipt_duplicate on the passes and applications behind fingerprints from their current matches"""
+    flags = {}
+    for fingerprint in fingerprints:
+        flags.setdefault(fingerprint.pass_type, {})[fingerprint.object_id] = find_matching_fingerprints(fingerprint).exists()
+    for pass_type, by_object in flags.items():
+        for flagged in (True, False):
+            ids = [object_id for object_id, value in by_object.items() if value is flagged]
+            PASS_MODELS[pass_type].objects.filter(pk__in=ids).exclude(receipt_duplicate=flagged).update(receipt_duplicate=flagged)
+
+
+def fingerprint_receipt(obj):
+    """Hash obj.payment_receipt, store the fingerprint and flag any matches
+
+    Images get a perceptual hash so re-saved or re-compressed screenshots
+    still match; PDFs get a SHA-256 of their content. A replaced receipt's
+    old matches are re-checked, so flags it alone caused are cleared.
+    Returns the matching fingerprints.
+    """
+    if not obj.payment_receipt:
+        return []
+    pass_type = pass_type_of(obj)
+    receipt_name = obj.payment_receipt.name
+    with obj.payment_receipt.open('rb') as receipt:
+        if receipt_is_image(obj):
+            hash_kind, hash_value = 'perceptual', difference_hash(receipt)
+        else:
+            hash_kind, hash_value = 'content', content_hash(receipt)
+
+    with transaction.atomic():
+        # A new upload replaces the fingerprint of the previous receipt
+        previous = list(ReceiptFingerprint.objects.filter(pass_type=pass_type, object_id=obj.pk))
+        previous_matches = [match for old in previous for match in find_matching_fingerprints(old)]
+        ReceiptFingerprint.objects.filter(pk__in=[old.pk for old in previous]).delete()
+        fingerprint = ReceiptFingerprint.objects.create(
+            pass_type=pass_type, object_id=obj.pk, student_id=obj.student_id,
+            receipt=receipt_name, hash_kind=hash_kind, hash=hash_value,
+        )
+    perceptual_index.discard((old.pk, old.hash) for old in previous if old.hash_kind == 'perceptual')
+    matches = list(find_matching_fingerprints(fingerprint))
+    refresh_duplicate_flags([fingerprint] + matches + previous_matches)
+    return matches
+
+
+def get_duplicate_receipts(obj):
+    """Return the fingerprints of other passes and applications whose receipt matches obj's"""
+    fingerprint = ReceiptFingerprint.objects.filter(pass_type=pass_type_of(obj), object_id=obj.pk).order_by('-id').first()
+    if fingerprint is None:
+        return []
+    return list(find_matching_fingerprints(fingerprint).select_related('student'))
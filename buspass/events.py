@@ -0,0 +1,185 @@
+import asyncio
+import json
+from collections import OrderedDict, deque
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.dispatch import Signal, receiver
+from django.urls import reverse
+from .models import BusPass, MultiSemesterBusPassApplication, PassAuditLog
+
+# Comment line sent to idle streams so proxies keep the connection open
+KEEPALIVE_INTERVAL = 15
+# How often a process looks for status changes made by other processes
+AUDIT_POLL_INTERVAL = 2
+# Events buffered for a subscriber that is not reading; older ones are dropped
+SUBSCRIBER_BUFFER = 16
+RECENT_EVENTS = 4096
+
+# Sent with rows=[(pass_type, object_id, student_id, status)] once a status change
+# is committed. Bulk updates skip post_save, so approvals.py sends it itself.
+pass_status_changed = Signal()
+
+
+def send_status_changes(rows):
+    """Send pass_status_changed for rows after the current transaction commits"""
+    rows = list(rows)
+    if rows:
+        transaction.on_commit(lambda: pass_status_changed.send(sender=None, rows=rows))
+
+
+def describe_status(pass_type, object_id, status):
+    model = BusPass if pass_type == 'bus_pass' else MultiSemesterBusPassApplication
+    event = {
+        'type': pass_type,
+        'id': str(object_id),
+        'status': status,
+        'status_display': dict(model.STATUS_CHOICES).get(status, status),
+    }
+    if pass_type == 'bus_pass' and status == 'approved':
+        event['download_url'] = reverse('download_bus_pass', args=[object_id])
+    return event
+
+
+def format_event(name, data):
+    return f'event: {name}\ndata: {json.dumps(data)}\n\n'
+
+
+class Subscriber:
+    """One open stream: a bounded buffer and a wake-up flag, nothing else"""
+    __slots__ = ('events', 'ready')
+
+    def __init__(self):
+        self.events = deque(maxlen=SUBSCRIBER_BUFFER)
+        self.ready = asyncio.Event()
+
+    def push(self, event):
+        self.events.append(event)
+        self.ready.set()
+
+
+class EventHub:
+    """In-process pub/sub of pass status changes, keyed by student
+
+    Subscribers live on the server's event loop; publish() may be called
+    from any thread (sync views and signal handlers run in a thread pool
+    under ASGI) and hands the event over with call_soon_threadsafe. While
+    anyone is subscribed, one task per process tails PassAuditLog so that
+    approvals made by other workers or processes reach this one too.
+    """
+
+    def __init__(self):
+        self.subscribers = {}
+        self.loop = None
+        self.poller = None
+        self.last_audit_id = None
+        # Status last published per object, so the signal and the audit tail
+        # don't push the same change twice
+        self.recent = OrderedDict()
+
+    def subscribe(self, student_id):
+        self.loop = asyncio.get_running_loop()
+        subscriber = Subscriber()
+        self.subscribers.setdefault(student_id, set()).add(subscriber)
+        if self.poller is None or self.poller.done():
+            self.poller = self.loop.create_task(self._tail_audit_log())
+        return subscriber
+
+    def unsubscribe(self, student_id, subscriber):
+        subscribers = self.subscribers.get(student_id)
+        if subscribers is None:
+            return
+        subscribers.discard(subscriber)
+        if not subscribers:
+            del self.subscribers[student_id]
+
+    def publish(self, rows):
+        """Queue (pass_type, object_id, student_id, status) rows for their students' streams"""
+        if self.loop is None or self.loop.is_closed():
+            return
+        rows = [row for row in rows if row[2] in self.subscribers]
+        if rows:
+            self.loop.call_soon_threadsafe(self._deliver, rows)
+
+    def _deliver(self, rows):
+        for pass_type, object_id, student_id, status in rows:
+            key = str(object_id)
+            if self.recent.get(key) == status:
+                continue
+            self.recent[key] = status
+            self.recent.move_to_end(key)
+            if len(self.recent) > RECENT_EVENTS:
+                self.recent.popitem(last=False)
+            event = describe_status(pass_type, object_id, status)
+            for subscriber in self.subscribers.get(student_id, ()):
+                subscriber.push(event)
+
+    async def _tail_audit_log(self):
+        while self.subscribers:
+            rows = await sync_to_async(self._read_audit_log)()
+            if rows:
+                self._deliver(rows)
+            await asyncio.sleep(AUDIT_POLL_INTERVAL)
+        self.poller = None
+
+    def _read_audit_log(self):
+        if self.last_audit_id is None:
+            # One poller serves every campus, so it reads past the tenant scoping
+            self.last_audit_id = PassAuditLog.unscoped.order_by('-id').values_list('id', flat=True).first() or 0
+            return []
+        logs = list(
+            PassAuditLog.unscoped.filter(id__gt=self.last_audit_id).order_by('id')
+            .values_list('id', 'pass_type', 'object_id')[:1000]
+        )
+        if not logs:
+            return []
+        self.last_audit_id = logs[-1][0]
+        rows = []
+        for pass_type, model in (('bus_pass', BusPass), ('multi_semester', MultiSemesterBusPassApplication)):
+            ids = {object_id for log_id, log_type, object_id in logs if log_type == pass_type}
+            if ids:
+                rows.extend(
+                    (pass_type, pk, student_id, status)
+                    for pk, student_id, status in model.unscoped.filter(pk__in=ids).values_list('pk', 'student_id', 'status')
+                )
+        return rows
+
+
+hub = EventHub()
+
+
+@receiver(pass_status_changed)
+def publish_status_changes(sender, rows, **kwargs):
+    hub.publish(rows)
+
+
+def get_student_statuses(student_id):
+    """Return the current status events of all of a student's passes and applications"""
+    passes = BusPass.objects.filter(student_id=student_id).values_list('pk', 'status')
+    applications = MultiSemesterBusPassApplication.objects.filter(student_id=student_id).values_list('pk', 'status')
+    return (
+        [describe_status('bus_pass', pk, status) for pk, status in passes]
+        + [describe_status('multi_semester', pk, status) for pk, status in applications]
+    )
+
+
+async def stream_status_events(student_id):
+    """Yield SSE text for a student: a snapshot first, then each status change
+
+    The generator holds a single Subscriber while it waits, so an idle
+    connection costs a deque, an asyncio.Event and this frame.
+    """
+    subscriber = hub.subscribe(student_id)
+    try:
+        yield 'retry: 5000\n\n'
+        yield format_event('snapshot', await sync_to_async(get_student_statuses)(student_id))
+        while True:
+            try:
+                await asyncio.wait_for(subscriber.ready.wait(), KEEPALIVE_INTERVAL)
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+                continue
+            subscriber.ready.clear()
+            while subscriber.events:
+                yield format_event('status', subscriber.events.popleft())
+    finally:
+        hub.unsubscribe(student_id, subscriber)
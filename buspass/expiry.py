@@ -0,0 +1,111 @@
+import os
+import zipfile
+from datetime import date
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from .models import BusPass, MultiSemesterBusPassApplication
+from .archive import archive_passes
+from .capacity import group_by_route_semester, release_seats
+from .summaries import refresh_student_summaries
+from .events import send_status_changes
+
+SWEEP_BATCH_SIZE = 1000
+MEDIA_FIELDS = ['qr_code', 'payment_receipt', 'receipt_thumbnail']
+
+
+def expire_passes(today=None, batch_size=SWEEP_BATCH_SIZE):
+    """Mark live passes whose expiry date has passed as expired; returns how many changed
+
+    Each batch is one UPDATE on a primary key list picked through the
+    (status, expiry_date) index. Seats of expired approved passes are freed
+    without promoting the waitlist, since their semester is over.
+    """
+    today = today or date.today()
+    total = 0
+    while True:
+        with transaction.atomic():
+            stale = BusPass.objects.filter(status__in=['pending', 'approved'], expiry_date__lt=today)
+            ids = list(stale.values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                break
+            batch = BusPass.objects.filter(pk__in=ids)
+            seat_counts = list(group_by_route_semester(batch.filter(status='approved')))
+            passes = list(batch.values_list('pk', 'student_id'))
+            batch.update(status='expired', updated_at=timezone.now())
+            for route_id, semester, count in seat_counts:
+                release_seats(route_id, semester, count, promote=False)
+            refresh_student_summaries({student_id for pk, student_id in passes})
+            send_status_changes(('bus_pass', pk, student_id, 'expired') for pk, student_id in passes)
+        total += len(ids)
+    return total
+
+
+def _has_media():
+    query = Q()
+    for field in MEDIA_FIELDS:
+        query |= ~Q(**{field: ''}) & Q(**{f'{field}__isnull': False})
+    return query
+
+
+def _shared_receipts(names):
+    # Passes issued from one multi-semester application share its receipt file;
+    # keep it while any of them (or a pending application) still needs it
+    live_passes = BusPass.objects.filter(payment_receipt__in=names).exclude(status='expired')
+    pending_applications = MultiSemesterBusPassApplication.objects.filter(payment_receipt__in=names, status='pending')
+    return set(live_passes.values_list('payment_receipt', flat=True)) | set(pending_applications.values_list('payment_receipt', flat=True))
+
+
+def purge_expired_media(mode='delete', batch_size=SWEEP_BATCH_SIZE):
+    """Delete (or zip into PASS_ARCHIVE_ROOT) the QR codes, receipts and thumbnails of expired passes
+
+    Returns the number of files removed from media storage.
+    """
+    if mode not in ('delete', 'archive'):
+        raise ValueError(f"Unknown media mode: {mode}")
+    archive = None
+    if mode == 'archive':
+        os.makedirs(settings.PASS_ARCHIVE_ROOT, exist_ok=True)
+        archive_path = os.path.join(settings.PASS_ARCHIVE_ROOT, f'expired-passes-{date.today():%Y}.zip')
+        archive = zipfile.ZipFile(archive_path, 'a', compression=zipfile.ZIP_STORED)
+
+    removed = 0
+    try:
+        while True:
+            rows = list(
+                BusPass.objects.filter(status='expired').filter(_has_media())
+                .values_list('pk', *MEDIA_FIELDS)[:batch_size]
+            )
+            if not rows:
+                break
+            ids = [row[0] for row in rows]
+            names = {name for row in rows for name in row[1:] if name}
+            keep = _shared_receipts(names)
+            for name in sorted(names - keep):
+                if not default_storage.exists(name):
+                    continue
+                if archive is not None and name not in archive.NameToInfo:
+                    # Receipts and QR codes are already compressed images or PDFs
+                    with default_storage.open(name, 'rb') as media_file:
+                        archive.writestr(name, media_file.read())
+                default_storage.delete(name)
+                removed += 1
+            # Approved or rejected applications whose receipt file is now gone
+            applications = MultiSemesterBusPassApplication.objects.filter(payment_receipt__in=names - keep).exclude(status='pending')
+            for thumbnail in applications.exclude(receipt_thumbnail='').values_list('receipt_thumbnail', flat=True):
+                if thumbnail:
+                    default_storage.delete(thumbnail)
+            with transaction.atomic():
+                BusPass.objects.filter(pk__in=ids).update(**{field: '' for field in MEDIA_FIELDS})
+                applications.update(payment_receipt='', receipt_thumbnail='')
+    finally:
+        if archive is not None:
+            archive.close()
+    return removed
+
+
+def archive_expired_passes(before, batch_size=SWEEP_BATCH_SIZE):
+    """Move expired passes whose expiry date is before the given date to ArchivedBusPass"""
+    return archive_passes(BusPass.objects.filter(status='expired', expiry_date__lt=before), batch_size)
@@ -0,0 +1,61 @@
+from django.apps import apps
+from django.db.models import CheckConstraint, Count, Q, UniqueConstraint
+
+AUDIT_SAMPLE_SIZE = 10
+
+
+def _check_violations(model, constraint):
+    # Rows the CHECK would refuse; NULLs pass a CHECK, as in the database
+    return model._base_manager.exclude(constraint.check).values_list('pk', flat=True)
+
+
+def _unique_violations(model, constraint):
+    rows = model._base_manager.all()
+    if constraint.condition is not None:
+        rows = rows.filter(constraint.condition)
+    not_null = Q(**{f'{field}__isnull': False for field in constraint.fields})
+    duplicates = (
+        rows.filter(not_null).values(*constraint.fields)
+        .annotate(rows=Count('pk')).filter(rows__gt=1).order_by()
+    )
+    return duplicates
+
+
+def get_constraints(app_label='buspass'):
+    """Yield (model, constraint) for every check and unique constraint declared on the app's models"""
+    for model in apps.get_app_config(app_label).get_models():
+        for constraint in model._meta.constraints:
+            # Expression-based unique constraints can't be grouped on plain fields
+            if isinstance(constraint, CheckConstraint) or (isinstance(constraint, UniqueConstraint) and constraint.fields):
+                yield model, constraint
+
+
+def audit_constraints(app_label='buspass', sample_size=AUDIT_SAMPLE_SIZE):
+    """Count the existing rows that break each declared constraint
+
+    Every constraint costs one aggregate query, whether or not the database
+    already enforces it, so this can run before a migration adds them.
+    Returns a list of {'model', 'constraint', 'violations', 'sample'} for the
+    constraints that are broken.
+    """
+    report = []
+    for model, constraint in get_constraints(app_label):
+        if isinstance(constraint, CheckConstraint):
+            rows = _check_violations(model, constraint)
+            count = rows.count()
+            sample = [str(pk) for pk in rows[:sample_size]] if count else []
+        else:
+            groups = _unique_violations(model, constraint)
+            count = sum(group['rows'] for group in groups)
+            sample = [
+                ', '.join(f'{field}={group[field]}' for field in constraint.fields)
+                for group in groups[:sample_size]
+            ] if count else []
+        if count:
+            report.append({
+                'model': model._meta.label,
+                'constraint': constraint.name,
+                'violations': count,
+                'sample': sample,
+            })
+    return report
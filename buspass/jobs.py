@@ -0,0 +1,204 @@
+import os
+import socket
+import time
+import traceback
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from .models import BusPass, MultiSemesterBusPassApplication, BackgroundJob, BackgroundJobItem
+from .approvals import approve_passes, reject_passes, approve_applications, reject_applications
+from .thumbnails import make_receipt_thumbnail
+from .duplicates import fingerprint_receipt
+from .tenancy import tenant_context
+
+# Items handled per transaction; progress is saved after every batch
+JOB_BATCH_SIZE = 200
+# A running job whose worker has not reported for this long is handed to another worker
+STALE_JOB_TIMEOUT = timedelta(minutes=5)
+
+
+def _approve_passes(user, object_ids):
+    approve_passes(BusPass.objects.filter(pk__in=object_ids), user)
+
+
+def _reject_passes(user, object_ids):
+    reject_passes(BusPass.objects.filter(pk__in=object_ids), user)
+
+
+def _approve_applications(user, object_ids):
+    approve_applications(MultiSemesterBusPassApplication.objects.filter(pk__in=object_ids), user)
+
+
+def _reject_applications(user, object_ids):
+    reject_applications(MultiSemesterBusPassApplication.objects.filter(pk__in=object_ids), user)
+
+
+def _process_receipts(queryset):
+    # Thumbnail for the review queue, then the fingerprint used for duplicate detection
+    for obj in queryset.select_related('student'):
+        make_receipt_thumbnail(obj)
+        fingerprint_receipt(obj)
+
+
+def _bus_pass_receipts(user, object_ids):
+    _process_receipts(BusPass.objects.filter(pk__in=object_ids))
+
+
+def _application_receipts(user, object_ids):
+    _process_receipts(MultiSemesterBusPassApplication.objects.filter(pk__in=object_ids))
+
+
+JOB_HANDLERS = {
+    'approve_passes': _approve_passes,
+    'reject_passes': _reject_passes,
+    'approve_applications': _approve_applications,
+    'reject_applications': _reject_applications,
+    'bus_pass_receipts': _bus_pass_receipts,
+    'application_receipts': _application_receipts,
+}
+
+
+def submit_job(kind, object_ids, user, tenant_id=None):
+    """Queue a job of the given kind over object_ids and return it
+
+    The job belongs to tenant_id, else to the current (or default) tenant,
+    and runs scoped to it.
+    """
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    object_ids = [str(object_id) for object_id in object_ids]
+    with transaction.atomic():
+        job = BackgroundJob.objects.create(kind=kind, submitted_by=user, total_items=len(object_ids), tenant_id=tenant_id)
+        BackgroundJobItem.objects.bulk_create(
+            [BackgroundJobItem(job=job, object_id=object_id) for object_id in object_ids],
+            batch_size=1000,
+        )
+    return job
+
+
+def queue_receipt_processing(obj):
+    """Queue thumbnailing and fingerprinting of a freshly uploaded receipt once the upload commits"""
+    kind = 'bus_pass_receipts' if isinstance(obj, BusPass) else 'application_receipts'
+    transaction.on_commit(lambda: submit_job(kind, [obj.pk], None, obj.tenant_id))
+
+
+def retry_failed_items(job):
+    """Requeue the failed items of a job; returns how many were requeued"""
+    with transaction.atomic():
+        requeued = job.items.filter(status='failed').update(status='pending', attempts=0, error='')
+        if requeued:
+            BackgroundJob.objects.filter(pk=job.pk).update(
+                status='queued', failed_items=F('failed_items') - requeued,
+                processed_items=F('processed_items') - requeued, finished_at=None, locked_by='',
+            )
+    return requeued
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def claim_job(worker):
+    """Atomically take the oldest queued (or abandoned) job of any campus, or return None"""
+    stale_before = timezone.now() - STALE_JOB_TIMEOUT
+    candidates = (
+        BackgroundJob.unscoped.filter(Q(status='queued') | Q(status='running', heartbeat_at__lt=stale_before))
+        .order_by('created_at').values_list('pk', flat=True)[:5]
+    )
+    for job_id in candidates:
+        now = timezone.now()
+        # The conditional UPDATE is the lock: only one worker sees a row count of 1
+        claimed = BackgroundJob.unscoped.filter(
+            Q(status='queued') | Q(status='running', heartbeat_at__lt=stale_before), pk=job_id,
+        ).update(status='running', locked_by=worker, heartbeat_at=now)
+        if claimed:
+            BackgroundJob.unscoped.filter(pk=job_id, started_at__isnull=True).update(started_at=now)
+            return BackgroundJob.unscoped.select_related('submitted_by', 'tenant').get(pk=job_id)
+    return None
+
+
+def _record_batch(job, worker, done_ids, failed_items):
+    """Save the outcome of one batch and bump the job's progress counters"""
+    failed_for_good = 0
+    with transaction.atomic():
+        if done_ids:
+            BackgroundJobItem.objects.filter(pk__in=done_ids).update(status='done', attempts=F('attempts') + 1)
+        for item, error in failed_items:
+            item.attempts += 1
+            item.error = error
+            if item.attempts >= job.max_attempts:
+                item.status = 'failed'
+                failed_for_good += 1
+            item.save(update_fields=['attempts', 'error', 'status'])
+        BackgroundJob.objects.filter(pk=job.pk, locked_by=worker).update(
+            processed_items=F('processed_items') + len(done_ids) + failed_for_good,
+            failed_items=F('failed_items') + failed_for_good,
+            heartbeat_at=timezone.now(),
+        )
+
+
+def run_job(job, worker, batch_size=JOB_BATCH_SIZE):
+    """Process the pending items of a claimed job in batches until none are left
+
+    Items are handled in the job's tenant, so cache invalidations reach that
+    campus's cache and its rows are the only ones touched.
+    """
+    with tenant_context(job.tenant):
+        _run_job(job, worker, batch_size)
+
+
+def _run_job(job, worker, batch_size):
+    handler = JOB_HANDLERS.get(job.kind)
+    if handler is None:
+        BackgroundJob.objects.filter(pk=job.pk).update(
+            status='failed', error=f"Unknown job kind: {job.kind}", finished_at=timezone.now()
+        )
+        return
+
+    last_item_id = 0
+    while True:
+        items = list(
+            job.items.filter(status='pending', id__gt=last_item_id).order_by('id')[:batch_size]
+        )
+        if not items:
+            break
+        last_item_id = items[-1].id
+
+        object_ids = [item.object_id for item in items]
+        try:
+            handler(job.submitted_by, object_ids)
+            done_ids, failed_items = [item.id for item in items], []
+        except Exception:
+            # Run the batch one item at a time so a single bad row doesn't fail the rest
+            done_ids, failed_items = [], []
+            for item in items:
+                try:
+                    handler(job.submitted_by, [item.object_id])
+                    done_ids.append(item.id)
+                except Exception:
+                    failed_items.append((item, traceback.format_exc(limit=5)))
+        _record_batch(job, worker, done_ids, failed_items)
+
+        if failed_items and any(item.status == 'pending' for item, error in failed_items):
+            # Items with attempts left are picked up again on the next pass
+            last_item_id = 0
+
+    job.refresh_from_db()
+    status = 'failed' if job.total_items and job.failed_items == job.total_items else 'completed'
+    BackgroundJob.objects.filter(pk=job.pk, locked_by=worker).update(status=status, finished_at=timezone.now())
+
+
+def work(worker=None, once=False, poll_interval=2.0, batch_size=JOB_BATCH_SIZE):
+    """Worker loop: claim and run jobs; with once=True stop when the queue is empty"""
+    worker = worker or worker_name()
+    processed = 0
+    while True:
+        job = claim_job(worker)
+        if job is None:
+            if once:
+                return processed
+            time.sleep(poll_interval)
+            continue
+        run_job(job, worker, batch_size=batch_size)
+        processed += 1
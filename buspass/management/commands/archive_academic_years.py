@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from buspass.archive import ARCHIVE_BATCH_SIZE, archive_academic_years, current_academic_year
+
+
+class Command(BaseCommand):
+    help = 'Move finished passes and applications of past academic years into the archive tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--before-year', type=int,
+            help='Archive academic years before this one (default: the current year)',
+        )
+        parser.add_argument('--batch-size', type=int, default=ARCHIVE_BATCH_SIZE, help='Rows moved per transaction')
+
+    def handle(self, *args, **options):
+        before_year = options['before_year'] or current_academic_year()
+        passes, applications = archive_academic_years(before_year, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {passes} passes and {applications} multi-semester applications from before {before_year}.'
+        ))
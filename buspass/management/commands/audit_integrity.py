@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+from buspass.integrity import audit_constraints, get_constraints, AUDIT_SAMPLE_SIZE
+
+
+class Command(BaseCommand):
+    help = 'Report existing rows that break the check and unique constraints of the buspass models'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sample-size', type=int, default=AUDIT_SAMPLE_SIZE, help='Offending rows listed per constraint')
+
+    def handle(self, *args, **options):
+        checked = sum(1 for constraint in get_constraints())
+        report = audit_constraints(sample_size=options['sample_size'])
+        for entry in report:
+            self.stdout.write(f"{entry['model']} {entry['constraint']}: {entry['violations']} rows")
+            for row in entry['sample']:
+                self.stdout.write(f'  {row}')
+        if report:
+            raise CommandError(f'{len(report)} of {checked} constraints are violated by existing rows.')
+        self.stdout.write(self.style.SUCCESS(f'All {checked} constraints hold.'))
@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from buspass.caching import get_metrics, reset_metrics
+
+
+class Command(BaseCommand):
+    help = 'Show cache hits, misses and recomputes per namespace, summed over all workers sharing the cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Zero the counters after printing them')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Backend: {settings.CACHES['default']['BACKEND']} ({settings.CACHE_BACKEND})")
+        metrics = get_metrics()
+        if not metrics:
+            self.stdout.write('No cache activity recorded yet.')
+        for namespace, counts in metrics.items():
+            lookups = counts['hits'] + counts['misses']
+            hit_ratio = f"{100 * counts['hits'] / lookups:.1f}%" if lookups else '-'
+            self.stdout.write(
+                f"{namespace}: {counts['hits']} hits, {counts['misses']} misses ({hit_ratio} hit), "
+                f"{counts['computes']} recomputed, {counts['waits']} served by another recompute"
+            )
+        if options['reset']:
+            reset_metrics()
+            self.stdout.write(self.style.SUCCESS('Counters reset.'))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from buspass.jobs import worker_name
+from buspass.notifications import NOTIFICATION_BATCH_SIZE, dispatch
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued pass status notifications over the configured channels'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Exit when no notification is due')
+        parser.add_argument('--batch-size', type=int, default=NOTIFICATION_BATCH_SIZE, help='Students per batch')
+        parser.add_argument('--poll-interval', type=float, default=5.0, help='Seconds to wait when the outbox is empty')
+
+    def handle(self, *args, **options):
+        sent, failed = dispatch(
+            worker_name(), once=options['once'], poll_interval=options['poll_interval'], batch_size=options['batch_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'Sent {sent} messages; {failed} failed and will be retried.'))
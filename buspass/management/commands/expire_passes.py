@@ -0,0 +1,38 @@
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from buspass.expiry import SWEEP_BATCH_SIZE, expire_passes, purge_expired_media, archive_expired_passes
+
+
+class Command(BaseCommand):
+    help = 'Mark passes past their expiry date as expired, purge their media files and archive old rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=date.fromisoformat, help='Treat this day (YYYY-MM-DD) as today')
+        parser.add_argument('--batch-size', type=int, default=SWEEP_BATCH_SIZE, help='Rows per UPDATE')
+        parser.add_argument(
+            '--media', choices=['keep', 'delete', 'archive'], default='keep',
+            help='What to do with the QR codes and receipts of expired passes',
+        )
+        parser.add_argument(
+            '--archive-after-days', type=int,
+            help='Move expired passes to the archive table this many days after they expired',
+        )
+
+    def handle(self, *args, **options):
+        today = options['date'] or date.today()
+        batch_size = options['batch_size']
+        if batch_size <= 0:
+            raise CommandError('--batch-size must be positive')
+
+        expired = expire_passes(today, batch_size=batch_size)
+        self.stdout.write(f'Marked {expired} passes as expired.')
+
+        if options['media'] != 'keep':
+            removed = purge_expired_media(options['media'], batch_size=batch_size)
+            self.stdout.write(f'Removed {removed} media files ({options["media"]}).')
+
+        if options['archive_after_days'] is not None:
+            archived = archive_expired_passes(today - timedelta(days=options['archive_after_days']), batch_size=batch_size)
+            self.stdout.write(f'Moved {archived} expired passes to the archive table.')
+
+        self.stdout.write(self.style.SUCCESS('Expiry sweep finished.'))
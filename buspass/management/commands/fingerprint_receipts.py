@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Exists, OuterRef
+from buspass.duplicates import fingerprint_receipt, pass_type_of
+from buspass.models import BusPass, MultiSemesterBusPassApplication, ReceiptFingerprint
+
+
+class Command(BaseCommand):
+    help = 'Fingerprint uploaded receipts that have no fingerprint yet and flag duplicates'
+
+    def handle(self, *args, **options):
+        total = flagged = 0
+        for model in (MultiSemesterBusPassApplication, BusPass):
+            pass_type = pass_type_of(model())
+            fingerprinted = ReceiptFingerprint.objects.filter(pass_type=pass_type, object_id=OuterRef('pk'))
+            queryset = (
+                model.objects.exclude(payment_receipt='').exclude(payment_receipt__isnull=True)
+                .filter(~Exists(fingerprinted)).order_by('created_at')
+            )
+            for obj in queryset.iterator():
+                total += 1
+                flagged += bool(fingerprint_receipt(obj))
+        self.stdout.write(self.style.SUCCESS(f'Fingerprinted {total} receipts; {flagged} matched an earlier receipt.'))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from buspass.models import BusPass, MultiSemesterBusPassApplication
+from buspass.thumbnails import make_receipt_thumbnails
+
+
+class Command(BaseCommand):
+    help = 'Generate review thumbnails for uploaded receipts that do not have one yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pending-only', action='store_true', help='Only receipts of passes and applications awaiting review')
+
+    def handle(self, *args, **options):
+        total = 0
+        for model in (BusPass, MultiSemesterBusPassApplication):
+            queryset = model.objects.exclude(payment_receipt='').exclude(payment_receipt__isnull=True).filter(
+                Q(receipt_thumbnail='') | Q(receipt_thumbnail__isnull=True)
+            )
+            if options['pending_only']:
+                queryset = queryset.filter(status='pending')
+            total += make_receipt_thumbnails(queryset)
+        self.stdout.write(self.style.SUCCESS(f'Generated {total} receipt thumbnails.'))
@@ -0,0 +1,39 @@
+import csv
+import sys
+import uuid
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from buspass.ridership import record_scans, SCAN_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = 'Append boarding scans from a CSV file with pass_id, scanned_at and an optional accepted column'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV file exported by the scanners; "-" reads standard input')
+        parser.add_argument('--batch-size', type=int, default=SCAN_BATCH_SIZE)
+
+    def read_scans(self, rows):
+        for line, row in enumerate(rows, start=2):
+            try:
+                pass_id = uuid.UUID(row['pass_id'])
+                scanned_at = parse_datetime(row['scanned_at'])
+            except (KeyError, ValueError) as exc:
+                raise CommandError(f'Line {line}: {exc}')
+            if scanned_at is None:
+                raise CommandError(f"Line {line}: invalid scanned_at {row['scanned_at']!r}")
+            if timezone.is_naive(scanned_at):
+                scanned_at = timezone.make_aware(scanned_at)
+            accepted = row.get('accepted', '1').strip().lower() not in ('0', 'false', 'no', 'rejected')
+            yield pass_id, scanned_at, accepted
+
+    def handle(self, *args, **options):
+        scan_file = sys.stdin if options['path'] == '-' else open(options['path'], newline='', encoding='utf-8')
+        try:
+            # Batches stored before a bad line are kept; the log is append-only
+            total = record_scans(self.read_scans(csv.DictReader(scan_file)), options['batch_size'])
+        finally:
+            if scan_file is not sys.stdin:
+                scan_file.close()
+        self.stdout.write(self.style.SUCCESS(f'Recorded {total} scans.'))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from buspass.summaries import rebuild_all_summaries
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-student pass summaries shown on the student dashboard'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Students to rebuild per batch')
+
+    def handle(self, *args, **options):
+        total = rebuild_all_summaries(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt pass summaries for {total} students.'))
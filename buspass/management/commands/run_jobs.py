@@ -0,0 +1,36 @@
+import multiprocessing
+from django.core.management.base import BaseCommand
+from django.db import connections
+from buspass.jobs import JOB_BATCH_SIZE, work, worker_name
+
+
+def _work(once, poll_interval, batch_size):
+    # Each forked worker opens its own database connection
+    connections.close_all()
+    work(worker_name(), once=once, poll_interval=poll_interval, batch_size=batch_size)
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs (bulk approvals and rejections)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=1, help='Worker processes to run in parallel')
+        parser.add_argument('--once', action='store_true', help='Exit when the queue is empty')
+        parser.add_argument('--batch-size', type=int, default=JOB_BATCH_SIZE, help='Items per transaction')
+        parser.add_argument('--poll-interval', type=float, default=2.0, help='Seconds to wait when the queue is empty')
+
+    def handle(self, *args, **options):
+        args = (options['once'], options['poll_interval'], options['batch_size'])
+        if options['workers'] <= 1:
+            processed = work(worker_name(), *args)
+            self.stdout.write(self.style.SUCCESS(f'Processed {processed} jobs.'))
+            return
+
+        # Don't share the parent's connection with the forked children
+        connections.close_all()
+        processes = [multiprocessing.Process(target=_work, args=args) for _ in range(options['workers'])]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        self.stdout.write(self.style.SUCCESS(f'{len(processes)} workers finished.'))
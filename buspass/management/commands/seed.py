@@ -0,0 +1,35 @@
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from buspass.models import Student
+from buspass.seeding import Seeder, DEFAULT_PASSWORD, SEED_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = 'Fill an empty database with a deterministic synthetic dataset for benchmarks and query-plan tests'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0, help='Random seed; the same seed gives the same rows')
+        parser.add_argument('--tenants', type=int, default=1, help='Campuses; the first is the default tenant')
+        parser.add_argument('--routes', type=int, default=40, help='Routes per campus')
+        parser.add_argument('--students', type=int, default=10000)
+        parser.add_argument('--passes', type=int, default=30000, help='Bus passes, spread over the students')
+        parser.add_argument('--applications', type=int, default=2000, help='Multi-semester applications')
+        parser.add_argument('--as-of', type=date.fromisoformat, default=None, help='Date the data is laid out around (default: today)')
+        parser.add_argument('--password', default=DEFAULT_PASSWORD, help='Password of every seeded student')
+        parser.add_argument('--batch-size', type=int, default=SEED_BATCH_SIZE, help='Rows per bulk INSERT batch')
+
+    def handle(self, *args, **options):
+        if Student.unscoped.exists():
+            raise CommandError('The database already has students; seed an empty one (e.g. after `manage.py flush`).')
+        if options['students'] < 1 or options['routes'] < 1 or options['tenants'] < 1:
+            raise CommandError('--students, --routes and --tenants must be at least 1.')
+        seeder = Seeder(
+            seed=options['seed'], tenants=options['tenants'], routes=options['routes'], students=options['students'],
+            passes=options['passes'], applications=options['applications'], as_of=options['as_of'],
+            password=options['password'], batch_size=options['batch_size'], log=self.stdout.write,
+        )
+        timings = seeder.run()
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {options['students']} students, {options['passes']} passes and "
+            f"{options['applications']} applications in {sum(timings.values()):.1f}s."
+        ))
@@ -0,0 +1,102 @@
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, HttpResponse, Http404
+from django.utils._os import safe_join
+from django.utils.http import http_date
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+# Generated QR codes, uploaded receipts and thumbnails never change once
+# written; a new upload is stored under a new name (thumbnails carry a hash
+# of their content)
+IMMUTABLE_CACHE_CONTROL = 'private, max-age=31536000, immutable'
+CHUNK_SIZE = 64 * 1024
+
+
+class RangeFileWrapper:
+    """Iterate over length bytes of a file starting at offset"""
+
+    def __init__(self, file, offset, length):
+        self.file = file
+        self.file.seek(offset)
+        self.remaining = length
+
+    def __iter__(self):
+        while self.remaining > 0:
+            data = self.file.read(min(CHUNK_SIZE, self.remaining))
+            if not data:
+                break
+            self.remaining -= len(data)
+            yield data
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """Return (start, end) for a single satisfiable byte range, or None"""
+    match = RANGE_RE.match(header.strip())
+    if not match or size == 0:
+        return None
+    start, end = match.groups()
+    if start == '' and end == '':
+        return None
+    if start == '':
+        # Suffix range: the last N bytes
+        start, end = max(size - int(end), 0), size - 1
+    else:
+        start = int(start)
+        end = min(int(end), size - 1) if end else size - 1
+    if start > end or start >= size:
+        return None
+    return start, end
+
+
+def serve_media_file(request, path, immutable=True):
+    """Stream a file from MEDIA_ROOT, offloading to the web server when configured
+
+    MEDIA_SENDFILE_BACKEND selects 'x-accel-redirect' (nginx), 'x-sendfile'
+    (Apache/lighttpd) or '' to stream with FileResponse, which lets the WSGI
+    server use sendfile() for whole-file responses and honours Range requests.
+    """
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404('Invalid path')
+    if not os.path.isfile(full_path):
+        raise Http404('File not found')
+
+    content_type, encoding = mimetypes.guess_type(full_path)
+    content_type = content_type or 'application/octet-stream'
+    backend = settings.MEDIA_SENDFILE_BACKEND
+
+    if backend == 'x-accel-redirect':
+        response = HttpResponse(content_type=content_type)
+        # nginx decodes the header as a URI, so names with spaces, '%' or '?' must be escaped
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_REDIRECT_PREFIX + quote(path)
+    elif backend == 'x-sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = full_path
+    else:
+        stat = os.stat(full_path)
+        byte_range = parse_range(request.headers.get('Range', ''), stat.st_size) if request.headers.get('Range') else None
+        if request.headers.get('Range') and byte_range is None:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{stat.st_size}'
+            return response
+        if byte_range:
+            start, end = byte_range
+            response = FileResponse(RangeFileWrapper(open(full_path, 'rb'), start, end - start + 1), content_type=content_type, status=206)
+            response['Content-Length'] = str(end - start + 1)
+            response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+        else:
+            response = FileResponse(open(full_path, 'rb'), content_type=content_type)
+        response['Last-Modified'] = http_date(stat.st_mtime)
+        response['Accept-Ranges'] = 'bytes'
+
+    if immutable:
+        response['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    return response
@@ -0,0 +1,67 @@
+# Generated by Django 4.2.27 on 2026-10-19 11:24
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_seat_counters(apps, schema_editor):
+    BusPass = apps.get_model('buspass', 'BusPass')
+    RouteSeatCounter = apps.get_model('buspass', 'RouteSeatCounter')
+    approved = (
+        BusPass.objects.filter(status='approved')
+        .order_by()
+        .values_list('route_id', 'semester')
+        .annotate(count=models.Count('id'))
+    )
+    RouteSeatCounter.objects.bulk_create([
+        RouteSeatCounter(route_id=route_id, semester=semester, seats_taken=count)
+        for route_id, semester, count in approved
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('buspass', '0005_route_arrival_time_at_destination_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='route',
+            name='capacity',
+            field=models.PositiveIntegerField(default=50, verbose_name='Seat Capacity'),
+        ),
+        migrations.CreateModel(
+            name='WaitlistEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('semester', models.CharField(choices=[('Semester-1', 'Semester-1'), ('Semester-2', 'Semester-2'), ('Semester-3', 'Semester-3'), ('Semester-4', 'Semester-4'), ('Semester-5', 'Semester-5'), ('Semester-6', 'Semester-6')], max_length=20)),
+                ('promoted_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('promoted_pass', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='waitlist_entry', to='buspass.buspass')),
+                ('route', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_entries', to='buspass.route')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_entries', to='buspass.student')),
+            ],
+            options={
+                'verbose_name': 'Waitlist Entry',
+                'verbose_name_plural': 'Waitlist Entries',
+                'ordering': ['created_at'],
+                'indexes': [models.Index(fields=['route', 'semester', 'promoted_at', 'created_at'], name='buspass_wai_route_i_2178cf_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='RouteSeatCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('semester', models.CharField(choices=[('Semester-1', 'Semester-1'), ('Semester-2', 'Semester-2'), ('Semester-3', 'Semester-3'), ('Semester-4', 'Semester-4'), ('Semester-5', 'Semester-5'), ('Semester-6', 'Semester-6')], max_length=20)),
+                ('seats_taken', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('route', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='seat_counters', to='buspass.route')),
+            ],
+            options={
+                'ordering': ['route', 'semester'],
+                'unique_together': {('route', 'semester')},
+            },
+        ),
+        migrations.RunPython(populate_seat_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.27 on 2026-10-19 11:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('buspass', '0006_route_capacity_and_waitlist'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='student',
+            name='fullname',
+            field=models.CharField(db_index=True, max_length=200),
+        ),
+        migrations.AddIndex(
+            model_name='buspass',
+            index=models.Index(fields=['-created_at'], name='buspass_bus_created_7653df_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='buspass',
+            index=models.Index(fields=['status', '-created_at'], name='buspass_bus_status_b33f1a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='buspass',
+            index=models.Index(fields=['issue_date'], name='buspass_bus_issue_d_24d0ea_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='multisemesterbuspassapplication',
+            index=models.Index(fields=['-created_at'], name='buspass_mul_created_5ad2e6_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='multisemesterbuspassapplication',
+            index=models.Index(fields=['status', '-created_at'], name='buspass_mul_status_1a7244_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='multisemesterbuspassapplication',
+            index=models.Index(fields=['issue_date'], name='buspass_mul_issue_d_260c26_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['created_at'], name='buspass_stu_created_40d54c_idx'),
+        ),
+    ]
@@ -0,0 +1,52 @@
+from django.db import migrations
+
+
+SQLITE_TRIGRAM_MIN_VERSION = (3, 34, 0)
+
+POSTGRES_TRIGRAM_INDEXES = {
+    'buspass_student_fullname_trgm': 'UPPER("fullname"::text) gin_trgm_ops',
+    'buspass_student_email_trgm': 'UPPER("email"::text) gin_trgm_ops',
+    'buspass_student_mobile_trgm': '("mobile"::text) gin_trgm_ops',
+    'buspass_student_aadhar_trgm': '("aadhar"::text) gin_trgm_ops',
+}
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        import sqlite3
+        if sqlite3.sqlite_version_info < SQLITE_TRIGRAM_MIN_VERSION:
+            # Older SQLite has no trigram tokenizer; search falls back to the ORM
+            return
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS buspass_student_search USING fts5("
+            "student_id UNINDEXED, fullname, mobile, email, aadhar, tokenize='trigram')"
+        )
+        schema_editor.execute(
+            "INSERT INTO buspass_student_search (student_id, fullname, mobile, email, aadhar) "
+            "SELECT id, fullname, mobile, email, aadhar FROM buspass_student"
+        )
+    elif connection.vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for name, expression in POSTGRES_TRIGRAM_INDEXES.items():
+            schema_editor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON buspass_student USING gin ({expression})')
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS buspass_student_search')
+    elif connection.vendor == 'postgresql':
+        for name in POSTGRES_TRIGRAM_INDEXES:
+            schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('buspass', '0007_admin_changelist_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
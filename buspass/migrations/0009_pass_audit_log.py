@@ -0,0 +1,34 @@
+# Generated by Django 4.2.27 on 2026-10-19 11:28
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('buspass', '0008_student_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PassAuditLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pass_type', models.CharField(choices=[('bus_pass', 'Bus Pass'), ('multi_semester', 'Multi-Semester Application')], max_length=20)),
+                ('object_id', models.UUIDField()),
+                ('action', models.CharField(choices=[('approved', 'Approved'), ('rejected', 'Rejected')], max_length=10)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('performed_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='pass_audit_logs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Pass Audit Log',
+                'verbose_name_plural': 'Pass Audit Log',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['created_at'], name='buspass_pas_created_0fa25b_idx'), models.Index(fields=['pass_type', 'object_id'], name='buspass_pas_pass_ty_d0119e_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.27 on 2026-10-19 11:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('buspass', '0009_pass_audit_log'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentPassSummary',
+            fields=[
+                ('student', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='pass_summary', serialize=False, to='buspass.student')),
+                ('total_passes', models.PositiveIntegerField(default=0)),
+                ('approved_passes', models.PositiveIntegerField(default=0)),
+                ('pending_passes', models.PositiveIntegerField(default=0)),
+                ('rejected_passes', models.PositiveIntegerField(default=0)),
+                ('total_applications', models.PositiveIntegerField(default=0)),
+                ('pending_applications', models.PositiveIntegerField(default=0)),
+                ('next_expiry', models.DateField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('current_pass', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='buspass.buspass')),
+            ],
+            options={
+                'verbose_name': 'Student Pass Summary',
+                'verbose_name_plural': 'Student Pass Summaries',
+            },
+        ),
+    ]
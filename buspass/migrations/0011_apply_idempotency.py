@@ -0,0 +1,59 @@
+# Generated by Django 4.2.27 on 2026-10-19 11:34
+
+from django.db import migrations, models
+
+
+def reject_duplicate_passes(apps, schema_editor):
+    # Double submissions left extra pending passes behind, and approving several
+    # semesters at once could issue the same approved pass twice; keep the
+    # approved (then oldest) pass per student, route and semester so the
+    # constraint can be added
+    BusPass = apps.get_model('buspass', 'BusPass')
+    RouteSeatCounter = apps.get_model('buspass', 'RouteSeatCounter')
+    seen = set()
+    duplicates = {'pending': [], 'approved': []}
+    active = BusPass.objects.filter(status__in=['pending', 'approved']).order_by('student_id', 'route_id', 'semester', 'status', 'created_at')
+    for pk, student_id, route_id, semester, status in active.values_list('pk', 'student_id', 'route_id', 'semester', 'status'):
+        key = (student_id, route_id, semester)
+        # 'approved' sorts before 'pending', so an approved pass is always the one kept
+        if key in seen:
+            duplicates[status].append(pk)
+        seen.add(key)
+    BusPass.objects.filter(pk__in=duplicates['pending']).update(status='rejected', notes='Rejected automatically: duplicate application')
+
+    # The seat counters counted every approved copy; free the seats of the extra ones
+    extra_approved = BusPass.objects.filter(pk__in=duplicates['approved'])
+    released = extra_approved.order_by().values_list('route_id', 'semester').annotate(count=models.Count('id'))
+    for route_id, semester, count in released:
+        RouteSeatCounter.objects.filter(route_id=route_id, semester=semester).update(
+            seats_taken=models.Case(
+                models.When(seats_taken__gte=count, then=models.F('seats_taken') - count),
+                default=0,
+            )
+        )
+    extra_approved.update(status='rejected', notes='Rejected automatically: duplicate of an approved pass')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('buspass', '0010_student_pass_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='buspass',
+            name='idempotency_key',
+            field=models.UUIDField(blank=True, editable=False, help_text='Key of the apply form submission that created this pass', null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='multisemesterbuspassapplication',
+            name='idempotency_key',
+            field=models.UUIDField(blank=True, editable=False, help_text='Key of the apply form submission that created this application', null=True, unique=True),
+        ),
+        migrations.RunPython(reject_duplicate_passes, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='buspass',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['pending', 'approved'])), fields=('student', 'route', 'semester'), name='unique_active_pass_per_semester'),
+        ),
+    ]
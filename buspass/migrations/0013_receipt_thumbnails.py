@@ -0,0 +1,24 @@
+# Generated by Django 4.2.27 on 2026-10-19 11:39
+
+import buspass.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('buspass', '0012_background_jobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='buspass',
+            name='receipt_thumbnail',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to=buspass.models.upload_receipt_thumbnail_path),
+        ),
+        migrations.AddField(
+            model_name='multisemesterbuspassapplication',
+            name='receipt_thumbnail',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to=buspass.models.upload_receipt_thumbnail_path),
+        ),
+    ]
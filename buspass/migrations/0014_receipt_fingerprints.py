@@ -0,0 +1,41 @@
+# Generated by Django 4.2.27 on 2026-10-19 11:41
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('buspass', '0013_receipt_thumbnails'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='buspass',
+            name='receipt_duplicate',
+            field=models.BooleanField(default=False, editable=False, help_text='The receipt matches one uploaded for another pass or application'),
+        ),
+        migrations.AddField(
+            model_name='multisemesterbuspassapplication',
+            name='receipt_duplicate',
+            field=models.BooleanField(default=False, editable=False, help_text='The receipt matches one uploaded for another pass or application'),
+        ),
+        migrations.CreateModel(
+            name='ReceiptFingerprint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pass_type', models.CharField(choices=[('bus_pass', 'Bus Pass'), ('multi_semester', 'Multi-Semester Application')], max_length=20)),
+                ('object_id', models.UUIDField()),
+                ('receipt', models.CharField(max_length=255)),
+                ('hash_kind', models.CharField(choices=[('perceptual', 'Perceptual (image)'), ('content', 'Content (SHA-256)')], max_length=10)),
+                ('hash', models.CharField(db_index=True, max_length=64)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='receipt_fingerprints', to='buspass.student')),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['pass_type', 'object_id'], name='buspass_rec_pass_ty_6d0402_idx'), models.Index(fields=['hash_kind', 'id'], name='buspass_rec_hash_ki_ecd717_idx')],
+            },
+        ),
+    ]
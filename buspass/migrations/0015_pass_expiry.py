@@ -0,0 +1,67 @@
+# Generated by Django 4.2.27 on 2026-10-19 11:43
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('buspass', '0014_receipt_fingerprints'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedBusPass',
+            fields=[
+                ('id', models.UUIDField(editable=False, primary_key=True, serialize=False)),
+                ('semester', models.CharField(choices=[('Semester-1', 'Semester-1'), ('Semester-2', 'Semester-2'), ('Semester-3', 'Semester-3'), ('Semester-4', 'Semester-4'), ('Semester-5', 'Semester-5'), ('Semester-6', 'Semester-6')], max_length=20)),
+                ('issue_date', models.DateField()),
+                ('expiry_date', models.DateField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('approved', 'Approved'), ('rejected', 'Rejected'), ('expired', 'Expired')], max_length=10)),
+                ('approved_at', models.DateTimeField(blank=True, null=True)),
+                ('notes', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Archived Bus Pass',
+                'verbose_name_plural': 'Archived Bus Passes',
+                'ordering': ['-expiry_date'],
+            },
+        ),
+        migrations.AlterField(
+            model_name='buspass',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('approved', 'Approved'), ('rejected', 'Rejected'), ('expired', 'Expired')], default='pending', max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='buspass',
+            index=models.Index(fields=['status', 'expiry_date'], name='buspass_bus_status_726f92_idx'),
+        ),
+        migrations.AddField(
+            model_name='archivedbuspass',
+            name='approved_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='archivedbuspass',
+            name='route',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='buspass.route'),
+        ),
+        migrations.AddField(
+            model_name='archivedbuspass',
+            name='student',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_bus_passes', to='buspass.student'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedbuspass',
+            index=models.Index(fields=['student', '-expiry_date'], name='buspass_arc_student_17744d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedbuspass',
+            index=models.Index(fields=['expiry_date'], name='buspass_arc_expiry__62e911_idx'),
+        ),
+    ]
@@ -0,0 +1,120 @@
+# Generated by Django 4.2.27 on 2026-10-19 11:47
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+ARCHIVE_TABLES = ['buspass_archivedbuspass', 'buspass_archivedmultisemesterapplication']
+
+
+def populate_academic_year(apps, schema_editor):
+    ArchivedBusPass = apps.get_model('buspass', 'ArchivedBusPass')
+    for year in ArchivedBusPass.objects.dates('expiry_date', 'year'):
+        ArchivedBusPass.objects.filter(expiry_date__year=year.year).update(academic_year=year.year)
+
+
+def partition_archive_tables(apps, schema_editor):
+    # PostgreSQL only: rebuild the archive tables as LIST partitioned tables on
+    # academic_year. A partitioned table's primary key has to include the
+    # partition column, so it becomes (id, academic_year). Nothing references
+    # the archive tables, so they can be swapped in place.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for table in ARCHIVE_TABLES:
+            cursor.execute(
+                "SELECT indexdef FROM pg_indexes WHERE tablename = %s AND indexname <> %s",
+                [table, f'{table}_pkey'],
+            )
+            index_sql = [row[0] for row in cursor.fetchall()]
+            cursor.execute(
+                "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+                "WHERE conrelid = %s::regclass AND contype = 'f'",
+                [table],
+            )
+            foreign_keys = cursor.fetchall()
+            cursor.execute(f'SELECT DISTINCT academic_year FROM {table}')
+            years = [row[0] for row in cursor.fetchall()]
+
+            cursor.execute(f'ALTER TABLE {table} RENAME TO {table}_unpartitioned')
+            cursor.execute(
+                f'CREATE TABLE {table} (LIKE {table}_unpartitioned INCLUDING DEFAULTS) '
+                f'PARTITION BY LIST (academic_year)'
+            )
+            cursor.execute(f'ALTER TABLE {table} ADD PRIMARY KEY (id, academic_year)')
+            cursor.execute(f'CREATE TABLE {table}_default PARTITION OF {table} DEFAULT')
+            for year in years:
+                cursor.execute(f'CREATE TABLE {table}_y{year} PARTITION OF {table} FOR VALUES IN ({int(year)})')
+            cursor.execute(f'INSERT INTO {table} SELECT * FROM {table}_unpartitioned')
+            cursor.execute(f'DROP TABLE {table}_unpartitioned')
+            # Index and constraint names are free again once the old table is gone
+            for sql in index_sql:
+                cursor.execute(sql)
+            for name, definition in foreign_keys:
+                cursor.execute(f'ALTER TABLE {table} ADD CONSTRAINT {name} {definition}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('buspass', '0015_pass_expiry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedMultiSemesterApplication',
+            fields=[
+                ('id', models.UUIDField(editable=False, primary_key=True, serialize=False)),
+                ('academic_year', models.PositiveSmallIntegerField(help_text='Calendar year the application was made')),
+                ('semesters', models.TextField()),
+                ('total_amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('issue_date', models.DateField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('approved', 'Approved'), ('rejected', 'Rejected')], max_length=10)),
+                ('approved_at', models.DateTimeField(blank=True, null=True)),
+                ('notes', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Archived Multi-Semester Application',
+                'verbose_name_plural': 'Archived Multi-Semester Applications',
+                'ordering': ['-issue_date'],
+            },
+        ),
+        migrations.AddField(
+            model_name='archivedbuspass',
+            name='academic_year',
+            field=models.PositiveSmallIntegerField(default=0, help_text='Calendar year of the pass expiry date'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(populate_academic_year, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='archivedbuspass',
+            index=models.Index(fields=['academic_year', 'student'], name='buspass_arc_academi_174220_idx'),
+        ),
+        migrations.AddField(
+            model_name='archivedmultisemesterapplication',
+            name='approved_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='archivedmultisemesterapplication',
+            name='route',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='buspass.route'),
+        ),
+        migrations.AddField(
+            model_name='archivedmultisemesterapplication',
+            name='student',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_multi_semester_applications', to='buspass.student'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedmultisemesterapplication',
+            index=models.Index(fields=['student', '-issue_date'], name='buspass_arc_student_7e4380_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedmultisemesterapplication',
+            index=models.Index(fields=['academic_year', 'student'], name='buspass_arc_academi_359979_idx'),
+        ),
+        migrations.RunPython(partition_archive_tables, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 4.2.27 on 2026-10-19 11:57
+
+from django.db import migrations, models
+import django.db.models.deletion
+import re
+
+
+def _normalize(text):
+    return ' '.join(re.findall(r'[a-z0-9]+', text.lower()))
+
+
+def link_student_routes(apps, schema_editor):
+    # route1 was typed in by hand: match it against the route name, the
+    # "source → destination (name)" label, or a source/destination only one route has
+    Route = apps.get_model('buspass', 'Route')
+    Student = apps.get_model('buspass', 'Student')
+    by_name = {}
+    by_endpoint = {}
+    for route_id, name, source, destination in Route.objects.values_list('id', 'name', 'source', 'destination'):
+        by_name[_normalize(name)] = route_id
+        for endpoint in {_normalize(source), _normalize(destination)}:
+            by_endpoint.setdefault(endpoint, set()).add(route_id)
+
+    for value in Student.objects.filter(route__isnull=True).exclude(route1='').values_list('route1', flat=True).distinct():
+        label = re.search(r'\(([^()]*)\)\s*$', value)
+        route_id = by_name.get(_normalize(value)) or (label and by_name.get(_normalize(label.group(1))))
+        if not route_id and len(by_endpoint.get(_normalize(value), ())) == 1:
+            route_id = next(iter(by_endpoint[_normalize(value)]))
+        if route_id:
+            Student.objects.filter(route1=value, route__isnull=True).update(route_id=route_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('buspass', '0017_notification_outbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='student',
+            name='route',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='students', to='buspass.route', verbose_name='Route'),
+        ),
+        migrations.AlterField(
+            model_name='student',
+            name='route1',
+            field=models.CharField(blank=True, max_length=100, verbose_name='Route (as entered)'),
+        ),
+        migrations.CreateModel(
+            name='RouteStop',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sequence', models.PositiveIntegerField(help_text='Position of the stop along the route, starting at 1')),
+                ('name', models.CharField(max_length=100)),
+                ('arrival_time', models.TimeField(verbose_name='Arrival Time')),
+                ('route', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stops', to='buspass.route')),
+            ],
+            options={
+                'verbose_name': 'Route Stop',
+                'verbose_name_plural': 'Route Stops',
+                'ordering': ['route', 'sequence'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='routestop',
+            constraint=models.UniqueConstraint(fields=('route', 'sequence'), name='unique_route_stop_sequence'),
+        ),
+        migrations.RunPython(link_student_routes, migrations.RunPython.noop),
+    ]
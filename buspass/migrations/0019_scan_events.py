@@ -0,0 +1,30 @@
+# Generated by Django 4.2.27 on 2026-10-19 12:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('buspass', '0018_route_stops'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScanEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pass_id', models.UUIDField()),
+                ('scanned_at', models.DateTimeField()),
+                ('accepted', models.BooleanField(default=True, help_text='False when the pass was refused at boarding')),
+                ('route', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='buspass.route')),
+            ],
+            options={
+                'verbose_name': 'Scan Event',
+                'verbose_name_plural': 'Scan Events',
+                'ordering': ['-scanned_at'],
+                'indexes': [models.Index(fields=['scanned_at'], name='buspass_sca_scanned_366c2d_idx'), models.Index(fields=['pass_id', 'scanned_at'], name='buspass_sca_pass_id_b8aef8_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,110 @@
+# Generated by Django 4.2.27 on 2026-10-19 12:03
+
+from django.db import migrations, models
+import json
+
+SEMESTERS = ['Semester-1', 'Semester-2', 'Semester-3', 'Semester-4', 'Semester-5', 'Semester-6']
+
+
+def normalize_application_semesters(apps, schema_editor):
+    # Rewrite stored selections in semester order and json.dumps spacing so the
+    # continuity check only rejects rows that really skip a semester
+    Application = apps.get_model('buspass', 'MultiSemesterBusPassApplication')
+    order = {semester: index for index, semester in enumerate(SEMESTERS)}
+    for pk, semesters in Application.objects.values_list('pk', 'semesters').iterator():
+        try:
+            selected = json.loads(semesters)
+        except ValueError:
+            continue
+        if not isinstance(selected, list):
+            continue
+        normalized = json.dumps(sorted(set(selected), key=lambda semester: order.get(semester, len(SEMESTERS))))
+        if normalized != semesters:
+            Application.objects.filter(pk=pk).update(semesters=normalized)
+
+
+def reject_duplicate_pending_applications(apps, schema_editor):
+    # Double submissions, and selections that only became equal once normalized,
+    # leave several pending applications for the same semesters; keep the oldest
+    Application = apps.get_model('buspass', 'MultiSemesterBusPassApplication')
+    seen = set()
+    duplicates = []
+    pending = Application.objects.filter(status='pending').order_by('student_id', 'route_id', 'semesters', 'created_at')
+    for pk, student_id, route_id, semesters in pending.values_list('pk', 'student_id', 'route_id', 'semesters'):
+        key = (student_id, route_id, semesters)
+        if key in seen:
+            duplicates.append(pk)
+        seen.add(key)
+    Application.objects.filter(pk__in=duplicates).update(status='rejected', notes='Rejected automatically: duplicate application')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('buspass', '0019_scan_events'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize_application_semesters, migrations.RunPython.noop),
+        migrations.RunPython(reject_duplicate_pending_applications, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='buspass',
+            constraint=models.CheckConstraint(check=models.Q(('semester__in', ['Semester-1', 'Semester-2', 'Semester-3', 'Semester-4', 'Semester-5', 'Semester-6'])), name='bus_pass_semester_valid'),
+        ),
+        migrations.AddConstraint(
+            model_name='buspass',
+            constraint=models.CheckConstraint(check=models.Q(('status__in', ['pending', 'approved', 'rejected', 'expired'])), name='bus_pass_status_valid'),
+        ),
+        migrations.AddConstraint(
+            model_name='multisemesterbuspassapplication',
+            constraint=models.CheckConstraint(check=models.Q(('status__in', ['pending', 'approved', 'rejected'])), name='application_status_valid'),
+        ),
+        migrations.AddConstraint(
+            model_name='multisemesterbuspassapplication',
+            constraint=models.CheckConstraint(check=models.Q(('semesters__in', ['["Semester-1"]', '["Semester-1", "Semester-2"]', '["Semester-1", "Semester-2", "Semester-3"]', '["Semester-1", "Semester-2", "Semester-3", "Semester-4"]', '["Semester-1", "Semester-2", "Semester-3", "Semester-4", "Semester-5"]', '["Semester-1", "Semester-2", "Semester-3", "Semester-4", "Semester-5", "Semester-6"]', '["Semester-2"]', '["Semester-2", "Semester-3"]', '["Semester-2", "Semester-3", "Semester-4"]', '["Semester-2", "Semester-3", "Semester-4", "Semester-5"]', '["Semester-2", "Semester-3", "Semester-4", "Semester-5", "Semester-6"]', '["Semester-3"]', '["Semester-3", "Semester-4"]', '["Semester-3", "Semester-4", "Semester-5"]', '["Semester-3", "Semester-4", "Semester-5", "Semester-6"]', '["Semester-4"]', '["Semester-4", "Semester-5"]', '["Semester-4", "Semester-5", "Semester-6"]', '["Semester-5"]', '["Semester-5", "Semester-6"]', '["Semester-6"]'])), name='application_semesters_continuous'),
+        ),
+        migrations.AddConstraint(
+            model_name='multisemesterbuspassapplication',
+            constraint=models.CheckConstraint(check=models.Q(('total_amount__gte', 0)), name='application_total_not_negative'),
+        ),
+        migrations.AddConstraint(
+            model_name='multisemesterbuspassapplication',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'pending')), fields=('student', 'route', 'semesters'), name='unique_pending_application'),
+        ),
+        migrations.AddConstraint(
+            model_name='route',
+            constraint=models.CheckConstraint(check=models.Q(('driver_contact__regex', '^[0-9]{10,15}$')), name='route_driver_contact_digits'),
+        ),
+        migrations.AddConstraint(
+            model_name='routeprice',
+            constraint=models.CheckConstraint(check=models.Q(('semester__in', ['Semester-1', 'Semester-2', 'Semester-3', 'Semester-4', 'Semester-5', 'Semester-6'])), name='route_price_semester_valid'),
+        ),
+        migrations.AddConstraint(
+            model_name='routeprice',
+            constraint=models.CheckConstraint(check=models.Q(('price__gte', 0)), name='route_price_not_negative'),
+        ),
+        migrations.AddConstraint(
+            model_name='routeseatcounter',
+            constraint=models.CheckConstraint(check=models.Q(('semester__in', ['Semester-1', 'Semester-2', 'Semester-3', 'Semester-4', 'Semester-5', 'Semester-6'])), name='seat_counter_semester_valid'),
+        ),
+        migrations.AddConstraint(
+            model_name='routestop',
+            constraint=models.CheckConstraint(check=models.Q(('sequence__gte', 1)), name='route_stop_sequence_from_1'),
+        ),
+        migrations.AddConstraint(
+            model_name='student',
+            constraint=models.CheckConstraint(check=models.Q(('aadhar__regex', '^[0-9]{12}$')), name='student_aadhar_12_digits'),
+        ),
+        migrations.AddConstraint(
+            model_name='student',
+            constraint=models.CheckConstraint(check=models.Q(('mobile__regex', '^[0-9]{10}$')), name='student_mobile_10_digits'),
+        ),
+        migrations.AddConstraint(
+            model_name='waitlistentry',
+            constraint=models.CheckConstraint(check=models.Q(('semester__in', ['Semester-1', 'Semester-2', 'Semester-3', 'Semester-4', 'Semester-5', 'Semester-6'])), name='waitlist_semester_valid'),
+        ),
+        migrations.AddConstraint(
+            model_name='waitlistentry',
+            constraint=models.UniqueConstraint(condition=models.Q(('promoted_at__isnull', True)), fields=('student', 'route', 'semester'), name='unique_open_waitlist_entry'),
+        ),
+    ]
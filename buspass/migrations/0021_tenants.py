@@ -0,0 +1,153 @@
+# Generated by Django 4.2.27 on 2026-10-19 12:07
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Tables that gain a tenant, in the order their tenant is filled in: prices
+# and passes copy it from their route or student
+TENANT_TABLES = ['Student', 'Route', 'RoutePrice', 'MultiSemesterBusPassApplication', 'BusPass']
+
+
+def assign_default_tenant(apps, schema_editor):
+    # Everything that exists so far belongs to the one campus this deployment served
+    Tenant = apps.get_model('buspass', 'Tenant')
+    tenant, created = Tenant.objects.get_or_create(slug=settings.DEFAULT_TENANT_SLUG, defaults={'name': settings.DEFAULT_TENANT_SLUG.title()})
+    for model_name in TENANT_TABLES:
+        apps.get_model('buspass', model_name).objects.filter(tenant__isnull=True).update(tenant=tenant)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('buspass', '0020_integrity_constraints'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tenant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('slug', models.SlugField(help_text='Used in cache names and keys', unique=True)),
+                ('domain', models.CharField(blank=True, help_text='Host name students and staff use for this campus', max_length=255, null=True, unique=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='buspass',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='buspass.tenant'),
+        ),
+        migrations.AddField(
+            model_name='multisemesterbuspassapplication',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='buspass.tenant'),
+        ),
+        migrations.AddField(
+            model_name='route',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='buspass.tenant'),
+        ),
+        migrations.AddField(
+            model_name='routeprice',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='buspass.tenant'),
+        ),
+        migrations.AddField(
+            model_name='student',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='buspass.tenant'),
+        ),
+        migrations.RunPython(assign_default_tenant, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='student',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='buspass.tenant'),
+        ),
+        migrations.AlterField(
+            model_name='route',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='buspass.tenant'),
+        ),
+        migrations.AlterField(
+            model_name='routeprice',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='buspass.tenant'),
+        ),
+        migrations.AlterField(
+            model_name='multisemesterbuspassapplication',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='buspass.tenant'),
+        ),
+        migrations.AlterField(
+            model_name='buspass',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='buspass.tenant'),
+        ),
+        migrations.RemoveIndex(
+            model_name='buspass',
+            name='buspass_bus_created_7653df_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='buspass',
+            name='buspass_bus_status_b33f1a_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='multisemesterbuspassapplication',
+            name='buspass_mul_created_5ad2e6_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='multisemesterbuspassapplication',
+            name='buspass_mul_status_1a7244_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='student',
+            name='buspass_stu_created_40d54c_idx',
+        ),
+        migrations.AlterField(
+            model_name='route',
+            name='name',
+            field=models.CharField(max_length=100),
+        ),
+        migrations.AddIndex(
+            model_name='buspass',
+            index=models.Index(fields=['tenant', '-created_at'], name='buspass_bus_tenant__79ad45_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='buspass',
+            index=models.Index(fields=['tenant', 'status', '-created_at'], name='buspass_bus_tenant__49525c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='multisemesterbuspassapplication',
+            index=models.Index(fields=['tenant', '-created_at'], name='buspass_mul_tenant__9766eb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='multisemesterbuspassapplication',
+            index=models.Index(fields=['tenant', 'status', '-created_at'], name='buspass_mul_tenant__6fae34_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='route',
+            index=models.Index(fields=['tenant', 'is_active', 'name'], name='buspass_rou_tenant__266e29_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='routeprice',
+            index=models.Index(fields=['tenant', 'route', 'semester'], name='buspass_rou_tenant__2e59a1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['tenant', 'created_at'], name='buspass_stu_tenant__947bbc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['tenant', 'id'], name='buspass_stu_tenant__640e16_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='route',
+            constraint=models.UniqueConstraint(fields=('tenant', 'name'), name='unique_route_name_per_tenant'),
+        ),
+    ]
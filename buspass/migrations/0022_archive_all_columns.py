@@ -0,0 +1,92 @@
+# Generated by Django 4.2.27 on 2026-10-19 12:55
+
+import buspass.models
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('buspass', '0021_tenants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedbuspass',
+            name='idempotency_key',
+            field=models.UUIDField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='archivedbuspass',
+            name='payment_receipt',
+            field=models.FileField(blank=True, null=True, upload_to=buspass.models.upload_pass_receipt_path),
+        ),
+        migrations.AddField(
+            model_name='archivedbuspass',
+            name='qr_code',
+            field=models.ImageField(blank=True, null=True, upload_to='qr_codes/'),
+        ),
+        migrations.AddField(
+            model_name='archivedbuspass',
+            name='receipt_duplicate',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='archivedbuspass',
+            name='receipt_thumbnail',
+            field=models.ImageField(blank=True, null=True, upload_to=buspass.models.upload_receipt_thumbnail_path),
+        ),
+        migrations.AddField(
+            model_name='archivedbuspass',
+            name='rejected_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='archivedbuspass',
+            name='rejected_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='archivedbuspass',
+            name='updated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='archivedmultisemesterapplication',
+            name='idempotency_key',
+            field=models.UUIDField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='archivedmultisemesterapplication',
+            name='payment_receipt',
+            field=models.FileField(blank=True, null=True, upload_to=buspass.models.upload_pass_receipt_path),
+        ),
+        migrations.AddField(
+            model_name='archivedmultisemesterapplication',
+            name='receipt_duplicate',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='archivedmultisemesterapplication',
+            name='receipt_thumbnail',
+            field=models.ImageField(blank=True, null=True, upload_to=buspass.models.upload_receipt_thumbnail_path),
+        ),
+        migrations.AddField(
+            model_name='archivedmultisemesterapplication',
+            name='rejected_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='archivedmultisemesterapplication',
+            name='rejected_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='archivedmultisemesterapplication',
+            name='updated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
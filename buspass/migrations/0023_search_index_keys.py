@@ -0,0 +1,62 @@
+import hashlib
+from django.db import migrations
+
+SEARCH_TABLE = 'buspass_student_search'
+
+# icontains compiles to UPPER(col::text) LIKE UPPER(...), so the index must be
+# on the same expression to be used
+POSTGRES_TRIGRAM_INDEXES = {
+    'buspass_student_mobile_trgm': ('("mobile"::text) gin_trgm_ops', 'UPPER("mobile"::text) gin_trgm_ops'),
+    'buspass_student_aadhar_trgm': ('("aadhar"::text) gin_trgm_ops', 'UPPER("aadhar"::text) gin_trgm_ops'),
+}
+
+
+def search_rowid(student_id):
+    # Frozen copy of buspass.search.search_rowid
+    return int.from_bytes(hashlib.blake2b(student_id.encode(), digest_size=8).digest(), 'big') >> 1
+
+
+def rekey_search_rows(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite' or SEARCH_TABLE not in connection.introspection.table_names():
+        return
+    Student = apps.get_model('buspass', 'Student')
+    rows = [
+        (search_rowid(row[0]),) + row
+        for row in Student.objects.order_by().values_list('id', 'fullname', 'mobile', 'email', 'aadhar').iterator()
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+        cursor.executemany(
+            f'INSERT INTO {SEARCH_TABLE} (rowid, student_id, fullname, mobile, email, aadhar) VALUES (%s, %s, %s, %s, %s, %s)',
+            rows,
+        )
+
+
+def replace_trigram_indexes(schema_editor, new):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, expressions in POSTGRES_TRIGRAM_INDEXES.items():
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+        schema_editor.execute(f'CREATE INDEX {name} ON buspass_student USING gin ({expressions[new]})')
+
+
+def forwards(apps, schema_editor):
+    rekey_search_rows(apps, schema_editor)
+    replace_trigram_indexes(schema_editor, new=True)
+
+
+def backwards(apps, schema_editor):
+    # The old code looks rows up by student_id, so the hashed rowids can stay
+    replace_trigram_indexes(schema_editor, new=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('buspass', '0022_archive_all_columns'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.27 on 2026-10-19 13:09
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('buspass', '0023_search_index_keys'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='student',
+            name='aadhar',
+            field=models.CharField(max_length=12, validators=[django.core.validators.RegexValidator(message='Aadhar number must be 12 digits', regex='^\\d{12}$')]),
+        ),
+        migrations.AlterField(
+            model_name='student',
+            name='email',
+            field=models.EmailField(max_length=254),
+        ),
+        migrations.AlterField(
+            model_name='student',
+            name='mobile',
+            field=models.CharField(max_length=10, validators=[django.core.validators.RegexValidator(message='Mobile number must be 10 digits', regex='^\\d{10}$')]),
+        ),
+        migrations.AddConstraint(
+            model_name='student',
+            constraint=models.UniqueConstraint(fields=('tenant', 'aadhar'), name='unique_student_aadhar_per_tenant'),
+        ),
+        migrations.AddConstraint(
+            model_name='student',
+            constraint=models.UniqueConstraint(fields=('tenant', 'mobile'), name='unique_student_mobile_per_tenant'),
+        ),
+        migrations.AddConstraint(
+            model_name='student',
+            constraint=models.UniqueConstraint(fields=('tenant', 'email'), name='unique_student_email_per_tenant'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def assign_default_tenant(apps, schema_editor):
+    # Jobs queued so far were submitted from the one campus this deployment served
+    Tenant = apps.get_model('buspass', 'Tenant')
+    tenant, created = Tenant.objects.get_or_create(slug=settings.DEFAULT_TENANT_SLUG, defaults={'name': settings.DEFAULT_TENANT_SLUG.title()})
+    apps.get_model('buspass', 'BackgroundJob').objects.filter(tenant__isnull=True).update(tenant=tenant)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('buspass', '0024_student_unique_per_tenant'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='backgroundjob',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='buspass.tenant'),
+        ),
+        migrations.RunPython(assign_default_tenant, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='backgroundjob',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='buspass.tenant'),
+        ),
+        migrations.AddIndex(
+            model_name='backgroundjob',
+            index=models.Index(fields=['tenant', '-created_at'], name='buspass_bac_tenant__73ce53_idx'),
+        ),
+    ]
@@ -1,26 +1,72 @@
 from django.db import models
 from django.contrib.auth.models import User
 from django.core.validators import RegexValidator
+from django.utils import timezone
 from datetime import date
 import uuid
 import os
+from .utils import SEMESTERS, CONTINUOUS_SEMESTER_RUNS
+from .tenancy import TenantManager, get_current_tenant, get_default_tenant
 
 
-class Student(models.Model):
+class Tenant(models.Model):
+    """A campus served by this deployment, picked by the request's host name"""
+    name = models.CharField(max_length=100)
+    slug = models.SlugField(unique=True, help_text="Used in cache names and keys")
+    domain = models.CharField(max_length=255, unique=True, null=True, blank=True, help_text="Host name students and staff use for this campus")
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.name
+
+    class Meta:
+        ordering = ['name']
+
+
+class TenantScopedModel(models.Model):
+    """Base for tables shared by all campuses
+
+    `objects` only returns the current tenant's rows; `unscoped` returns all
+    of them. New rows take the tenant of the object named by tenant_from,
+    else the current tenant, else the default one.
+    """
+    # Every index on these tables leads with tenant, so the FK needs none of its own
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='+', db_index=False)
+
+    objects = TenantManager()
+    unscoped = models.Manager()
+
+    tenant_from = None
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if self.tenant_id is None:
+            if self.tenant_from:
+                self.tenant_id = getattr(self, self.tenant_from).tenant_id
+            else:
+                self.tenant = get_current_tenant() or get_default_tenant()
+        super().save(*args, **kwargs)
+
+
+class Student(TenantScopedModel):
     id = models.CharField(max_length=10, unique=True, primary_key=True)
-    fullname = models.CharField(max_length=200)
+    fullname = models.CharField(max_length=200, db_index=True)
     class_name = models.CharField(max_length=10, verbose_name="Class")
     clgid = models.IntegerField(verbose_name="College ID")
     address = models.TextField()
-    route1 = models.CharField(max_length=100, verbose_name="Route")
+    route1 = models.CharField(max_length=100, verbose_name="Route (as entered)", blank=True)
+    route = models.ForeignKey('Route', on_delete=models.SET_NULL, null=True, blank=True, related_name='students', verbose_name="Route")
     date_of_birth = models.DateField()
-    aadhar = models.CharField(max_length=12, unique=True, validators=[
+    aadhar = models.CharField(max_length=12, validators=[
         RegexValidator(regex=r'^\d{12}$', message="Aadhar number must be 12 digits")
     ])
-    mobile = models.CharField(max_length=10, unique=True, validators=[
+    mobile = models.CharField(max_length=10, validators=[
         RegexValidator(regex=r'^\d{10}$', message="Mobile number must be 10 digits")
     ])
-    email = models.EmailField(unique=True)
+    email = models.EmailField()
     password = models.CharField(max_length=255)  # This will be hashed
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -30,10 +76,22 @@ class Student(models.Model):
 
     class Meta:
         ordering = ['id']
+        indexes = [
+            models.Index(fields=['tenant', 'created_at']),
+            models.Index(fields=['tenant', 'id']),
+        ]
+        constraints = [
+            # Unique within a campus; the same person may study at two campuses
+            models.UniqueConstraint(fields=['tenant', 'aadhar'], name='unique_student_aadhar_per_tenant'),
+            models.UniqueConstraint(fields=['tenant', 'mobile'], name='unique_student_mobile_per_tenant'),
+            models.UniqueConstraint(fields=['tenant', 'email'], name='unique_student_email_per_tenant'),
+            models.CheckConstraint(check=models.Q(aadhar__regex=r'^[0-9]{12}$'), name='student_aadhar_12_digits'),
+            models.CheckConstraint(check=models.Q(mobile__regex=r'^[0-9]{10}$'), name='student_mobile_10_digits'),
+        ]
 
 
-class Route(models.Model):
-    name = models.CharField(max_length=100, unique=True)
+class Route(TenantScopedModel):
+    name = models.CharField(max_length=100)
     source = models.CharField(max_length=100)
     destination = models.CharField(max_length=100)
     driver_name = models.CharField(max_length=100, verbose_name="Driver Name", default="TBD")
@@ -42,6 +100,7 @@ class Route(models.Model):
     ], default="0000000000")
     arrival_time_at_source = models.TimeField(verbose_name="Arrival Time at Source", default="08:00")
     arrival_time_at_destination = models.TimeField(verbose_name="Arrival Time at Destination", default="09:00")
+    capacity = models.PositiveIntegerField(verbose_name="Seat Capacity", default=50)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -51,9 +110,38 @@ class Route(models.Model):
 
     class Meta:
         ordering = ['name']
+        indexes = [
+            models.Index(fields=['tenant', 'is_active', 'name']),
+        ]
+        constraints = [
+            # Campuses name their routes independently
+            models.UniqueConstraint(fields=['tenant', 'name'], name='unique_route_name_per_tenant'),
+            models.CheckConstraint(check=models.Q(driver_contact__regex=r'^[0-9]{10,15}$'), name='route_driver_contact_digits'),
+        ]
+
 
+class RouteStop(models.Model):
+    route = models.ForeignKey(Route, on_delete=models.CASCADE, related_name='stops')
+    sequence = models.PositiveIntegerField(help_text="Position of the stop along the route, starting at 1")
+    name = models.CharField(max_length=100)
+    arrival_time = models.TimeField(verbose_name="Arrival Time")
+
+    def __str__(self):
+        return f"{self.route.name} #{self.sequence}: {self.name} ({self.arrival_time:%H:%M})"
+
+    class Meta:
+        ordering = ['route', 'sequence']
+        verbose_name = "Route Stop"
+        verbose_name_plural = "Route Stops"
+        constraints = [
+            models.UniqueConstraint(fields=['route', 'sequence'], name='unique_route_stop_sequence'),
+            models.CheckConstraint(check=models.Q(sequence__gte=1), name='route_stop_sequence_from_1'),
+        ]
+
+
+class RoutePrice(TenantScopedModel):
+    tenant_from = 'route'
 
-class RoutePrice(models.Model):
     SEMESTER_CHOICES = [
         ('Semester-1', 'Semester-1'),
         ('Semester-2', 'Semester-2'),
@@ -75,13 +163,84 @@ class RoutePrice(models.Model):
     class Meta:
         unique_together = ['route', 'semester']
         ordering = ['route', 'semester']
+        indexes = [
+            models.Index(fields=['tenant', 'route', 'semester']),
+        ]
+        constraints = [
+            models.CheckConstraint(check=models.Q(semester__in=SEMESTERS), name='route_price_semester_valid'),
+            models.CheckConstraint(check=models.Q(price__gte=0), name='route_price_not_negative'),
+        ]
+
+
+class RouteSeatCounter(models.Model):
+    # Number of approved passes per route and semester, kept up to date with F() updates
+    route = models.ForeignKey(Route, on_delete=models.CASCADE, related_name='seat_counters')
+    semester = models.CharField(max_length=20, choices=RoutePrice.SEMESTER_CHOICES)
+    seats_taken = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = TenantManager('route__tenant')
+    unscoped = models.Manager()
+
+    def __str__(self):
+        return f"{self.route.name} - {self.semester}: {self.seats_taken}/{self.route.capacity}"
+
+    @property
+    def seats_available(self):
+        return max(self.route.capacity - self.seats_taken, 0)
+
+    class Meta:
+        unique_together = ['route', 'semester']
+        ordering = ['route', 'semester']
+        constraints = [
+            models.CheckConstraint(check=models.Q(semester__in=SEMESTERS), name='seat_counter_semester_valid'),
+        ]
+
+
+class WaitlistEntry(models.Model):
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='waitlist_entries')
+    route = models.ForeignKey(Route, on_delete=models.CASCADE, related_name='waitlist_entries')
+    semester = models.CharField(max_length=20, choices=RoutePrice.SEMESTER_CHOICES)
+    promoted_pass = models.OneToOneField('BusPass', on_delete=models.SET_NULL, null=True, blank=True, related_name='waitlist_entry')
+    promoted_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = TenantManager('student__tenant')
+    unscoped = models.Manager()
+
+    def __str__(self):
+        return f"{self.student.fullname} - {self.route.name} - {self.semester}"
+
+    class Meta:
+        ordering = ['created_at']
+        verbose_name = "Waitlist Entry"
+        verbose_name_plural = "Waitlist Entries"
+        indexes = [
+            models.Index(fields=['route', 'semester', 'promoted_at', 'created_at']),
+        ]
+        constraints = [
+            models.CheckConstraint(check=models.Q(semester__in=SEMESTERS), name='waitlist_semester_valid'),
+            # One open entry per student, route and semester; add_to_waitlist relies on it under concurrency
+            models.UniqueConstraint(
+                fields=['student', 'route', 'semester'],
+                condition=models.Q(promoted_at__isnull=True),
+                name='unique_open_waitlist_entry',
+            ),
+        ]
 
 
 def upload_pass_receipt_path(instance, filename):
     # Upload path: receipts/student_id/pass_id/filename
     return f'receipts/{instance.student.id}/{instance.id}/{filename}'
 
-class MultiSemesterBusPassApplication(models.Model):
+
+def upload_receipt_thumbnail_path(instance, filename):
+    # Thumbnails live next to the receipt they were made from
+    return f'receipts/{instance.student.id}/{instance.id}/thumbnails/{filename}'
+
+class MultiSemesterBusPassApplication(TenantScopedModel):
+    tenant_from = 'student'
+
     STATUS_CHOICES = [
         ('pending', 'Pending'),
         ('approved', 'Approved'),
@@ -96,6 +255,9 @@ class MultiSemesterBusPassApplication(models.Model):
     issue_date = models.DateField(auto_now_add=True)
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
     payment_receipt = models.FileField(upload_to=upload_pass_receipt_path, null=True, blank=True)
+    receipt_thumbnail = models.ImageField(upload_to=upload_receipt_thumbnail_path, null=True, blank=True, editable=False)
+    receipt_duplicate = models.BooleanField(default=False, editable=False, help_text="The receipt matches one uploaded for another pass or application")
+    idempotency_key = models.UUIDField(unique=True, null=True, blank=True, editable=False, help_text="Key of the apply form submission that created this application")
     approved_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='approved_multi_semester_passes')
     approved_at = models.DateTimeField(null=True, blank=True)
     rejected_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='rejected_multi_semester_passes')
@@ -111,9 +273,27 @@ class MultiSemesterBusPassApplication(models.Model):
         ordering = ['-created_at']
         verbose_name = "Multi-Semester Bus Pass Application"
         verbose_name_plural = "Multi-Semester Bus Pass Applications"
+        indexes = [
+            models.Index(fields=['tenant', '-created_at']),
+            models.Index(fields=['tenant', 'status', '-created_at']),
+            models.Index(fields=['issue_date']),
+        ]
+        constraints = [
+            models.CheckConstraint(check=models.Q(status__in=['pending', 'approved', 'rejected']), name='application_status_valid'),
+            # Only runs of consecutive semesters, stored in semester order by utils.dump_semesters
+            models.CheckConstraint(check=models.Q(semesters__in=CONTINUOUS_SEMESTER_RUNS), name='application_semesters_continuous'),
+            models.CheckConstraint(check=models.Q(total_amount__gte=0), name='application_total_not_negative'),
+            models.UniqueConstraint(
+                fields=['student', 'route', 'semesters'],
+                condition=models.Q(status='pending'),
+                name='unique_pending_application',
+            ),
+        ]
 
 
-class BusPass(models.Model):
+class BusPass(TenantScopedModel):
+    tenant_from = 'student'
+
     SEMESTER_CHOICES = [
         ('Semester-1', 'Semester-1'),
         ('Semester-2', 'Semester-2'),
@@ -127,6 +307,7 @@ class BusPass(models.Model):
         ('pending', 'Pending'),
         ('approved', 'Approved'),
         ('rejected', 'Rejected'),
+        ('expired', 'Expired'),
     ]
     
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -137,6 +318,9 @@ class BusPass(models.Model):
     expiry_date = models.DateField()
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
     payment_receipt = models.FileField(upload_to=upload_pass_receipt_path, null=True, blank=True)
+    receipt_thumbnail = models.ImageField(upload_to=upload_receipt_thumbnail_path, null=True, blank=True, editable=False)
+    receipt_duplicate = models.BooleanField(default=False, editable=False, help_text="The receipt matches one uploaded for another pass or application")
+    idempotency_key = models.UUIDField(unique=True, null=True, blank=True, editable=False, help_text="Key of the apply form submission that created this pass")
     qr_code = models.ImageField(upload_to='qr_codes/', null=True, blank=True)
     approved_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='approved_passes')
     approved_at = models.DateTimeField(null=True, blank=True)
@@ -151,4 +335,340 @@ class BusPass(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['tenant', '-created_at']),
+            models.Index(fields=['tenant', 'status', '-created_at']),
+            models.Index(fields=['issue_date']),
+            # Used by the expiry sweeper to find live passes past their expiry date
+            models.Index(fields=['status', 'expiry_date']),
+        ]
+        constraints = [
+            # A student holds at most one live (pending or approved) pass per route and semester
+            models.UniqueConstraint(
+                fields=['student', 'route', 'semester'],
+                condition=models.Q(status__in=['pending', 'approved']),
+                name='unique_active_pass_per_semester',
+            ),
+            models.CheckConstraint(check=models.Q(semester__in=SEMESTERS), name='bus_pass_semester_valid'),
+            models.CheckConstraint(check=models.Q(status__in=['pending', 'approved', 'rejected', 'expired']), name='bus_pass_status_valid'),
+        ]
+
+class ArchivedBusPass(models.Model):
+    """An expired or rejected bus pass moved out of buspass_buspass
+
+    On PostgreSQL the table is list-partitioned by academic_year (migration 0016).
+    """
+    id = models.UUIDField(primary_key=True, editable=False)
+    academic_year = models.PositiveSmallIntegerField(help_text="Calendar year of the pass expiry date")
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='archived_bus_passes')
+    route = models.ForeignKey(Route, on_delete=models.SET_NULL, null=True, blank=True)
+    semester = models.CharField(max_length=20, choices=BusPass.SEMESTER_CHOICES)
+    issue_date = models.DateField()
+    expiry_date = models.DateField()
+    status = models.CharField(max_length=10, choices=BusPass.STATUS_CHOICES)
+    # The files stay in media storage; their paths move with the row so they can still be found
+    payment_receipt = models.FileField(upload_to=upload_pass_receipt_path, null=True, blank=True)
+    receipt_thumbnail = models.ImageField(upload_to=upload_receipt_thumbnail_path, null=True, blank=True)
+    receipt_duplicate = models.BooleanField(default=False)
+    idempotency_key = models.UUIDField(null=True, blank=True)
+    qr_code = models.ImageField(upload_to='qr_codes/', null=True, blank=True)
+    approved_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    approved_at = models.DateTimeField(null=True, blank=True)
+    rejected_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    rejected_at = models.DateTimeField(null=True, blank=True)
+    notes = models.TextField(blank=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField(null=True, blank=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    objects = TenantManager('student__tenant')
+    unscoped = models.Manager()
+
+    def __str__(self):
+        return f"{self.student_id} - {self.semester} (expired {self.expiry_date})"
+
+    class Meta:
+        ordering = ['-expiry_date']
+        verbose_name = "Archived Bus Pass"
+        verbose_name_plural = "Archived Bus Passes"
+        indexes = [
+            models.Index(fields=['student', '-expiry_date']),
+            models.Index(fields=['expiry_date']),
+            models.Index(fields=['academic_year', 'student']),
+        ]
+
+
+class ArchivedMultiSemesterApplication(models.Model):
+    """A decided multi-semester application moved out of the live table
+
+    On PostgreSQL the table is list-partitioned by academic_year (migration 0016).
+    """
+    id = models.UUIDField(primary_key=True, editable=False)
+    academic_year = models.PositiveSmallIntegerField(help_text="Calendar year the application was made")
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='archived_multi_semester_applications')
+    route = models.ForeignKey(Route, on_delete=models.SET_NULL, null=True, blank=True)
+    semesters = models.TextField()
+    total_amount = models.DecimalField(max_digits=12, decimal_places=2)
+    issue_date = models.DateField()
+    status = models.CharField(max_length=10, choices=MultiSemesterBusPassApplication.STATUS_CHOICES)
+    payment_receipt = models.FileField(upload_to=upload_pass_receipt_path, null=True, blank=True)
+    receipt_thumbnail = models.ImageField(upload_to=upload_receipt_thumbnail_path, null=True, blank=True)
+    receipt_duplicate = models.BooleanField(default=False)
+    idempotency_key = models.UUIDField(null=True, blank=True)
+    approved_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    approved_at = models.DateTimeField(null=True, blank=True)
+    rejected_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    rejected_at = models.DateTimeField(null=True, blank=True)
+    notes = models.TextField(blank=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField(null=True, blank=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    objects = TenantManager('student__tenant')
+    unscoped = models.Manager()
+
+    def __str__(self):
+        return f"{self.student_id} - {self.semesters} ({self.academic_year})"
+
+    class Meta:
+        ordering = ['-issue_date']
+        verbose_name = "Archived Multi-Semester Application"
+        verbose_name_plural = "Archived Multi-Semester Applications"
+        indexes = [
+            models.Index(fields=['student', '-issue_date']),
+            models.Index(fields=['academic_year', 'student']),
+        ]
+
+
+class PassAuditLogManager(TenantManager):
+    # Audit rows name their pass or application by id only, live or archived
+    def tenant_filter(self, tenant):
+        return (
+            models.Q(pass_type='bus_pass', object_id__in=BusPass.unscoped.filter(tenant=tenant).values('pk'))
+            | models.Q(pass_type='bus_pass', object_id__in=ArchivedBusPass.unscoped.filter(student__tenant=tenant).values('pk'))
+            | models.Q(pass_type='multi_semester', object_id__in=MultiSemesterBusPassApplication.unscoped.filter(tenant=tenant).values('pk'))
+            | models.Q(pass_type='multi_semester', object_id__in=ArchivedMultiSemesterApplication.unscoped.filter(student__tenant=tenant).values('pk'))
+        )
+
+
+class PassAuditLog(models.Model):
+    PASS_TYPE_CHOICES = [
+        ('bus_pass', 'Bus Pass'),
+        ('multi_semester', 'Multi-Semester Application'),
+    ]
 
+    ACTION_CHOICES = [
+        ('approved', 'Approved'),
+        ('rejected', 'Rejected'),
+    ]
+
+    pass_type = models.CharField(max_length=20, choices=PASS_TYPE_CHOICES)
+    object_id = models.UUIDField()
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    performed_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='pass_audit_logs')
+    created_at = models.DateTimeField(default=timezone.now)
+
+    objects = PassAuditLogManager()
+    unscoped = models.Manager()
+
+    def __str__(self):
+        return f"{self.get_pass_type_display()} {self.object_id} {self.action} at {self.created_at:%Y-%m-%d %H:%M}"
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = "Pass Audit Log"
+        verbose_name_plural = "Pass Audit Log"
+        indexes = [
+            models.Index(fields=['created_at']),
+            models.Index(fields=['pass_type', 'object_id']),
+        ]
+
+
+class StudentPassSummary(models.Model):
+    # Denormalized dashboard numbers, rebuilt by buspass.summaries
+    student = models.OneToOneField(Student, on_delete=models.CASCADE, primary_key=True, related_name='pass_summary')
+    total_passes = models.PositiveIntegerField(default=0)
+    approved_passes = models.PositiveIntegerField(default=0)
+    pending_passes = models.PositiveIntegerField(default=0)
+    rejected_passes = models.PositiveIntegerField(default=0)
+    total_applications = models.PositiveIntegerField(default=0)
+    pending_applications = models.PositiveIntegerField(default=0)
+    current_pass = models.ForeignKey(BusPass, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    next_expiry = models.DateField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = TenantManager('student__tenant')
+    unscoped = models.Manager()
+
+    def __str__(self):
+        return f"Pass summary for {self.student_id}"
+
+    class Meta:
+        verbose_name = "Student Pass Summary"
+        verbose_name_plural = "Student Pass Summaries"
+
+
+class ReceiptFingerprint(models.Model):
+    PASS_TYPE_CHOICES = PassAuditLog.PASS_TYPE_CHOICES
+
+    HASH_KIND_CHOICES = [
+        ('perceptual', 'Perceptual (image)'),
+        ('content', 'Content (SHA-256)'),
+    ]
+
+    pass_type = models.CharField(max_length=20, choices=PASS_TYPE_CHOICES)
+    object_id = models.UUIDField()
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='receipt_fingerprints')
+    receipt = models.CharField(max_length=255)
+    hash_kind = models.CharField(max_length=10, choices=HASH_KIND_CHOICES)
+    # 16 hex digits for a 64-bit difference hash, 64 for SHA-256
+    hash = models.CharField(max_length=64, db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = TenantManager('student__tenant')
+    unscoped = models.Manager()
+
+    def __str__(self):
+        return f"{self.get_pass_type_display()} {self.object_id}: {self.hash_kind} {self.hash}"
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['pass_type', 'object_id']),
+            models.Index(fields=['hash_kind', 'id']),
+        ]
+
+
+class Notification(models.Model):
+    """Outbox row for one status change to deliver to a student over one channel
+
+    Rows are written in the same transaction as the approval or rejection and
+    drained by the dispatch_notifications command.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='notifications')
+    channel = models.CharField(max_length=20)
+    pass_type = models.CharField(max_length=20, choices=PassAuditLog.PASS_TYPE_CHOICES)
+    object_id = models.UUIDField()
+    action = models.CharField(max_length=10, choices=PassAuditLog.ACTION_CHOICES)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # Earliest time the dispatcher may pick the row up (retry backoff, or the claim lease while sending)
+    available_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    objects = TenantManager('student__tenant')
+    unscoped = models.Manager()
+
+    def __str__(self):
+        return f"{self.channel} to {self.student_id}: {self.pass_type} {self.action} ({self.status})"
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'available_at']),
+            models.Index(fields=['student', 'channel', 'status']),
+        ]
+
+
+class BackgroundJob(TenantScopedModel):
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    kind = models.CharField(max_length=50)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    submitted_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='background_jobs')
+    total_items = models.PositiveIntegerField(default=0)
+    processed_items = models.PositiveIntegerField(default=0)
+    failed_items = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    locked_by = models.CharField(max_length=100, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.kind} ({self.get_status_display()}) {self.processed_items}/{self.total_items}"
+
+    @property
+    def throughput(self):
+        """Items processed per second since the job started"""
+        if not self.started_at:
+            return None
+        elapsed = ((self.finished_at or timezone.now()) - self.started_at).total_seconds()
+        return self.processed_items / elapsed if elapsed > 0 else None
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # Workers claim jobs of every campus; the admin lists one campus's
+            models.Index(fields=['status', 'created_at']),
+            models.Index(fields=['tenant', '-created_at']),
+        ]
+
+
+class BackgroundJobItem(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    job = models.ForeignKey(BackgroundJob, on_delete=models.CASCADE, related_name='items')
+    object_id = models.CharField(max_length=64)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+
+    def __str__(self):
+        return f"{self.job_id}: {self.object_id} ({self.status})"
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['job', 'status', 'id']),
+        ]
+
+
+class ScanEvent(models.Model):
+    """One bus pass scan at boarding
+
+    Rows are only ever appended, in batches, by buspass.ridership.record_scans.
+    The route is copied from the pass at scan time so reports never join
+    the pass tables (and keep working after passes are archived).
+    """
+    pass_id = models.UUIDField()
+    route = models.ForeignKey(Route, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    scanned_at = models.DateTimeField()
+    accepted = models.BooleanField(default=True, help_text="False when the pass was refused at boarding")
+
+    objects = TenantManager('route__tenant')
+    unscoped = models.Manager()
+
+    def __str__(self):
+        return f"{self.pass_id} scanned at {self.scanned_at:%Y-%m-%d %H:%M}"
+
+    class Meta:
+        ordering = ['-scanned_at']
+        verbose_name = "Scan Event"
+        verbose_name_plural = "Scan Events"
+        indexes = [
+            models.Index(fields=['scanned_at']),
+            models.Index(fields=['pass_id', 'scanned_at']),
+        ]
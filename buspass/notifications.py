@@ -0,0 +1,226 @@
+import json
+import time
+import urllib.request
+from datetime import timedelta
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import Min, Q
+from django.utils import timezone
+from .models import BusPass, MultiSemesterBusPassApplication, Notification, Student
+from .utils import parse_semesters
+
+NOTIFICATION_BATCH_SIZE = 200
+MAX_ATTEMPTS = 5
+# First retry after a minute, doubling up to about half a day
+RETRY_BACKOFF = timedelta(minutes=1)
+MAX_RETRY_BACKOFF = timedelta(hours=12)
+# How long a claimed row stays hidden from other dispatchers while it is being sent
+CLAIM_LEASE = timedelta(minutes=5)
+
+
+class EmailChannel:
+    """Sends through Django's EMAIL_BACKEND, reusing one connection per batch"""
+    name = 'email'
+
+    def open(self):
+        self.connection = get_connection()
+        self.connection.open()
+
+    def close(self):
+        self.connection.close()
+
+    def send(self, student, subject, body):
+        EmailMessage(subject, body, to=[student.email], connection=self.connection).send()
+
+
+class SMSChannel:
+    """Posts {"to": mobile, "message": text} as JSON to NOTIFICATION_SMS_URL"""
+    name = 'sms'
+
+    def open(self):
+        if not settings.NOTIFICATION_SMS_URL:
+            raise ImproperlyConfigured('NOTIFICATION_SMS_URL must be set to use the sms channel')
+
+    def close(self):
+        pass
+
+    def send(self, student, subject, body):
+        request = urllib.request.Request(
+            settings.NOTIFICATION_SMS_URL,
+            data=json.dumps({'to': student.mobile, 'message': body}).encode(),
+            headers={'Content-Type': 'application/json'},
+        )
+        with urllib.request.urlopen(request, timeout=10) as response:
+            response.read()
+
+
+class FileChannel:
+    """Appends one JSON line per message to NOTIFICATION_FILE_PATH, for development and tests"""
+    name = 'file'
+
+    def open(self):
+        self.file = open(settings.NOTIFICATION_FILE_PATH, 'a', encoding='utf-8')
+
+    def close(self):
+        self.file.close()
+
+    def send(self, student, subject, body):
+        self.file.write(json.dumps({'to': student.id, 'subject': subject, 'body': body, 'sent_at': timezone.now().isoformat()}) + '\n')
+        self.file.flush()
+
+
+CHANNELS = {channel.name: channel for channel in (EmailChannel, SMSChannel, FileChannel)}
+
+
+def get_channel_names():
+    names = [name for name in settings.NOTIFICATION_CHANNELS if name]
+    unknown = set(names) - set(CHANNELS)
+    if unknown:
+        raise ImproperlyConfigured(f"Unknown notification channels: {', '.join(sorted(unknown))}")
+    return names
+
+
+def enqueue_notifications(pass_type, rows, action, timestamp=None):
+    """Add outbox rows for (object_id, student_id) pairs; call inside the status change transaction"""
+    timestamp = timestamp or timezone.now()
+    Notification.objects.bulk_create(
+        [
+            Notification(
+                student_id=student_id, channel=channel, pass_type=pass_type, object_id=object_id,
+                action=action, created_at=timestamp, available_at=timestamp,
+            )
+            for object_id, student_id in rows
+            for channel in get_channel_names()
+        ],
+        batch_size=NOTIFICATION_BATCH_SIZE,
+    )
+
+
+class RateLimiter:
+    """Token bucket allowing rate messages per second with bursts of the same size"""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+
+    def wait(self):
+        if not self.rate:
+            return
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            time.sleep((1 - self.tokens) / self.rate)
+
+
+def _describe(notifications):
+    """Build one (subject, body) for all of a student's pending status changes"""
+    pass_ids = [n.object_id for n in notifications if n.pass_type == 'bus_pass']
+    application_ids = [n.object_id for n in notifications if n.pass_type == 'multi_semester']
+    passes = BusPass.objects.select_related('route').in_bulk(pass_ids)
+    applications = MultiSemesterBusPassApplication.objects.select_related('route').in_bulk(application_ids)
+
+    lines = []
+    for notification in sorted(notifications, key=lambda n: n.created_at):
+        if notification.pass_type == 'bus_pass' and notification.object_id in passes:
+            bus_pass = passes[notification.object_id]
+            lines.append(f"Your bus pass for {bus_pass.semester} on {bus_pass.route.name} was {notification.action}.")
+        elif notification.pass_type == 'multi_semester' and notification.object_id in applications:
+            application = applications[notification.object_id]
+            semesters = ', '.join(parse_semesters(application.semesters))
+            lines.append(f"Your multi-semester application for {semesters} on {application.route.name} was {notification.action}.")
+        else:
+            lines.append(f"One of your bus pass applications was {notification.action}.")
+    subject = 'Your bus pass has been updated' if len(lines) == 1 else f'{len(lines)} updates to your bus passes'
+    return subject, '\n'.join(lines) + '\n\nOpen the student dashboard for details.'
+
+
+def claim_notifications(worker, batch_size=NOTIFICATION_BATCH_SIZE):
+    """Lease the due notifications of up to batch_size students to this worker
+
+    Every due row of a claimed student is taken, so a student gets a single
+    message however many of their passes changed.
+    """
+    now = timezone.now()
+    due = Q(status='pending', available_at__lte=now) | Q(status='sending', available_at__lt=now)
+    student_ids = list(
+        Notification.objects.filter(due).values('student_id').annotate(oldest=Min('available_at'))
+        .order_by('oldest').values_list('student_id', flat=True)[:batch_size]
+    )
+    if not student_ids:
+        return []
+    Notification.objects.filter(due, student_id__in=student_ids).update(
+        status='sending', locked_by=worker, available_at=now + CLAIM_LEASE,
+    )
+    return list(Notification.objects.filter(status='sending', locked_by=worker, student_id__in=student_ids))
+
+
+def _retry_at(attempts):
+    return timezone.now() + min(RETRY_BACKOFF * (2 ** (attempts - 1)), MAX_RETRY_BACKOFF)
+
+
+def deliver(notifications, rate_limiters):
+    """Send claimed notifications, one coalesced message per student and channel
+
+    Rows of students that no longer exist fail right away instead of being
+    retried. Returns (messages sent, messages failed).
+    """
+    groups = {}
+    for notification in notifications:
+        groups.setdefault((notification.channel, notification.student_id), []).append(notification)
+    students = Student.objects.in_bulk({student_id for channel, student_id in groups})
+
+    sent = failed = 0
+    opened = {}
+    try:
+        for (channel_name, student_id), group in groups.items():
+            ids = [notification.pk for notification in group]
+            student = students.get(student_id)
+            if student is None:
+                # Deleted after the rows were claimed; retrying cannot reach anyone
+                failed += 1
+                Notification.objects.filter(pk__in=ids).update(status='failed', locked_by='', error='The student no longer exists')
+                continue
+            try:
+                if channel_name not in opened:
+                    channel = CHANNELS[channel_name]()
+                    channel.open()
+                    opened[channel_name] = channel
+                subject, body = _describe(group)
+                rate_limiters.setdefault(channel_name, RateLimiter(settings.NOTIFICATION_RATE_LIMIT)).wait()
+                opened[channel_name].send(student, subject, body)
+            except Exception as exc:
+                failed += 1
+                attempts = max(notification.attempts for notification in group) + 1
+                Notification.objects.filter(pk__in=ids).update(
+                    status='failed' if attempts >= MAX_ATTEMPTS else 'pending',
+                    attempts=attempts, available_at=_retry_at(attempts), locked_by='', error=repr(exc)[:1000],
+                )
+                continue
+            sent += 1
+            Notification.objects.filter(pk__in=ids).update(status='sent', sent_at=timezone.now(), locked_by='', error='')
+    finally:
+        for channel in opened.values():
+            channel.close()
+    return sent, failed
+
+
+def dispatch(worker, once=False, poll_interval=5.0, batch_size=NOTIFICATION_BATCH_SIZE):
+    """Drain the outbox; with once=True stop when nothing is due. Returns (sent, failed)"""
+    rate_limiters = {}
+    totals = [0, 0]
+    while True:
+        notifications = claim_notifications(worker, batch_size)
+        if not notifications:
+            if once:
+                return tuple(totals)
+            time.sleep(poll_interval)
+            continue
+        sent, failed = deliver(notifications, rate_limiters)
+        totals[0] += sent
+        totals[1] += failed
@@ -0,0 +1,66 @@
+from decimal import Decimal
+from functools import lru_cache
+from .models import RoutePrice
+from .caching import get_or_compute
+from .catalog import get_catalog_version, CATALOG_CACHE_TIMEOUT, CATALOG_NAMESPACE
+from .tenancy import get_tenant_cache
+
+
+class PriceNotFound(Exception):
+    """Raised when a route has no price for one or more of the requested semesters"""
+
+    def __init__(self, route_id, semesters):
+        self.route_id = route_id
+        self.semesters = semesters
+        super().__init__(f"No price for route {route_id} in {', '.join(semesters)}")
+
+
+def build_price_matrix():
+    matrix = {}
+    for route_id, semester, price in RoutePrice.objects.values_list('route_id', 'semester', 'price'):
+        matrix.setdefault(route_id, {})[semester] = price
+    return matrix
+
+
+@lru_cache(maxsize=4)
+def _price_matrix(version):
+    return get_or_compute(
+        CATALOG_NAMESPACE, 'price_matrix', build_price_matrix, CATALOG_CACHE_TIMEOUT,
+        cache=get_tenant_cache(), version=version,
+    )
+
+
+def get_price_matrix(version=None):
+    """Return {route_id: {semester: Decimal}} for every route, cached per catalog version
+
+    The shared cache holds one copy per catalog version and each process
+    memoizes the latest versions, so a price change (which bumps the version)
+    is picked up on the next call.
+    """
+    return _price_matrix(version or get_catalog_version())
+
+
+@lru_cache(maxsize=1024)
+def _quote(version, route_id, semesters):
+    prices = get_price_matrix(version).get(route_id, {})
+    missing = [semester for semester in semesters if semester not in prices]
+    if missing:
+        raise PriceNotFound(route_id, missing)
+    semester_prices = {semester: prices[semester] for semester in semesters}
+    return {
+        'route': route_id,
+        'semesters': list(semesters),
+        'prices': semester_prices,
+        'total': sum(semester_prices.values(), Decimal('0.00')),
+    }
+
+
+def quote(route_id, semesters):
+    """Price a set of semesters on a route with Decimal arithmetic
+
+    Returns {'route', 'semesters', 'prices': {semester: Decimal}, 'total': Decimal}
+    and raises PriceNotFound if any semester has no price. Results are
+    memoized per catalog version; the returned dict must not be modified.
+    """
+    semesters = tuple(dict.fromkeys(semesters))
+    return _quote(get_catalog_version(), int(route_id), semesters)
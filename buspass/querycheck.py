@@ -0,0 +1,122 @@
+import json
+import re
+from collections import Counter
+from pathlib import Path
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+# Checked-in query counts, duplicate queries and full scans per page; rewrite
+# it with UPDATE_QUERY_BASELINE=1 python manage.py test buspass.tests.QueryRegressionTests
+BASELINE_PATH = Path(__file__).resolve().parent / 'query_baseline.json'
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b|X'[0-9A-Fa-f]*'")
+_IN_LISTS = re.compile(r'\((?:\s*\?\s*,)+\s*\?\s*\)')
+_SQLITE_SCAN = re.compile(r'^SCAN (\S+)$')
+
+
+def normalize_sql(sql):
+    """Replace literal values so executions of the same query compare equal"""
+    sql = _LITERALS.sub('?', sql)
+    return _IN_LISTS.sub('(?)', sql)
+
+
+def full_scans(sql):
+    """Tables the database would read in full to run a SELECT, from its EXPLAIN output
+
+    SQLite reports them as 'SCAN <table>' without an index, PostgreSQL as Seq
+    Scan nodes. Other databases report nothing.
+    """
+    if not sql.lstrip().upper().startswith('SELECT'):
+        return set()
+    try:
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                return {match.group(1) for *_, detail in cursor.fetchall() if (match := _SQLITE_SCAN.match(detail))}
+            if connection.vendor == 'postgresql':
+                cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}')
+                return set(_seq_scans(cursor.fetchone()[0][0]['Plan']))
+    except Exception:
+        # Captured SQL with inlined parameters can't always be re-run verbatim
+        return set()
+    return set()
+
+
+def _seq_scans(plan):
+    if plan.get('Node Type') == 'Seq Scan':
+        yield plan['Relation Name']
+    for child in plan.get('Plans', ()):
+        yield from _seq_scans(child)
+
+
+class QueryProfile:
+    """Capture the queries of a block: how many, how many repeat, which scan whole tables"""
+
+    def __init__(self):
+        self.capture = CaptureQueriesContext(connection)
+
+    def __enter__(self):
+        self.capture.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.capture.__exit__(*exc_info)
+
+    @property
+    def statements(self):
+        # Savepoints of nested atomic blocks are bookkeeping, not queries
+        return [query['sql'] for query in self.capture.captured_queries if not query['sql'].startswith(('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT'))]
+
+    def summary(self):
+        patterns = Counter(normalize_sql(sql) for sql in self.statements)
+        scans = set()
+        for sql in {normalize_sql(sql): sql for sql in self.statements}.values():
+            scans |= full_scans(sql)
+        repeated = {pattern: count for pattern, count in patterns.items() if count > 1}
+        return {
+            'queries': len(self.statements),
+            'duplicates': sum(count - 1 for count in repeated.values()),
+            'full_scans': sorted(scans),
+            # Not compared; shown when a page regresses to point at the N+1
+            'repeated': sorted(repeated.items(), key=lambda item: -item[1])[:3],
+        }
+
+
+def load_baseline(path=BASELINE_PATH):
+    try:
+        with open(path, encoding='utf-8') as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {}
+
+
+def save_baseline(results, path=BASELINE_PATH):
+    baseline = {
+        page: {field: result[field] for field in ('queries', 'duplicates', 'full_scans')}
+        for page, result in sorted(results.items())
+    }
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(baseline, file, indent=2)
+        file.write('\n')
+
+
+def compare_to_baseline(results, baseline):
+    """Return a message for every page that does worse than its baseline entry"""
+    regressions = []
+    for page, result in sorted(results.items()):
+        expected = baseline.get(page)
+        if expected is None:
+            regressions.append(f'{page}: not in the baseline')
+            continue
+        problems = []
+        if result['queries'] > expected['queries']:
+            problems.append(f"{result['queries']} queries (baseline {expected['queries']})")
+        if result['duplicates'] > expected['duplicates']:
+            problems.append(f"{result['duplicates']} duplicate queries (baseline {expected['duplicates']})")
+        new_scans = set(result['full_scans']) - set(expected['full_scans'])
+        if new_scans:
+            problems.append(f"new full scans of {', '.join(sorted(new_scans))}")
+        if problems:
+            repeated = ''.join(f'\n    {count}x {pattern[:200]}' for pattern, count in result['repeated'])
+            regressions.append(f"{page}: {'; '.join(problems)}{repeated}")
+    return regressions
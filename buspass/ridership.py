@@ -0,0 +1,190 @@
+from datetime import datetime, time, timedelta
+from django.core.cache import cache as default_cache
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from .models import BusPass, Route, ScanEvent, Tenant
+from .tenancy import get_current_tenant, get_tenant_cache
+
+SCAN_BATCH_SIZE = 5000
+# Past days don't change unless scans are imported late, and record_scans
+# drops the days it touches; today's numbers are recomputed every few minutes
+PAST_DAY_CACHE_TIMEOUT = 7 * 24 * 60 * 60
+TODAY_CACHE_TIMEOUT = 5 * 60
+UNUSED_PASS_LIMIT = 50
+
+
+def _day_cache_key(day):
+    return f'buspass:ridership:{day.isoformat()}'
+
+
+def record_scans(scans, batch_size=SCAN_BATCH_SIZE):
+    """Append (pass_id, scanned_at, accepted) scans in batched INSERTs; returns how many were stored
+
+    Each batch looks up the routes of its passes in one query. Scanners
+    are not tied to a campus, so passes of every tenant are matched.
+    """
+    total = 0
+    days = set()
+    tenant_ids = set()
+    batch = []
+
+    def flush():
+        passes = BusPass.unscoped.filter(pk__in={pass_id for pass_id, scanned_at, accepted in batch})
+        routes = {pk: (route_id, tenant_id) for pk, route_id, tenant_id in passes.values_list('pk', 'route_id', 'tenant_id')}
+        ScanEvent.objects.bulk_create([
+            ScanEvent(pass_id=pass_id, route_id=routes.get(pass_id, (None,))[0], scanned_at=scanned_at, accepted=accepted)
+            for pass_id, scanned_at, accepted in batch
+        ])
+        days.update(timezone.localdate(scanned_at) for pass_id, scanned_at, accepted in batch)
+        tenant_ids.update(tenant_id for route_id, tenant_id in routes.values())
+        batch.clear()
+
+    for scan in scans:
+        batch.append(scan)
+        if len(batch) >= batch_size:
+            total += len(batch)
+            flush()
+    if batch:
+        total += len(batch)
+        flush()
+    keys = [_day_cache_key(day) for day in days]
+    default_cache.delete_many(keys)
+    for tenant in Tenant.objects.filter(pk__in=tenant_ids):
+        get_tenant_cache(tenant).delete_many(keys)
+    return total
+
+
+def _local_midnight(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _load_scans(first_day, last_day):
+    """Load accepted scans of [first_day, last_day] as columnar arrays
+
+    Returns (day index, hour of day, route id) int arrays, with days counted
+    from first_day in the current time zone and 0 for scans without a route.
+    """
+    import numpy as np
+
+    boundaries = [_local_midnight(first_day + timedelta(days=offset)) for offset in range((last_day - first_day).days + 2)]
+    rows = ScanEvent.objects.filter(accepted=True, scanned_at__gte=boundaries[0], scanned_at__lt=boundaries[-1])
+    tenant = get_current_tenant()
+    if tenant is not None:
+        rows = rows.filter(route__tenant=tenant)
+    rows = rows.values_list('scanned_at', 'route_id')
+    timestamps = []
+    route_ids = []
+    for scanned_at, route_id in rows.iterator(chunk_size=SCAN_BATCH_SIZE):
+        timestamps.append(scanned_at.timestamp())
+        route_ids.append(route_id or 0)
+    timestamps = np.array(timestamps, dtype=np.float64)
+
+    # Local midnights are exact even across DST changes, so bucket by searching them
+    starts = np.array([boundary.timestamp() for boundary in boundaries], dtype=np.float64)
+    days = np.searchsorted(starts, timestamps, side='right') - 1
+    hours = np.minimum(((timestamps - starts[days]) // 3600).astype(np.int64), 23)
+    return days, hours, np.array(route_ids, dtype=np.int64)
+
+
+def _aggregate_days(first_day, last_day):
+    """Count boardings per day, route and hour for [first_day, last_day]
+
+    Returns {day: {route_id: [24 hourly counts]}}, computed with one bincount
+    over the combined (day, route, hour) index.
+    """
+    import numpy as np
+
+    day_count = (last_day - first_day).days + 1
+    days, hours, route_ids = _load_scans(first_day, last_day)
+    routes, route_index = np.unique(route_ids, return_inverse=True)
+    keys = (days * len(routes) + route_index) * 24 + hours
+    cube = np.bincount(keys, minlength=day_count * len(routes) * 24).reshape(day_count, len(routes), 24)
+
+    result = {}
+    for offset in range(day_count):
+        counts = cube[offset]
+        result[first_day + timedelta(days=offset)] = {
+            int(routes[index]): counts[index].tolist() for index in np.flatnonzero(counts.sum(axis=1))
+        }
+    return result
+
+
+def get_daily_counts(first_day, last_day):
+    """Return {day: {route_id: [24 hourly counts]}}, cached per day
+
+    Only the days missing from the cache are loaded, in a single query over
+    the range they span. Each tenant's days are cached in its own cache.
+    """
+    cache = get_tenant_cache()
+    days = [first_day + timedelta(days=offset) for offset in range((last_day - first_day).days + 1)]
+    cached = cache.get_many([_day_cache_key(day) for day in days])
+    counts = {day: cached[_day_cache_key(day)] for day in days if _day_cache_key(day) in cached}
+    missing = [day for day in days if day not in counts]
+    if missing:
+        loaded = _aggregate_days(missing[0], missing[-1])
+        today = timezone.localdate()
+        past = {_day_cache_key(day): loaded[day] for day in missing if day < today}
+        cache.set_many(past, PAST_DAY_CACHE_TIMEOUT)
+        if today in missing:
+            cache.set(_day_cache_key(today), loaded[today], TODAY_CACHE_TIMEOUT)
+        counts.update((day, loaded[day]) for day in missing if day <= today)
+        counts.update((day, {}) for day in missing if day > today)
+    return counts
+
+
+def get_unused_passes(first_day, last_day):
+    """Approved passes valid during the range that were never scanned in it"""
+    scanned = ScanEvent.objects.filter(
+        pass_id=OuterRef('pk'), accepted=True,
+        scanned_at__gte=_local_midnight(first_day), scanned_at__lt=_local_midnight(last_day + timedelta(days=1)),
+    )
+    return BusPass.objects.filter(
+        status='approved', issue_date__lte=last_day, expiry_date__gte=first_day,
+    ).filter(~Exists(scanned))
+
+
+def ridership_report(first_day, last_day):
+    """Daily boardings per route, hourly profiles, peak hours and unused passes for a date range"""
+    import numpy as np
+
+    daily_counts = get_daily_counts(first_day, last_day)
+    days = sorted(daily_counts)
+    route_ids = sorted({route_id for counts in daily_counts.values() for route_id in counts})
+    cube = np.zeros((len(days), len(route_ids), 24), dtype=np.int64)
+    column = {route_id: index for index, route_id in enumerate(route_ids)}
+    for day_index, day in enumerate(days):
+        for route_id, hourly in daily_counts[day].items():
+            cube[day_index, column[route_id]] = hourly
+
+    daily = cube.sum(axis=2)
+    hourly = cube.sum(axis=0)
+    totals = daily.sum(axis=0)
+    overall_hourly = hourly.sum(axis=0)
+    names = dict(Route.objects.filter(pk__in=route_ids).values_list('pk', 'name'))
+
+    routes = [
+        {
+            'name': names.get(route_id, 'Unknown route'),
+            'total': int(totals[index]),
+            'average_per_day': round(float(totals[index]) / len(days), 1),
+            'peak_hour': int(hourly[index].argmax()),
+            'daily': daily[:, index].tolist(),
+        }
+        for index, route_id in enumerate(route_ids)
+    ]
+    routes.sort(key=lambda route: -route['total'])
+    peak = int(overall_hourly.max()) or 1
+    unused = get_unused_passes(first_day, last_day)
+    return {
+        'first_day': first_day,
+        'last_day': last_day,
+        'days': days,
+        'routes': routes,
+        'daily_rows': [(day, daily[index].tolist()) for index, day in enumerate(days)],
+        'route_columns': [names.get(route_id, 'Unknown route') for route_id in route_ids],
+        'hourly': [(hour, int(count), round(100 * int(count) / peak)) for hour, count in enumerate(overall_hourly)],
+        'peak_hour': int(overall_hourly.argmax()) if overall_hourly.any() else None,
+        'total_boardings': int(totals.sum()),
+        'unused_pass_count': unused.count(),
+        'unused_passes': list(unused.select_related('student', 'route').order_by('route__name', 'student_id')[:UNUSED_PASS_LIMIT]),
+    }
@@ -0,0 +1,118 @@
+import hashlib
+from itertools import islice
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from .models import Student
+from .tenancy import get_current_tenant
+
+# SQLite keeps a trigram FTS5 table next to buspass_student; PostgreSQL uses
+# pg_trgm GIN indexes on the same columns (both created in migration 0008).
+# FTS rows are keyed by search_rowid(student id), see migration 0023.
+SEARCH_TABLE = 'buspass_student_search'
+SEARCH_COLUMNS = ['fullname', 'mobile', 'email', 'aadhar']
+# Trigram indexes can only answer terms of at least three characters
+MIN_TRIGRAM_LENGTH = 3
+REBUILD_BATCH_SIZE = 5000
+
+_fts_enabled = {}
+
+
+def fts_enabled():
+    """Return True when the SQLite FTS5 student index exists on this database"""
+    if connection.vendor != 'sqlite':
+        return False
+    if connection.alias not in _fts_enabled:
+        _fts_enabled[connection.alias] = SEARCH_TABLE in connection.introspection.table_names()
+    return _fts_enabled[connection.alias]
+
+
+def search_rowid(student_id):
+    """Return the FTS5 rowid of a student: a stable 63-bit hash of the primary key
+
+    Student IDs are strings, and FTS5 only looks rows up quickly by rowid.
+    The rowid of buspass_student itself can change on VACUUM, so it is not used.
+    """
+    return int.from_bytes(hashlib.blake2b(student_id.encode(), digest_size=8).digest(), 'big') >> 1
+
+
+def index_student(student):
+    if not fts_enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [search_rowid(student.pk)])
+        cursor.execute(
+            f'INSERT INTO {SEARCH_TABLE} (rowid, student_id, {", ".join(SEARCH_COLUMNS)}) VALUES (%s, %s, %s, %s, %s, %s)',
+            [search_rowid(student.pk), student.pk] + [getattr(student, column) for column in SEARCH_COLUMNS],
+        )
+
+
+def remove_student(student_id):
+    if not fts_enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [search_rowid(student_id)])
+
+
+def rebuild_index(batch_size=REBUILD_BATCH_SIZE):
+    """Repopulate the FTS5 table from buspass_student"""
+    if not fts_enabled():
+        return
+    students = Student.unscoped.order_by().values_list('id', *SEARCH_COLUMNS).iterator(chunk_size=batch_size)
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+        while batch := list(islice(students, batch_size)):
+            cursor.executemany(
+                f'INSERT INTO {SEARCH_TABLE} (rowid, student_id, {", ".join(SEARCH_COLUMNS)}) VALUES (%s, %s, %s, %s, %s, %s)',
+                [(search_rowid(row[0]),) + row for row in batch],
+            )
+
+
+def _fts_query(term):
+    # Quote the term as a single FTS5 phrase so user input is never parsed as syntax
+    return '"' + term.replace('"', '""') + '"'
+
+
+def student_search_filter(term):
+    """Return a Q object matching students by ID, name, mobile, email or Aadhar
+
+    Terms of three characters or more are substring matches answered by the
+    trigram index; shorter terms fall back to prefix matches.
+    """
+    term = term.strip()
+    if len(term) < MIN_TRIGRAM_LENGTH:
+        return Q(id__startswith=term) | Q(fullname__istartswith=term) | Q(mobile__startswith=term)
+    if fts_enabled():
+        # Student IDs are stored unindexed in the FTS table; match them on the primary key
+        return Q(pk=term) | Q(pk__in=RawSQL(
+            f'SELECT student_id FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s',
+            [_fts_query(term)],
+        ))
+    # On PostgreSQL these icontains lookups are served by the pg_trgm indexes
+    query = Q(id__iexact=term)
+    for column in SEARCH_COLUMNS:
+        query |= Q(**{f'{column}__icontains': term})
+    return query
+
+
+def search_students(term, limit=20):
+    """Return up to limit students matching term, best matches first on SQLite"""
+    term = term.strip()
+    if not term:
+        return []
+    if fts_enabled() and len(term) >= MIN_TRIGRAM_LENGTH:
+        sql = f'SELECT student_id FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s'
+        params = [_fts_query(term)]
+        tenant = get_current_tenant()
+        if tenant is not None:
+            # Filter before the LIMIT, so other campuses' matches don't use up the results
+            sql += f' AND student_id IN (SELECT id FROM {Student._meta.db_table} WHERE tenant_id = %s)'
+            params.append(tenant.pk)
+        with connection.cursor() as cursor:
+            cursor.execute(f'{sql} ORDER BY rank LIMIT %s', params + [limit])
+            student_ids = [row[0] for row in cursor.fetchall()]
+        if Student.objects.filter(pk=term).exists() and term not in student_ids:
+            student_ids = [term] + student_ids[:limit - 1]
+        students = Student.objects.in_bulk(student_ids)
+        return [students[student_id] for student_id in student_ids if student_id in students]
+    return list(Student.objects.filter(student_search_filter(term))[:limit])
@@ -0,0 +1,290 @@
+import json
+import random
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from itertools import accumulate
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+from .models import Tenant, Student, Route, RouteStop, RoutePrice, BusPass, MultiSemesterBusPassApplication
+from .tenancy import get_default_tenant
+from .utils import SEMESTERS, CONTINUOUS_SEMESTER_RUNS, explicit_timestamps, get_semester_expiry_date
+
+SEED_BATCH_SIZE = 5000
+DEFAULT_PASSWORD = 'password123'
+# Localities used for route sources, stops and student addresses
+PLACES = [
+    'Shivaji Nagar', 'Deccan Gymkhana', 'Kothrud', 'Karve Nagar', 'Warje', 'Hadapsar', 'Magarpatta City',
+    'Kharadi', 'Viman Nagar', 'Yerawada', 'Vishrantwadi', 'Dhanori', 'Pimpri', 'Chinchwad', 'Akurdi',
+    'Nigdi', 'Wakad', 'Hinjewadi', 'Baner', 'Aundh', 'Pashan', 'Bavdhan', 'Sinhagad Road', 'Dhayari',
+    'Katraj', 'Bibwewadi', 'Kondhwa', 'Wanowrie', 'Camp', 'Swargate', 'Sadashiv Peth', 'Bhosari',
+]
+FIRST_NAMES = [
+    'Aarav', 'Aditi', 'Akash', 'Ananya', 'Arjun', 'Diya', 'Gaurav', 'Isha', 'Kavya', 'Kunal', 'Meera',
+    'Neha', 'Nikhil', 'Omkar', 'Pooja', 'Pranav', 'Priya', 'Rahul', 'Riya', 'Rohan', 'Sakshi', 'Sanket',
+    'Shreya', 'Siddharth', 'Sneha', 'Tanvi', 'Tejas', 'Varun', 'Vedant', 'Yash',
+]
+LAST_NAMES = [
+    'Bhosale', 'Chavan', 'Deshmukh', 'Deshpande', 'Gaikwad', 'Jadhav', 'Joshi', 'Kadam', 'Kulkarni',
+    'Mane', 'More', 'Patil', 'Pawar', 'Shinde', 'Shirke', 'Virkar', 'Wagh',
+]
+CLASS_NAMES = ['FE', 'SE', 'TE', 'BE', 'FY', 'SY', 'TY']
+# Route popularity falls off like a Zipf distribution with this exponent
+ROUTE_POPULARITY_EXPONENT = 0.8
+# Share of students who typed a route that matches no route name
+UNMATCHED_ROUTE_SHARE = 0.05
+APPLICATION_STATUSES = (['approved', 'pending', 'rejected'], [55, 30, 15])
+
+
+def _uuid(rng):
+    return uuid.UUID(int=rng.getrandbits(128), version=4)
+
+
+def _aware(day, rng):
+    # Office hours, in the current time zone
+    moment = datetime.combine(day, datetime.min.time()) + timedelta(seconds=rng.randrange(9 * 3600, 18 * 3600))
+    return timezone.make_aware(moment)
+
+
+def _semester_start(semester, year):
+    # Odd semesters run January to June, even ones July to December (see get_semester_expiry_date)
+    return date(year, 1, 1) if SEMESTERS.index(semester) % 2 == 0 else date(year, 7, 1)
+
+
+def _bulk_create(model, objects, batch_size):
+    """bulk_create from an iterable in batches; returns the number of rows"""
+    total = 0
+    batch = []
+    for obj in objects:
+        batch.append(obj)
+        if len(batch) >= batch_size:
+            model.objects.bulk_create(batch)
+            total += len(batch)
+            batch = []
+    if batch:
+        model.objects.bulk_create(batch)
+        total += len(batch)
+    return total
+
+
+class Seeder:
+    """Generate a reproducible synthetic dataset
+
+    Every value comes from one random.Random(seed) consumed in a fixed
+    order, and dates are laid out relative to as_of, so the same arguments
+    always produce the same rows (only shifted in time for another as_of).
+    Rows are written with bulk_create, which skips save() and signals:
+    tenants are set explicitly and the derived tables (seat counters,
+    summaries, search index) are rebuilt at the end.
+    """
+
+    def __init__(self, seed=0, tenants=1, routes=40, students=10000, passes=30000, applications=2000,
+                 as_of=None, password=DEFAULT_PASSWORD, batch_size=SEED_BATCH_SIZE, log=None):
+        self.rng = random.Random(seed)
+        self.tenant_count = tenants
+        self.route_count = routes
+        self.student_count = students
+        self.pass_count = passes
+        self.application_count = applications
+        self.as_of = as_of or timezone.localdate()
+        self.batch_size = batch_size
+        self.log = log or (lambda message: None)
+        # Hashing is deliberately slow; every student shares one precomputed hash
+        self.password_hash = make_password(password, salt=f'seed{seed}')
+        self.tenants = []
+        self.routes = {}
+        self.prices = {}
+        self.students = []
+
+    def run(self):
+        timings = {}
+        with transaction.atomic(), explicit_timestamps(Student, Route, RoutePrice, BusPass, MultiSemesterBusPassApplication):
+            for step in (self.create_tenants, self.create_routes, self.create_students, self.create_passes, self.create_applications):
+                start = time.perf_counter()
+                count = step()
+                timings[step.__name__] = time.perf_counter() - start
+                self.log(f'{step.__name__}: {count} rows in {timings[step.__name__]:.1f}s')
+        start = time.perf_counter()
+        self.rebuild_derived()
+        timings['rebuild_derived'] = time.perf_counter() - start
+        self.log(f"rebuild_derived: {timings['rebuild_derived']:.1f}s")
+        return timings
+
+    def create_tenants(self):
+        self.tenants = [get_default_tenant()]
+        for number in range(2, self.tenant_count + 1):
+            tenant, created = Tenant.objects.get_or_create(
+                slug=f'campus-{number}', defaults={'name': f'Campus {number}', 'domain': f'campus-{number}.localhost'},
+            )
+            self.tenants.append(tenant)
+        return len(self.tenants)
+
+    def create_routes(self):
+        rng = self.rng
+        routes = []
+        stops = []
+        prices = []
+        for tenant in self.tenants:
+            tenant_routes = []
+            for number in range(1, self.route_count + 1):
+                places = rng.sample(PLACES, rng.randint(4, 7))
+                start = datetime(2000, 1, 1, 6, 30) + timedelta(minutes=5 * rng.randrange(18))
+                route = Route(
+                    tenant=tenant, name=f'Route {number:02d}', source=places[0], destination='College',
+                    driver_name=f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+                    driver_contact=f'9{rng.randrange(10 ** 9):09d}',
+                    arrival_time_at_source=start.time(),
+                    arrival_time_at_destination=(start + timedelta(minutes=15 * len(places))).time(),
+                    is_active=rng.random() > 0.05,
+                    created_at=_aware(self.as_of - timedelta(days=rng.randrange(365, 5 * 365)), rng),
+                )
+                route.updated_at = route.created_at
+                tenant_routes.append((route, places[1:]))
+            routes.extend(tenant_routes)
+            self.routes[tenant.pk] = [route for route, stop_names in tenant_routes]
+        Route.objects.bulk_create([route for route, stop_names in routes], batch_size=self.batch_size)
+
+        for route, stop_names in routes:
+            arrival = datetime.combine(date(2000, 1, 1), route.arrival_time_at_source)
+            for sequence, name in enumerate(stop_names, 1):
+                arrival += timedelta(minutes=rng.randint(7, 15))
+                stops.append(RouteStop(route=route, sequence=sequence, name=name, arrival_time=arrival.time()))
+            # Longer routes cost more; later semesters a little more than earlier ones
+            base = Decimal(2500 + 500 * len(stop_names) + 50 * rng.randrange(20))
+            for index, semester in enumerate(SEMESTERS):
+                price = base + 100 * (index // 2)
+                prices.append(RoutePrice(
+                    tenant_id=route.tenant_id, route=route, semester=semester, price=price,
+                    created_at=route.created_at, updated_at=route.created_at,
+                ))
+                self.prices[route.pk, semester] = price
+        RouteStop.objects.bulk_create(stops, batch_size=self.batch_size)
+        RoutePrice.objects.bulk_create(prices, batch_size=self.batch_size)
+        return len(routes) + len(stops) + len(prices)
+
+    def _route_weights(self, count):
+        return [1 / (rank ** ROUTE_POPULARITY_EXPONENT) for rank in range(1, count + 1)]
+
+    def _students(self):
+        rng = self.rng
+        cum_weights = {tenant_id: list(accumulate(self._route_weights(len(routes)))) for tenant_id, routes in self.routes.items()}
+        riders = {}
+        for number in range(self.student_count):
+            tenant = self.tenants[number % len(self.tenants)]
+            route = rng.choices(self.routes[tenant.pk], cum_weights=cum_weights[tenant.pk])[0]
+            matched = rng.random() > UNMATCHED_ROUTE_SHARE
+            riders[route.pk] = riders.get(route.pk, 0) + 1
+            joined = self.as_of - timedelta(days=rng.randrange(30, 4 * 365))
+            created_at = _aware(joined, rng)
+            student_id = f'S{number + 1:07d}'
+            self.students.append((student_id, tenant.pk, route.pk, joined))
+            yield Student(
+                tenant=tenant, id=student_id,
+                fullname=f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+                class_name=rng.choice(CLASS_NAMES), clgid=100000 + number,
+                address=f'{rng.randint(1, 400)}, {rng.choice(PLACES)}, Pune',
+                route1=route.name if matched else f'{rng.choice(PLACES)} bus',
+                route=route if matched else None,
+                date_of_birth=joined - timedelta(days=rng.randrange(17 * 365, 21 * 365)),
+                aadhar=f'{200000000000 + number * 7919 % 800000000000:012d}',
+                mobile=f'{9000000000 + number:010d}',
+                email=f'{student_id.lower()}@{tenant.slug}.example.edu',
+                password=self.password_hash,
+                created_at=created_at, updated_at=created_at,
+            )
+        self.riders = riders
+
+    def create_students(self):
+        count = _bulk_create(Student, self._students(), self.batch_size)
+        # Size each route for the students who ride it, so seat counters stay below capacity
+        routes = [route for routes in self.routes.values() for route in routes]
+        for route in routes:
+            route.capacity = max(40, -(-self.riders.get(route.pk, 0) * 11 // 100) * 10)
+        Route.objects.bulk_update(routes, ['capacity'], batch_size=self.batch_size)
+        return count
+
+    def _pass_status(self, starts, expires):
+        rng = self.rng
+        if expires < self.as_of:
+            return rng.choices(['expired', 'rejected'], [92, 8])[0]
+        if starts <= self.as_of:
+            return rng.choices(['approved', 'pending', 'rejected'], [80, 15, 5])[0]
+        return rng.choices(['pending', 'approved'], [70, 30])[0]
+
+    def _passes(self):
+        rng = self.rng
+        per_student, extra = divmod(self.pass_count, self.student_count)
+        # Half-years are numbered year * 2 + (0 for January-June, 1 for July-December)
+        current_half = self.as_of.year * 2 + (self.as_of.month > 6)
+        for index, (student_id, tenant_id, route_id, joined) in enumerate(self.students):
+            count = per_student + (index < extra)
+            # A student's passes run semester by semester up to about now: most
+            # end with the current half-year, some already applied for the next
+            # one and some stopped taking the bus
+            last_half = current_half + rng.choices([1, 0, -1, -2], [10, 70, 15, 5])[0]
+            first_half = last_half - count + 1
+            # Odd semesters fall in January-June, so the index parity follows the half
+            offset = first_half % 2 + 2 * rng.randrange(3)
+            for number in range(count):
+                half = first_half + number
+                semester = SEMESTERS[(offset + number) % len(SEMESTERS)]
+                starts = _semester_start(semester, half // 2)
+                expires = get_semester_expiry_date(semester, half // 2)
+                applied = min(starts - timedelta(days=rng.randrange(0, 30)), self.as_of)
+                status = self._pass_status(starts, expires)
+                created_at = _aware(applied, rng)
+                decided_at = created_at + timedelta(hours=rng.randrange(1, 96)) if status != 'pending' else None
+                yield BusPass(
+                    tenant_id=tenant_id, id=_uuid(rng), student_id=student_id, route_id=route_id,
+                    semester=semester, issue_date=applied, expiry_date=expires, status=status,
+                    approved_at=decided_at if status in ('approved', 'expired') else None,
+                    rejected_at=decided_at if status == 'rejected' else None,
+                    created_at=created_at, updated_at=decided_at or created_at,
+                )
+
+    def create_passes(self):
+        return _bulk_create(BusPass, self._passes(), self.batch_size)
+
+    def _applications(self):
+        rng = self.rng
+        runs = [run for run in CONTINUOUS_SEMESTER_RUNS if len(json.loads(run)) > 1]
+        pending = set()
+        statuses, weights = APPLICATION_STATUSES
+        for number in range(self.application_count):
+            student_id, tenant_id, route_id, joined = self.students[number * 7 % len(self.students)]
+            semesters = rng.choice(runs)
+            status = rng.choices(statuses, weights)[0]
+            if status == 'pending':
+                # unique_pending_application allows one open application per student, route and run
+                if (student_id, route_id, semesters) in pending:
+                    status = 'rejected'
+                pending.add((student_id, route_id, semesters))
+            applied = self.as_of - timedelta(days=rng.randrange(0, 2 * 365) if status != 'pending' else rng.randrange(0, 30))
+            created_at = _aware(applied, rng)
+            decided_at = created_at + timedelta(hours=rng.randrange(1, 96)) if status != 'pending' else None
+            yield MultiSemesterBusPassApplication(
+                tenant_id=tenant_id, id=_uuid(rng), student_id=student_id, route_id=route_id,
+                semesters=semesters,
+                total_amount=sum(self.prices[route_id, semester] for semester in json.loads(semesters)),
+                issue_date=applied, status=status,
+                approved_at=decided_at if status == 'approved' else None,
+                rejected_at=decided_at if status == 'rejected' else None,
+                created_at=created_at, updated_at=decided_at or created_at,
+            )
+
+    def create_applications(self):
+        return _bulk_create(MultiSemesterBusPassApplication, self._applications(), self.batch_size)
+
+    def rebuild_derived(self):
+        from .capacity import rebuild_seat_counters
+        from .catalog import bump_catalog_version
+        from .search import rebuild_index
+        from .summaries import rebuild_all_summaries
+
+        rebuild_seat_counters()
+        rebuild_all_summaries()
+        rebuild_index()
+        for tenant in self.tenants:
+            bump_catalog_version(tenant)
@@ -0,0 +1,68 @@
+from rest_framework import serializers
+from .models import Student, Route, RoutePrice, BusPass, MultiSemesterBusPassApplication
+from .utils import parse_semesters
+
+
+class SparseFieldsMixin:
+    """Limit the serialized fields to the comma separated ?fields= list, if one is given"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        requested = request.query_params.get('fields') if request is not None else None
+        if requested:
+            wanted = {name.strip() for name in requested.split(',')}
+            for name in set(self.fields) - wanted:
+                self.fields.pop(name)
+
+
+class RoutePriceSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = RoutePrice
+        fields = ['semester', 'price']
+
+
+class RouteSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    prices = RoutePriceSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Route
+        fields = [
+            'id', 'name', 'source', 'destination', 'driver_name', 'driver_contact',
+            'arrival_time_at_source', 'arrival_time_at_destination', 'capacity', 'prices',
+        ]
+
+
+class StudentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Student
+        # Password hashes and Aadhar numbers never leave the server
+        fields = ['id', 'fullname', 'class_name', 'clgid', 'address', 'route', 'route1', 'date_of_birth', 'mobile', 'email', 'created_at', 'updated_at']
+
+
+class BusPassSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    route_name = serializers.CharField(source='route.name', read_only=True)
+    student_name = serializers.CharField(source='student.fullname', read_only=True)
+
+    class Meta:
+        model = BusPass
+        fields = [
+            'id', 'student', 'student_name', 'route', 'route_name', 'semester', 'status',
+            'issue_date', 'expiry_date', 'qr_code', 'payment_receipt', 'created_at', 'updated_at',
+        ]
+
+
+class MultiSemesterApplicationSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    route_name = serializers.CharField(source='route.name', read_only=True)
+    student_name = serializers.CharField(source='student.fullname', read_only=True)
+    semesters = serializers.SerializerMethodField()
+
+    class Meta:
+        model = MultiSemesterBusPassApplication
+        fields = [
+            'id', 'student', 'student_name', 'route', 'route_name', 'semesters', 'total_amount', 'status',
+            'issue_date', 'payment_receipt', 'created_at', 'updated_at',
+        ]
+
+    def get_semesters(self, obj):
+        return parse_semesters(obj.semesters)
@@ -0,0 +1,105 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.db import transaction
+from django.dispatch import receiver
+from .models import Tenant, Student, Route, RoutePrice, RouteStop, BusPass, MultiSemesterBusPassApplication
+from .capacity import apply_status_counts
+from .search import index_student, remove_student
+from .summaries import refresh_student_summaries, invalidate_student_caches
+from .catalog import bump_catalog_version
+from .events import send_status_changes
+from .tenancy import clear_tenant_caches
+
+
+@receiver(pre_save, sender=BusPass)
+@receiver(pre_save, sender=MultiSemesterBusPassApplication)
+def remember_previous_status(sender, instance, **kwargs):
+    # Keep the stored status so post_save can tell whether a seat was taken or freed
+    instance._previous_status = None
+    if not instance._state.adding:
+        instance._previous_status = sender.objects.filter(pk=instance.pk).values_list('status', flat=True).first()
+
+
+@receiver(pre_save, sender=BusPass)
+def take_seat_on_approval(sender, instance, raw=False, **kwargs):
+    # Before the row is written, so a pass saved as approved on a full route
+    # raises RouteFull instead of pushing the counter past the capacity
+    if raw:
+        return
+    previous_status = getattr(instance, '_previous_status', None)
+    if instance.status == 'approved' and previous_status != 'approved':
+        apply_status_counts([(instance.route_id, instance.semester, 1)], previous_status, instance.status)
+
+
+@receiver(post_save, sender=BusPass)
+def update_seat_counter_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous_status = getattr(instance, '_previous_status', None)
+    if previous_status == 'approved' and instance.status != 'approved':
+        apply_status_counts([(instance.route_id, instance.semester, 1)], previous_status, instance.status)
+
+
+@receiver(post_save, sender=BusPass)
+@receiver(post_save, sender=MultiSemesterBusPassApplication)
+def publish_status_change(sender, instance, raw=False, **kwargs):
+    if raw or getattr(instance, '_previous_status', None) == instance.status:
+        return
+    pass_type = 'bus_pass' if sender is BusPass else 'multi_semester'
+    send_status_changes([(pass_type, instance.pk, instance.student_id, instance.status)])
+
+
+@receiver(post_delete, sender=BusPass)
+def update_seat_counter_on_delete(sender, instance, **kwargs):
+    if instance.status == 'approved':
+        # Wait for the commit: when the whole route is being deleted, its counters and
+        # waitlist go with it and there is nothing left to promote
+        seat_counts = [(instance.route_id, instance.semester, 1)]
+        transaction.on_commit(lambda: apply_status_counts(seat_counts, 'approved', None))
+
+
+@receiver(post_save, sender=Student)
+def update_student_search_index(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_student(instance)
+
+
+@receiver(post_save, sender=Student)
+def invalidate_student_profile(sender, instance, raw=False, **kwargs):
+    # The profile is printed on the pass PDF
+    if not raw:
+        invalidate_student_caches([instance.pk])
+
+
+@receiver(post_delete, sender=Student)
+def remove_from_student_search_index(sender, instance, **kwargs):
+    remove_student(instance.pk)
+
+
+@receiver(post_save, sender=BusPass)
+@receiver(post_delete, sender=BusPass)
+@receiver(post_save, sender=MultiSemesterBusPassApplication)
+@receiver(post_delete, sender=MultiSemesterBusPassApplication)
+def update_student_pass_summary(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    student_id = instance.student_id
+    # Deferred to commit so a burst of changes in one transaction sees the final rows
+    transaction.on_commit(lambda: refresh_student_summaries([student_id]))
+
+
+@receiver(post_save, sender=Route)
+@receiver(post_delete, sender=Route)
+@receiver(post_save, sender=RoutePrice)
+@receiver(post_delete, sender=RoutePrice)
+@receiver(post_save, sender=RouteStop)
+@receiver(post_delete, sender=RouteStop)
+def invalidate_route_catalog(sender, instance, **kwargs):
+    route = instance if sender is Route else Route.unscoped.filter(pk=instance.route_id).select_related('tenant').first()
+    bump_catalog_version(route.tenant if route is not None else None)
+
+
+@receiver(post_save, sender=Tenant)
+@receiver(post_delete, sender=Tenant)
+def forget_tenants(sender, **kwargs):
+    # Host lookups are memoized per process; a changed domain or deactivation must be seen
+    clear_tenant_caches()
@@ -0,0 +1,108 @@
+import re
+from functools import lru_cache
+from .models import Route, RouteStop
+from .caching import get_or_compute
+from .catalog import get_catalog_version, CATALOG_CACHE_TIMEOUT, CATALOG_NAMESPACE
+from .tenancy import get_tenant_cache
+
+SUGGESTION_LIMIT = 3
+# Address words that say nothing about where a student lives
+IGNORED_WORDS = {
+    'near', 'opp', 'opposite', 'behind', 'road', 'rd', 'street', 'st', 'lane', 'flat', 'floor', 'no',
+    'house', 'building', 'bldg', 'apartment', 'society', 'soc', 'plot', 'sector', 'the', 'and', 'at',
+}
+
+
+def normalize_words(text):
+    return [word for word in re.findall(r'[a-z0-9]+', text.lower()) if len(word) > 1]
+
+
+def build_route_index():
+    """Index the pickup points (source and stops) of active routes by name
+
+    Returns {'routes': {route_id: name}, 'phrases': {stop name words: [pickup, ...]},
+    'words': {word: {route_id: (stop name, 'HH:MM')}}, 'max_words': longest stop
+    name in words}, where a pickup is (route_id, stop name, 'HH:MM').
+    """
+    phrases = {}
+    words = {}
+
+    def add(route_id, stop_name, arrival_time):
+        stop_words = tuple(normalize_words(stop_name))
+        if not stop_words:
+            return
+        pickup_time = f'{arrival_time:%H:%M}'
+        phrases.setdefault(stop_words, []).append((route_id, stop_name, pickup_time))
+        for word in stop_words:
+            if word not in IGNORED_WORDS:
+                words.setdefault(word, {}).setdefault(route_id, (stop_name, pickup_time))
+
+    routes = Route.objects.filter(is_active=True)
+    names = {}
+    for route_id, name, source, arrival_time in routes.values_list('id', 'name', 'source', 'arrival_time_at_source'):
+        names[route_id] = name
+        add(route_id, source, arrival_time)
+    # Stops have no tenant of their own; the subquery keeps them to this tenant's routes
+    stops = RouteStop.objects.filter(route__in=routes.values('id')).values_list('route_id', 'name', 'arrival_time')
+    for route_id, stop_name, arrival_time in stops:
+        add(route_id, stop_name, arrival_time)
+    return {
+        'routes': names,
+        'phrases': phrases,
+        'words': words,
+        'max_words': max((len(phrase) for phrase in phrases), default=0),
+    }
+
+
+@lru_cache(maxsize=4)
+def _route_index(version):
+    return get_or_compute(
+        CATALOG_NAMESPACE, 'route_index', build_route_index, CATALOG_CACHE_TIMEOUT,
+        cache=get_tenant_cache(), version=version,
+    )
+
+
+def get_route_index(version=None):
+    """Return the pickup index, cached per catalog version like the price matrix"""
+    return _route_index(version or get_catalog_version())
+
+
+def suggest_routes(address, limit=SUGGESTION_LIMIT):
+    """Rank active routes by how well their pickup points match a free-text address
+
+    A stop whose whole name appears in the address scores two points per
+    word; other shared words score by how few routes use them. Returns up to
+    limit dicts of route_id, route_name, stop, arrival_time and score, best
+    first. The lookup is a dictionary probe per address n-gram, so it does
+    not grow with the number of routes.
+    """
+    index = get_route_index()
+    address_words = normalize_words(address)
+    scores = {}
+    pickups = {}
+
+    for size in range(min(index['max_words'], len(address_words)), 0, -1):
+        for start in range(len(address_words) - size + 1):
+            for route_id, stop_name, arrival_time in index['phrases'].get(tuple(address_words[start:start + size]), ()):
+                scores[route_id] = scores.get(route_id, 0) + 2 * size
+                # Longer phrases are tried first, so the first hit is the best pickup
+                pickups.setdefault(route_id, (stop_name, arrival_time))
+
+    for word in set(address_words) - IGNORED_WORDS:
+        stops = index['words'].get(word, {})
+        for route_id, pickup in stops.items():
+            scores[route_id] = scores.get(route_id, 0) + 1 / len(stops)
+            pickups.setdefault(route_id, pickup)
+
+    ranked = sorted(scores.items(), key=lambda item: -item[1])[:limit]
+    suggestions = []
+    for route_id, score in ranked:
+        stop_name, arrival_time = pickups.get(route_id, (None, None))
+        suggestions.append({
+            'route_id': route_id,
+            'route_name': index['routes'][route_id],
+            'stop': stop_name,
+            'arrival_time': arrival_time,
+            'score': round(score, 2),
+        })
+    return suggestions
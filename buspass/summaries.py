@@ -0,0 +1,122 @@
+from datetime import date
+from django.db.models import Count, Q
+from django.utils import timezone
+from .models import Student, BusPass, MultiSemesterBusPassApplication, StudentPassSummary
+from .caching import bump_versions_on_commit
+
+SUMMARY_FIELDS = [
+    'total_passes', 'approved_passes', 'pending_passes', 'rejected_passes',
+    'total_applications', 'pending_applications', 'current_pass', 'next_expiry', 'updated_at',
+]
+
+PASS_COUNTS = {
+    'total_passes': Count('id'),
+    'approved_passes': Count('id', filter=Q(status='approved')),
+    'pending_passes': Count('id', filter=Q(status='pending')),
+    'rejected_passes': Count('id', filter=Q(status='rejected')),
+}
+
+# Cached dashboard fragments and PDFs are invalidated by version, so the
+# timeout only bounds how long entries of inactive students linger
+STUDENT_CACHE_TIMEOUT = 24 * 60 * 60
+
+APPLICATION_COUNTS = {
+    'total_applications': Count('id'),
+    'pending_applications': Count('id', filter=Q(status='pending')),
+}
+
+
+def student_cache_namespace(student_id):
+    """Cache namespace of everything rendered from a student's passes (dashboard list, PDFs)"""
+    return f'student:{student_id}'
+
+
+def invalidate_student_caches(student_ids):
+    bump_versions_on_commit(student_cache_namespace(student_id) for student_id in set(student_ids))
+
+
+def _build_summaries(student_ids):
+    """Compute summaries for a batch of students with one query per source table"""
+    today = date.today()
+    summaries = {student_id: StudentPassSummary(student_id=student_id) for student_id in student_ids}
+
+    pass_counts = (
+        BusPass.objects.filter(student_id__in=student_ids)
+        .order_by().values('student_id').annotate(**PASS_COUNTS)
+    )
+    for row in pass_counts:
+        for field in PASS_COUNTS:
+            setattr(summaries[row['student_id']], field, row[field])
+
+    application_counts = (
+        MultiSemesterBusPassApplication.objects.filter(student_id__in=student_ids)
+        .order_by().values('student_id').annotate(**APPLICATION_COUNTS)
+    )
+    for row in application_counts:
+        for field in APPLICATION_COUNTS:
+            setattr(summaries[row['student_id']], field, row[field])
+
+    # The current pass is the approved, unexpired pass that runs out first
+    valid_passes = (
+        BusPass.objects.filter(student_id__in=student_ids, status='approved', expiry_date__gte=today)
+        .order_by('student_id', 'expiry_date').values_list('student_id', 'id', 'expiry_date')
+    )
+    for student_id, pass_id, expiry_date in valid_passes:
+        summary = summaries[student_id]
+        if summary.current_pass_id is None:
+            summary.current_pass_id = pass_id
+            summary.next_expiry = expiry_date
+
+    now = timezone.now()
+    for summary in summaries.values():
+        summary.updated_at = now
+    return list(summaries.values())
+
+
+def refresh_student_summaries(student_ids):
+    """Recompute and upsert the summaries for the given students
+
+    Every pass or application change ends up here, so this is also where
+    the students' cached dashboard fragments and PDFs are invalidated.
+    """
+    # Skip students deleted since the refresh was scheduled
+    student_ids = list(Student.objects.filter(pk__in=set(student_ids)).values_list('pk', flat=True))
+    if not student_ids:
+        return []
+    summaries = _build_summaries(student_ids)
+    StudentPassSummary.objects.bulk_create(
+        summaries,
+        update_conflicts=True,
+        unique_fields=['student'],
+        update_fields=SUMMARY_FIELDS,
+    )
+    invalidate_student_caches(student_ids)
+    return summaries
+
+
+def get_student_summary(student):
+    """Return the summary for a student, rebuilding it if missing or past its next expiry
+
+    Load the student with select_related('pass_summary__current_pass__route') to
+    get everything in the same query.
+    """
+    summary = getattr(student, 'pass_summary', None)
+    if summary is None or (summary.next_expiry and summary.next_expiry < date.today()):
+        refresh_student_summaries([student.pk])
+        summary = StudentPassSummary.objects.select_related('current_pass__route').get(student_id=student.pk)
+    return summary
+
+
+def rebuild_all_summaries(batch_size=1000):
+    """Rebuild every student's summary in batches; returns the number of students"""
+    total = 0
+    student_ids = Student.objects.order_by('pk').values_list('pk', flat=True)
+    batch = []
+    for student_id in student_ids.iterator(chunk_size=batch_size):
+        batch.append(student_id)
+        if len(batch) >= batch_size:
+            total += len(refresh_student_summaries(batch))
+            batch = []
+    if batch:
+        total += len(refresh_student_summaries(batch))
+    return total
@@ -0,0 +1,125 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+from django.core.cache import cache as default_cache
+from django.db import models
+from django.http import Http404
+from django.utils.module_loading import import_string
+
+_current_tenant = ContextVar('buspass_tenant', default=None)
+
+# Per process: host -> Tenant and tenant id -> cache. Tenants change rarely;
+# signals.clear_tenant_caches empties both when one is saved or deleted
+_tenants_by_host = {}
+_default_tenant = []
+_tenant_caches = {}
+
+
+def get_current_tenant():
+    """Return the tenant of the request being handled, or None outside a request"""
+    return _current_tenant.get()
+
+
+@contextmanager
+def tenant_context(tenant):
+    """Scope tenant-aware querysets to tenant for the duration of the block"""
+    token = _current_tenant.set(tenant)
+    try:
+        yield tenant
+    finally:
+        _current_tenant.reset(token)
+
+
+def get_default_tenant():
+    """The tenant used for unknown hosts and for rows created outside a request"""
+    if not _default_tenant:
+        from .models import Tenant
+        tenant, created = Tenant.objects.get_or_create(
+            slug=settings.DEFAULT_TENANT_SLUG, defaults={'name': settings.DEFAULT_TENANT_SLUG.title()},
+        )
+        _default_tenant.append(tenant)
+    return _default_tenant[0]
+
+
+def resolve_tenant(host):
+    """Return the tenant serving host, falling back to the default tenant for unknown hosts"""
+    host = host.split(':', 1)[0].lower()
+    if host not in _tenants_by_host:
+        from .models import Tenant
+        tenant = Tenant.objects.filter(domain=host).first()
+        _tenants_by_host[host] = tenant or get_default_tenant()
+    return _tenants_by_host[host]
+
+
+def clear_tenant_caches():
+    _tenants_by_host.clear()
+    _default_tenant.clear()
+    _tenant_caches.clear()
+
+
+class TenantMiddleware:
+    """Resolve the tenant from the Host header once per request and scope queries to it"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.tenant = resolve_tenant(request.get_host())
+        if not request.tenant.is_active:
+            raise Http404('Unknown campus')
+        with tenant_context(request.tenant):
+            return self.get_response(request)
+
+
+class TenantManager(models.Manager):
+    """Default manager that only returns the current tenant's rows
+
+    Outside a request (management commands, background jobs, migrations)
+    no tenant is set and every row is visible. Forward relations
+    (bus_pass.student) go through the plain base manager and are never
+    filtered; reverse and many-to-many managers (student.bus_passes) are
+    built from the model's default manager, so they are filtered to the
+    current tenant like objects. Tables without a tenant column of their own
+    are scoped through a relation, for example TenantManager('route__tenant').
+    """
+
+    def __init__(self, tenant_lookup='tenant'):
+        super().__init__()
+        self.tenant_lookup = tenant_lookup
+
+    def tenant_filter(self, tenant):
+        # Related managers subclass this class without its arguments, so the
+        # lookup is read from the model's own default manager
+        return models.Q(**{self.model._default_manager.tenant_lookup: tenant})
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        tenant = get_current_tenant()
+        if tenant is not None:
+            queryset = queryset.filter(self.tenant_filter(tenant))
+        return queryset
+
+
+def get_tenant_cache(tenant=None):
+    """Return the tenant's own cache (the current one by default), or the default cache outside a request
+
+    Each tenant gets a separate instance of settings.TENANT_CACHE (LOCATION
+    is formatted with the tenant slug), so a surge on one campus culls only
+    that campus's entries.
+    """
+    tenant = tenant or get_current_tenant()
+    if tenant is None:
+        return default_cache
+    if tenant.pk not in _tenant_caches:
+        config = dict(settings.TENANT_CACHE)
+        backend = import_string(config.pop('BACKEND'))
+        location = config.pop('LOCATION', '').format(tenant=tenant.slug)
+        config.setdefault('KEY_PREFIX', f'tenant-{tenant.slug}')
+        _tenant_caches[tenant.pk] = backend(location, config)
+    return _tenant_caches[tenant.pk]
+
+
+def get_tenant_key():
+    """A short string identifying the current tenant, for keys shared across tenants"""
+    tenant = get_current_tenant()
+    return tenant.slug if tenant is not None else '-'
@@ -1,3 +1,1372 @@
-from django.test import TestCase
+import importlib
+import json
+import random
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from io import BytesIO
+from unittest import mock
+from asgiref.sync import sync_to_async
+from django.apps import apps
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.paginator import Paginator
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, reverse
+from django.utils import timezone
+from . import urls
+from .models import (
+    Tenant, Student, Route, RoutePrice, RouteStop, BusPass, MultiSemesterBusPassApplication, WaitlistEntry, RouteSeatCounter,
+    PassAuditLog, ReceiptFingerprint, ArchivedBusPass, ArchivedMultiSemesterApplication, Notification,
+    BackgroundJob, StudentPassSummary,
+)
+from .approvals import approve_passes, reject_passes, approve_applications, reject_applications
+from .archive import archive_applications, archive_passes, restore_applications, restore_passes
+from .cache_backends import SQLiteCache
+from .caching import bump_versions, get_metrics, get_or_compute, get_version, reset_metrics
+from .capacity import RouteFull, get_seats_taken, add_to_waitlist
+from .duplicates import BKTree, PerceptualHashIndex, find_matching_fingerprints, fingerprint_receipt, get_duplicate_receipts
+from .expiry import expire_passes
+from .media import IMMUTABLE_CACHE_CONTROL
+from .jobs import JOB_HANDLERS, STALE_JOB_TIMEOUT, claim_job, retry_failed_items, submit_job, work
+from .notifications import MAX_ATTEMPTS, FileChannel, RateLimiter, claim_notifications, deliver, dispatch, enqueue_notifications
+from .querycheck import QueryProfile, compare_to_baseline, load_baseline, save_baseline
+from .seeding import Seeder, DEFAULT_PASSWORD
+from .paginators import LargeTablePaginator
+from .pricing import PriceNotFound, quote
+from .ridership import get_daily_counts, record_scans, ridership_report
+from .search import rebuild_index, search_students
+from .thumbnails import THUMBNAIL_SIZE, make_receipt_thumbnail
+from .suggestions import suggest_routes
+from .summaries import get_student_summary, rebuild_all_summaries
+from .tenancy import _tenant_caches, clear_tenant_caches, get_current_tenant, tenant_context
+from .utils import SEMESTERS, generate_qr_code, get_semester_expiry_date
+from .warmup import warm_up
 
-# Create your tests here.
+
+class MediaTestCase(TestCase):
+    """TestCase whose uploads and QR codes go to a temporary MEDIA_ROOT, removed afterwards"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp()
+        cls.media_settings = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.media_settings.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.media_settings.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+
+
+class ApiTests(MediaTestCase):
+    """Query budgets for the read-only API; the counts must not grow with the number of rows"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('staff', password='pw', is_staff=True)
+        cls.routes = []
+        for i in range(3):
+            route = Route.objects.create(name=f'Route {i}', source='A', destination='B')
+            RoutePrice.objects.create(route=route, semester='Semester-1', price='100.00')
+            RoutePrice.objects.create(route=route, semester='Semester-2', price='150.50')
+            cls.routes.append(route)
+        cls.students = []
+        for i in range(5):
+            student = Student.objects.create(
+                id=f'S{i}', fullname=f'Student {i}', class_name='FY', clgid=i, address='Address', route1='Route 0',
+                date_of_birth=date(2005, 1, 1), aadhar=f'{i:012d}', mobile=f'{i:010d}', email=f's{i}@example.com',
+                password=make_password('pw'),
+            )
+            cls.students.append(student)
+            for semester in ('Semester-1', 'Semester-2'):
+                BusPass.objects.create(student=student, route=cls.routes[i % 3], semester=semester, expiry_date=date(2099, 6, 30))
+            MultiSemesterBusPassApplication.objects.create(
+                student=student, route=cls.routes[0], semesters='["Semester-3", "Semester-4"]', total_amount='250.50', status='rejected',
+            )
+
+    def login_staff(self):
+        self.client.force_login(self.staff)
+
+    def login_student(self, student):
+        self.client.post('/login/', {'login_identifier': student.id, 'password': 'pw'})
+
+    def test_route_list_queries(self):
+        # Catalog version lookups hit the cache, not the database
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/routes/')
+        self.assertEqual(len(response.json()['results']), 3)
+        self.assertEqual(response.json()['results'][0]['prices'][1]['price'], '150.50')
+
+    def test_pass_list_queries(self):
+        self.login_staff()
+        # session, user, page; the ETag is built from the page's rows
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/passes/')
+        self.assertEqual(len(response.json()['results']), 10)
+
+    def test_application_list_queries(self):
+        self.login_staff()
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/applications/')
+        self.assertEqual(response.json()['results'][0]['semesters'], ['Semester-3', 'Semester-4'])
+
+    def test_student_list_queries(self):
+        self.login_staff()
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/students/')
+        self.assertNotIn('password', response.json()['results'][0])
+
+    def test_pass_detail_queries(self):
+        self.login_staff()
+        bus_pass = BusPass.objects.first()
+        # session, user, ETag lookup, object
+        with self.assertNumQueries(4):
+            response = self.client.get(f'/api/passes/{bus_pass.pk}/')
+        self.assertEqual(response.json()['id'], str(bus_pass.pk))
+
+    def test_not_modified_skips_serialization(self):
+        self.login_staff()
+        response = self.client.get('/api/passes/')
+        # session, user, page only
+        with self.assertNumQueries(3):
+            cached = self.client.get('/api/passes/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, 304)
+        BusPass.objects.filter(pk=BusPass.objects.first().pk).update(status='approved', updated_at=timezone.now() + timedelta(minutes=1))
+        self.assertEqual(self.client.get('/api/passes/', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+
+    def test_sparse_fields_and_cursor(self):
+        self.login_staff()
+        response = self.client.get('/api/passes/?fields=id,status&page_size=4').json()
+        self.assertEqual(set(response['results'][0]), {'id', 'status'})
+        self.assertIn('cursor=', response['next'])
+        second = self.client.get(response['next']).json()
+        self.assertEqual(len(second['results']), 4)
+        self.assertFalse({row['id'] for row in response['results']} & {row['id'] for row in second['results']})
+
+    def test_students_only_see_their_own_rows(self):
+        self.login_student(self.students[1])
+        self.assertEqual([row['id'] for row in self.client.get('/api/students/').json()['results']], ['S1'])
+        passes = self.client.get('/api/passes/').json()['results']
+        self.assertEqual({row['student'] for row in passes}, {'S1'})
+        other = BusPass.objects.filter(student=self.students[2]).first()
+        self.assertEqual(self.client.get(f'/api/passes/{other.pk}/').status_code, 404)
+
+    def test_anonymous_users_only_get_routes(self):
+        self.assertEqual(self.client.get('/api/routes/').status_code, 200)
+        self.assertEqual(self.client.get('/api/passes/').status_code, 403)
+
+
+class PassEventsTests(MediaTestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user('staff', password='pw', is_staff=True)
+        route = Route.objects.create(name='Route 0', source='A', destination='B')
+        self.student = Student.objects.create(
+            id='S0', fullname='Student 0', class_name='FY', clgid=0, address='Address', route1='Route 0',
+            date_of_birth=date(2005, 1, 1), aadhar='0' * 12, mobile='0' * 10, email='s0@example.com',
+            password=make_password('pw'),
+        )
+        self.bus_pass = BusPass.objects.create(student=self.student, route=route, semester='Semester-1', expiry_date=date(2099, 6, 30))
+
+    def test_requires_student_login(self):
+        self.assertEqual(self.client.get('/dashboard/events/').status_code, 403)
+
+    async def test_stream_pushes_status_change(self):
+        await self.async_client.post('/login/', {'login_identifier': 'S0', 'password': 'pw'})
+        response = await self.async_client.get('/dashboard/events/')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+        await anext(stream)
+        self.assertIn(b'"status": "pending"', await anext(stream))
+
+        def approve():
+            with self.captureOnCommitCallbacks(execute=True):
+                approve_passes(BusPass.objects.filter(pk=self.bus_pass.pk), self.staff)
+
+        await sync_to_async(approve)()
+        event = await anext(stream)
+        self.assertTrue(event.startswith(b'event: status\n'))
+        self.assertIn(b'"status": "approved"', event)
+        await stream.aclose()
+
+
+class AdminSearchTests(MediaTestCase):
+    """Pass and application changelists find students by part of their mobile number or email"""
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser('admin', password='pw'))
+        route = Route.objects.create(name='Route 0', source='A', destination='B')
+        for i, (mobile, email) in enumerate((('9876543210', 'asha@college.edu'), ('9123456780', 'ravi@mail.com'))):
+            student = Student.objects.create(
+                id=f'S{i}', fullname=f'Student {i}', class_name='FY', clgid=i, address='Address', route1='Route 0',
+                date_of_birth=date(2005, 1, 1), aadhar=f'{i:012d}', mobile=mobile, email=email, password=make_password('pw'),
+            )
+            BusPass.objects.create(student=student, route=route, semester='Semester-1', expiry_date=date(2099, 6, 30))
+            MultiSemesterBusPassApplication.objects.create(student=student, route=route, semesters='["Semester-1"]', total_amount='100.00')
+
+    def search(self, model_name, term):
+        response = self.client.get(reverse(f'admin:buspass_{model_name}_changelist'), {'q': term})
+        return {obj.student_id for obj in response.context['cl'].result_list}
+
+    def test_partial_mobile_and_email(self):
+        for model_name in ('buspass', 'multisemesterbuspassapplication'):
+            self.assertEqual(self.search(model_name, '654'), {'S0'})
+            self.assertEqual(self.search(model_name, 'mail.com'), {'S1'})
+            self.assertEqual(self.search(model_name, 'S1'), {'S1'})
+
+
+class CapacityTests(MediaTestCase):
+    """Seat counters follow approvals, rejections and deletions, and never pass a route's capacity"""
+
+    def setUp(self):
+        self.staff = User.objects.create_user('staff', password='pw', is_staff=True)
+        self.route = Route.objects.create(name='Route 0', source='A', destination='B', capacity=2)
+        self.students = [
+            Student.objects.create(
+                id=f'S{i}', fullname=f'Student {i}', class_name='FY', clgid=i, address='Address', route1='Route 0',
+                date_of_birth=date(2005, 1, 1), aadhar=f'{i:012d}', mobile=f'{i:010d}', email=f's{i}@example.com',
+                password=make_password('pw'),
+            )
+            for i in range(4)
+        ]
+
+    def create_pass(self, student, status='pending', semester='Semester-1'):
+        return BusPass.objects.create(student=student, route=self.route, semester=semester, expiry_date=date(2099, 6, 30), status=status)
+
+    def seats_taken(self, semester='Semester-1'):
+        return get_seats_taken(self.route.pk, semester)
+
+    def test_approve_stops_at_capacity(self):
+        passes = [self.create_pass(student) for student in self.students[:3]]
+        self.assertEqual(approve_passes(BusPass.objects.all(), self.staff), (2, 1))
+        self.assertEqual(self.seats_taken(), 2)
+        # Oldest first: the last application is the one left waiting
+        statuses = [BusPass.objects.get(pk=bus_pass.pk).status for bus_pass in passes]
+        self.assertEqual(statuses, ['approved', 'approved', 'pending'])
+        self.assertEqual(approve_passes(BusPass.objects.all(), self.staff), (0, 1))
+        self.assertEqual(self.seats_taken(), 2)
+
+    def test_approve_applications_needs_a_seat_in_every_semester(self):
+        self.create_pass(self.students[0], 'approved', 'Semester-2')
+        self.create_pass(self.students[1], 'approved', 'Semester-2')
+        for student, semesters in ((self.students[2], '["Semester-1", "Semester-2"]'), (self.students[3], '["Semester-1"]')):
+            MultiSemesterBusPassApplication.objects.create(student=student, route=self.route, semesters=semesters, total_amount='100.00')
+        self.assertEqual(approve_applications(MultiSemesterBusPassApplication.objects.all(), self.staff), (1, 1, 1))
+        self.assertEqual(MultiSemesterBusPassApplication.objects.get(student=self.students[2]).status, 'pending')
+        self.assertEqual((self.seats_taken('Semester-1'), self.seats_taken('Semester-2')), (1, 2))
+
+    def test_reject_frees_seat_and_promotes_waitlist(self):
+        approved = [self.create_pass(student, 'approved') for student in self.students[:2]]
+        add_to_waitlist(self.students[2], self.route, 'Semester-1')
+        self.create_pass(self.students[3])
+        # Rejecting a pending pass leaves the counter alone
+        self.assertEqual(reject_passes(BusPass.objects.filter(student=self.students[3]), self.staff), 1)
+        self.assertEqual(self.seats_taken(), 2)
+        approved[0].status = 'rejected'
+        approved[0].save()
+        self.assertEqual(self.seats_taken(), 1)
+        entry = WaitlistEntry.objects.get(student=self.students[2])
+        self.assertEqual(entry.promoted_pass.status, 'pending')
+
+    def test_delete_frees_seat(self):
+        bus_pass = self.create_pass(self.students[0], 'approved')
+        self.assertEqual(self.seats_taken(), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            bus_pass.delete()
+        self.assertEqual(self.seats_taken(), 0)
+
+    def test_change_form_approval_on_a_full_route_is_refused(self):
+        for student in self.students[:2]:
+            self.create_pass(student, 'approved')
+        bus_pass = self.create_pass(self.students[2])
+        self.client.force_login(User.objects.create_superuser('admin', password='pw'))
+        response = self.client.post(reverse('admin:buspass_buspass_change', args=[bus_pass.pk]), {
+            'student': bus_pass.student_id, 'route': self.route.pk, 'semester': 'Semester-1',
+            'expiry_date': '2099-06-30', 'status': 'approved', 'notes': '',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Route 0 is full for Semester-1')
+        self.assertEqual(BusPass.objects.get(pk=bus_pass.pk).status, 'pending')
+        self.assertEqual(self.seats_taken(), 2)
+
+    def test_saving_an_approval_on_a_full_route_raises(self):
+        for student in self.students[:2]:
+            self.create_pass(student, 'approved')
+        bus_pass = self.create_pass(self.students[2])
+        bus_pass.status = 'approved'
+        with self.assertRaises(RouteFull), transaction.atomic():
+            bus_pass.save()
+        self.assertEqual(BusPass.objects.get(pk=bus_pass.pk).status, 'pending')
+        self.assertEqual(self.seats_taken(), 2)
+
+    def test_promotion_skips_students_with_a_pass(self):
+        approved = [self.create_pass(student, 'approved') for student in self.students[:2]]
+        add_to_waitlist(self.students[2], self.route, 'Semester-1')
+        add_to_waitlist(self.students[3], self.route, 'Semester-1')
+        self.create_pass(self.students[2])
+        approved[0].status = 'rejected'
+        approved[0].save()
+        entries = {entry.student_id: entry for entry in WaitlistEntry.objects.all()}
+        self.assertIsNotNone(entries['S2'].promoted_at)
+        self.assertIsNone(entries['S2'].promoted_pass)
+        self.assertEqual(entries['S3'].promoted_pass.status, 'pending')
+
+
+class AuditLogTests(MediaTestCase):
+    """Every approval and rejection leaves one audit row per pass or application it changed"""
+
+    def setUp(self):
+        self.staff = User.objects.create_user('staff', password='pw', is_staff=True)
+        self.route = Route.objects.create(name='Route 0', source='A', destination='B')
+        self.students = [
+            Student.objects.create(
+                id=f'S{i}', fullname=f'Student {i}', class_name='FY', clgid=i, address='Address', route1='Route 0',
+                date_of_birth=date(2005, 1, 1), aadhar=f'{i:012d}', mobile=f'{i:010d}', email=f's{i}@example.com',
+                password=make_password('pw'),
+            )
+            for i in range(3)
+        ]
+
+    def logs(self):
+        return sorted(PassAuditLog.objects.values_list('pass_type', 'object_id', 'action', 'performed_by'))
+
+    def test_pass_decisions_are_logged_once(self):
+        passes = [
+            BusPass.objects.create(student=student, route=self.route, semester='Semester-1', expiry_date=date(2099, 6, 30))
+            for student in self.students
+        ]
+        approve_passes(BusPass.objects.filter(pk__in=[passes[0].pk, passes[1].pk]), self.staff)
+        reject_passes(BusPass.objects.all(), self.staff)
+        self.assertEqual(self.logs(), sorted([
+            ('bus_pass', passes[0].pk, 'approved', self.staff.pk),
+            ('bus_pass', passes[1].pk, 'approved', self.staff.pk),
+            ('bus_pass', passes[2].pk, 'rejected', self.staff.pk),
+        ]))
+        log = PassAuditLog.objects.get(object_id=passes[0].pk)
+        self.assertEqual(log.created_at, BusPass.objects.get(pk=passes[0].pk).approved_at)
+
+    def test_application_approval_logs_the_issued_passes(self):
+        applications = [
+            MultiSemesterBusPassApplication.objects.create(
+                student=student, route=self.route, semesters='["Semester-1", "Semester-2"]', total_amount='100.00',
+            )
+            for student in self.students[:2]
+        ]
+        approve_applications(MultiSemesterBusPassApplication.objects.filter(pk=applications[0].pk), self.staff)
+        reject_applications(MultiSemesterBusPassApplication.objects.all(), self.staff)
+        issued = BusPass.objects.filter(student=self.students[0]).values_list('pk', flat=True)
+        self.assertEqual(len(issued), 2)
+        self.assertEqual(self.logs(), sorted(
+            [('multi_semester', applications[0].pk, 'approved', self.staff.pk), ('multi_semester', applications[1].pk, 'rejected', self.staff.pk)]
+            + [('bus_pass', pk, 'approved', self.staff.pk) for pk in issued]
+        ))
+
+
+class TenancyTests(MediaTestCase):
+    """Rows of another campus never show up, and never crowd out the current campus's rows"""
+
+    def setUp(self):
+        clear_tenant_caches()
+        self.campus = Tenant.objects.create(name='Campus', slug='campus', domain='campus.example.com')
+        self.other = Tenant.objects.create(name='Other', slug='other', domain='other.example.com')
+        for i in range(6):
+            with tenant_context(self.other if i else self.campus):
+                Student.objects.create(
+                    id=f'S{i}', fullname=f'Kumar {i}', class_name='FY', clgid=i, address='Address', route1='Route 0',
+                    date_of_birth=date(2005, 1, 1), aadhar=f'{i:012d}', mobile=f'{i:010d}', email=f's{i}@example.com',
+                    password=make_password('pw'),
+                )
+
+    @override_settings(ALLOWED_HOSTS=['*'])
+    def test_contact_details_are_unique_per_campus(self):
+        # S1 (other campus) reuses S0's Aadhar, mobile and email
+        Student.unscoped.filter(pk='S1').update(aadhar='0' * 12, mobile='0' * 10, email='s0@example.com')
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Student.unscoped.filter(pk='S2').update(mobile='0' * 10)
+        for host, student_id in (('campus.example.com', 'S0'), ('other.example.com', 'S1')):
+            client = Client(HTTP_HOST=host)
+            client.post('/login/', {'login_identifier': '0' * 10, 'password': 'pw'})
+            self.assertEqual(client.session['student_id'], student_id)
+
+    def test_jobs_run_in_the_campus_they_were_submitted_from(self):
+        seen = []
+        with mock.patch.dict(JOB_HANDLERS, {'approve_passes': lambda user, object_ids: seen.append(get_current_tenant())}):
+            with tenant_context(self.other):
+                job = submit_job('approve_passes', ['x'], None)
+            with tenant_context(self.campus):
+                self.assertFalse(BackgroundJob.objects.exists())
+            self.assertEqual(work('worker', once=True), 1)
+        self.assertEqual(seen, [self.other])
+        self.assertEqual(BackgroundJob.objects.get(pk=job.pk).status, 'completed')
+
+    def test_search_limit_applies_within_the_campus(self):
+        with tenant_context(self.campus):
+            self.assertEqual([student.id for student in search_students('Kumar', limit=3)], ['S0'])
+        with tenant_context(self.other):
+            self.assertEqual(len(search_students('Kumar', limit=3)), 3)
+
+    def test_tables_without_a_tenant_column_are_scoped_through_relations(self):
+        for tenant in (self.campus, self.other):
+            with tenant_context(tenant):
+                route = Route.objects.create(name=tenant.name, source='A', destination='B')
+                bus_pass = BusPass.objects.create(
+                    student=Student.objects.first(), route=route, semester='Semester-1', expiry_date=date(2099, 6, 30), status='approved',
+                )
+                PassAuditLog.objects.create(pass_type='bus_pass', object_id=bus_pass.pk, action='approved')
+        with tenant_context(self.campus):
+            self.assertEqual([counter.route.name for counter in RouteSeatCounter.objects.all()], ['Campus'])
+            # Reverse managers are built from the relation-scoped manager without its arguments
+            self.assertEqual(Route.objects.get().seat_counters.count(), 1)
+            self.assertEqual(PassAuditLog.objects.get().object_id, BusPass.objects.get().pk)
+        self.assertEqual(PassAuditLog.objects.count(), 2)
+
+    def test_receipt_matches_stay_within_the_campus(self):
+        fingerprints = [
+            ReceiptFingerprint.objects.create(
+                pass_type='bus_pass', object_id=uuid.uuid4(), student_id=student_id, receipt=f'receipts/{student_id}.pdf',
+                hash_kind='content', hash='same',
+            )
+            for student_id in ('S0', 'S1', 'S2')
+        ]
+        self.assertEqual(list(find_matching_fingerprints(fingerprints[1])), [fingerprints[2]])
+        self.assertEqual(list(find_matching_fingerprints(fingerprints[0])), [])
+
+    def test_paginator_treats_the_tenant_filter_as_unfiltered(self):
+        with tenant_context(self.campus):
+            self.assertTrue(LargeTablePaginator(Student.objects.all(), 25)._only_tenant_filter())
+            self.assertFalse(LargeTablePaginator(Student.objects.filter(class_name='FY'), 25)._only_tenant_filter())
+            self.assertFalse(LargeTablePaginator(Student.unscoped.filter(tenant=self.other), 25)._only_tenant_filter())
+            self.assertTrue(LargeTablePaginator(RouteSeatCounter.objects.all(), 25)._only_tenant_filter())
+
+    def test_deferred_join_pages_match_offset_pages(self):
+        students = Student.unscoped.order_by('fullname', 'pk')
+        paginator = LargeTablePaginator(students, 2)
+        paginator.deferred_join_offset = 0
+        for number in paginator.page_range:
+            self.assertEqual(list(paginator.page(number)), list(Paginator(students, 2).page(number)))
+
+
+class BackgroundJobTests(MediaTestCase):
+    """Jobs run in batches, isolate failing items and are handed over when their worker dies"""
+
+    def setUp(self):
+        self.staff = User.objects.create_user('staff', password='pw', is_staff=True)
+        route = Route.objects.create(name='Route 0', source='A', destination='B')
+        self.passes = [
+            BusPass.objects.create(
+                student=Student.objects.create(
+                    id=f'S{i}', fullname=f'Student {i}', class_name='FY', clgid=i, address='Address', route1='Route 0',
+                    date_of_birth=date(2005, 1, 1), aadhar=f'{i:012d}', mobile=f'{i:010d}', email=f's{i}@example.com',
+                    password=make_password('pw'),
+                ),
+                route=route, semester='Semester-1', expiry_date=date(2099, 6, 30),
+            )
+            for i in range(3)
+        ]
+
+    def test_job_processes_every_item_in_batches(self):
+        job = submit_job('approve_passes', [bus_pass.pk for bus_pass in self.passes], self.staff)
+        self.assertEqual(work('worker', once=True, batch_size=2), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.processed_items, job.failed_items), ('completed', 3, 0))
+        self.assertEqual(set(BusPass.objects.values_list('status', flat=True)), {'approved'})
+        self.assertEqual(set(BusPass.objects.values_list('approved_by', flat=True)), {self.staff.pk})
+
+    def test_failing_item_is_retried_then_failed_alone(self):
+        handled = []
+
+        def handler(user, object_ids):
+            if 'bad' in object_ids:
+                raise ValueError('bad item')
+            handled.extend(object_ids)
+
+        with mock.patch.dict(JOB_HANDLERS, {'approve_passes': handler}):
+            job = submit_job('approve_passes', ['a', 'bad', 'b'], None)
+            work('worker', once=True)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.processed_items, job.failed_items), ('completed', 3, 1))
+        self.assertEqual(sorted(handled), ['a', 'b'])
+        item = job.items.get(object_id='bad')
+        self.assertEqual((item.status, item.attempts), ('failed', job.max_attempts))
+        self.assertIn('bad item', item.error)
+        self.assertEqual(retry_failed_items(job), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.processed_items, job.failed_items), ('queued', 2, 0))
+
+    def test_stale_jobs_are_reclaimed(self):
+        job = submit_job('approve_passes', [self.passes[0].pk], self.staff)
+        self.assertEqual(claim_job('first').pk, job.pk)
+        # A running job with a live worker is left alone
+        self.assertIsNone(claim_job('second'))
+        BackgroundJob.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - STALE_JOB_TIMEOUT - timedelta(seconds=1))
+        self.assertEqual(claim_job('second').locked_by, 'second')
+
+    def test_unknown_kind_is_rejected(self):
+        with self.assertRaises(ValueError):
+            submit_job('delete_everything', [], None)
+
+
+class SearchIndexTests(MediaTestCase):
+    """Saving and deleting a student keeps its one row in the search index up to date"""
+
+    def setUp(self):
+        self.student = Student.objects.create(
+            id='S0', fullname='Asha Kumar', class_name='FY', clgid=0, address='Address', route1='Route 0',
+            date_of_birth=date(2005, 1, 1), aadhar='0' * 12, mobile='9876543210', email='s0@college.edu',
+            password=make_password('pw'),
+        )
+
+    def test_rename_replaces_the_indexed_row(self):
+        self.student.fullname = 'Ravi Kumar'
+        self.student.save()
+        self.assertEqual(search_students('Asha'), [])
+        self.assertEqual(search_students('Ravi'), [self.student])
+        self.assertEqual(search_students('Kumar'), [self.student])
+
+    def test_delete_and_rebuild(self):
+        self.student.delete()
+        self.assertEqual(search_students('Asha'), [])
+        student = Student.objects.create(
+            id='S1', fullname='Meera Rao', class_name='FY', clgid=1, address='Address', route1='Route 0',
+            date_of_birth=date(2005, 1, 1), aadhar='1' * 12, mobile='9123456780', email='meera@college.edu',
+            password=make_password('pw'),
+        )
+        rebuild_index()
+        self.assertEqual(search_students('45678'), [student])
+
+
+class WarmUpTests(MediaTestCase):
+    """The gunicorn warm-up primes the catalog of every active campus"""
+
+    def test_catalog_is_primed_per_active_campus(self):
+        campuses = [
+            Tenant.objects.create(name=name, slug=name.lower(), domain=f'{name.lower()}.example.com', is_active=active)
+            for name, active in (('North', True), ('South', True), ('Closed', False))
+        ]
+        primed = []
+        with mock.patch('buspass.warmup.get_price_matrix', side_effect=lambda version: primed.append(get_current_tenant())), \
+                mock.patch('buspass.warmup.get_route_index'), mock.patch('buspass.warmup.connections'):
+            warm_up(import_pdf_libraries=False)
+        self.assertIn(campuses[0], primed)
+        self.assertIn(campuses[1], primed)
+        self.assertNotIn(campuses[2], primed)
+        self.assertNotIn(None, primed)
+
+
+class NotificationTests(MediaTestCase):
+    """The dispatcher sends one message per student, backs off on failures and respects the rate limit"""
+
+    def setUp(self):
+        self.outbox = os.path.join(self.media_root, 'notifications.log')
+        outbox_settings = override_settings(NOTIFICATION_CHANNELS=['file'], NOTIFICATION_FILE_PATH=self.outbox, NOTIFICATION_RATE_LIMIT=0)
+        outbox_settings.enable()
+        self.addCleanup(outbox_settings.disable)
+        self.route = Route.objects.create(name='Route 0', source='A', destination='B')
+        self.student = Student.objects.create(
+            id='S0', fullname='Student 0', class_name='FY', clgid=0, address='Address', route1='Route 0',
+            date_of_birth=date(2005, 1, 1), aadhar='0' * 12, mobile='0' * 10, email='s0@example.com',
+            password=make_password('pw'),
+        )
+        self.passes = [
+            BusPass.objects.create(student=self.student, route=self.route, semester=semester, expiry_date=date(2099, 6, 30))
+            for semester in ('Semester-1', 'Semester-2')
+        ]
+        enqueue_notifications('bus_pass', [(bus_pass.pk, self.student.pk) for bus_pass in self.passes], 'approved')
+
+    def sent_messages(self):
+        if not os.path.exists(self.outbox):
+            return []
+        with open(self.outbox, encoding='utf-8') as file:
+            return [json.loads(line) for line in file]
+
+    def test_updates_of_one_student_are_sent_together(self):
+        self.assertEqual(dispatch('worker', once=True), (1, 0))
+        messages = self.sent_messages()
+        self.assertEqual([(message['to'], message['subject']) for message in messages], [('S0', '2 updates to your bus passes')])
+        self.assertIn('Semester-2 on Route 0 was approved', messages[0]['body'])
+        self.assertEqual(set(Notification.objects.values_list('status', flat=True)), {'sent'})
+
+    def test_failures_back_off_and_give_up(self):
+        with mock.patch.object(FileChannel, 'send', side_effect=OSError('disk full')):
+            self.assertEqual(dispatch('worker', once=True), (0, 1))
+            notification = Notification.objects.first()
+            self.assertEqual((notification.status, notification.attempts), ('pending', 1))
+            self.assertGreater(notification.available_at, timezone.now() + timedelta(seconds=50))
+            Notification.objects.update(attempts=MAX_ATTEMPTS - 1, available_at=timezone.now())
+            self.assertEqual(dispatch('worker', once=True), (0, 1))
+        self.assertEqual(set(Notification.objects.values_list('status', flat=True)), {'failed'})
+        self.assertIn('disk full', Notification.objects.first().error)
+
+    def test_deleted_student_is_not_retried(self):
+        notifications = claim_notifications('worker')
+        Student.objects.filter(pk=self.student.pk).delete()
+        with mock.patch.object(FileChannel, 'send') as send:
+            self.assertEqual(deliver(notifications, {}), (0, 1))
+        send.assert_not_called()
+
+    def test_rate_limiter_allows_a_burst_then_spaces_messages(self):
+        clock = [100.0]
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            clock[0] += seconds
+
+        with mock.patch('buspass.notifications.time.monotonic', side_effect=lambda: clock[0]), \
+                mock.patch('buspass.notifications.time.sleep', side_effect=sleep):
+            limiter = RateLimiter(2)
+            for _ in range(4):
+                limiter.wait()
+        self.assertEqual(sleeps, [0.5, 0.5])
+
+
+def receipt_image(seed, fmt='PNG', quality=95):
+    """A noisy grayscale 'photo' whose difference hash depends on seed"""
+    from PIL import Image
+    rng = random.Random(seed)
+    image = Image.new('L', (90, 80))
+    image.putdata([rng.randrange(256) for _ in range(90 * 80)])
+    buffer = BytesIO()
+    image.save(buffer, format=fmt, quality=quality)
+    return buffer.getvalue()
+
+
+@mock.patch('buspass.duplicates.perceptual_index', new_callable=PerceptualHashIndex)
+class DuplicateReceiptTests(MediaTestCase):
+    """Receipt reuse is flagged across passes, and the flags follow replaced receipts"""
+
+    def setUp(self):
+        self.route = Route.objects.create(name='Route 0', source='A', destination='B')
+        self.passes = []
+        for i in range(2):
+            student = Student.objects.create(
+                id=f'S{i}', fullname=f'Student {i}', class_name='FY', clgid=i, address='Address', route1='Route 0',
+                date_of_birth=date(2005, 1, 1), aadhar=f'{i:012d}', mobile=f'{i:010d}', email=f's{i}@example.com',
+                password=make_password('pw'),
+            )
+            self.passes.append(BusPass.objects.create(student=student, route=self.route, semester='Semester-1', expiry_date=date(2099, 6, 30)))
+
+    def upload(self, bus_pass, name, content):
+        bus_pass.payment_receipt.save(name, ContentFile(content), save=False)
+        BusPass.objects.filter(pk=bus_pass.pk).update(payment_receipt=bus_pass.payment_receipt.name)
+        return fingerprint_receipt(bus_pass)
+
+    def flags(self):
+        return [BusPass.objects.get(pk=bus_pass.pk).receipt_duplicate for bus_pass in self.passes]
+
+    def test_bk_tree_search_and_remove(self, index):
+        tree = BKTree()
+        for item, hash_value in enumerate(['0000000000000000', '0000000000000003', '00000000000000ff', 'ffffffffffffffff']):
+            tree.add(hash_value, item)
+        self.assertEqual(sorted(item for node_hash, item in tree.search('0000000000000001', 2)), [0, 1])
+        tree.remove('0000000000000000', 0)
+        self.assertEqual([item for node_hash, item in tree.search('0000000000000001', 2)], [1])
+        self.assertEqual((tree.size, tree.emptied), (3, 1))
+
+    def test_recompressed_photo_is_flagged(self, index):
+        self.assertEqual(self.upload(self.passes[0], 'receipt.png', receipt_image(1)), [])
+        matches = self.upload(self.passes[1], 'receipt.jpg', receipt_image(1, 'JPEG', quality=70))
+        self.assertEqual([match.object_id for match in matches], [self.passes[0].pk])
+        self.assertEqual(self.flags(), [True, True])
+        self.assertEqual([match.object_id for match in get_duplicate_receipts(self.passes[0])], [self.passes[1].pk])
+
+    def test_replaced_receipt_clears_the_flags(self, index):
+        self.upload(self.passes[0], 'receipt.png', receipt_image(1))
+        self.upload(self.passes[1], 'receipt.png', receipt_image(1))
+        self.assertEqual(self.flags(), [True, True])
+        self.assertEqual(self.upload(self.passes[1], 'other.png', receipt_image(2)), [])
+        self.assertEqual(self.flags(), [False, False])
+        self.assertEqual(ReceiptFingerprint.objects.count(), 2)
+        # The replaced hash is gone from the tree, not just filtered out
+        self.assertEqual(index.tree.size, 2)
+
+    def test_pdf_receipts_match_by_content(self, index):
+        self.upload(self.passes[0], 'receipt.pdf', b'%PDF-1.4 same')
+        self.assertEqual(len(self.upload(self.passes[1], 'copy.pdf', b'%PDF-1.4 same')), 1)
+        self.assertEqual(self.flags(), [True, True])
+
+
+class ThumbnailTests(MediaTestCase):
+    """Receipt thumbnails are small list icons, renamed whenever the receipt changes"""
+
+    def setUp(self):
+        route = Route.objects.create(name='Route 0', source='A', destination='B')
+        student = Student.objects.create(
+            id='S0', fullname='Student 0', class_name='FY', clgid=0, address='Address', route1='Route 0',
+            date_of_birth=date(2005, 1, 1), aadhar='0' * 12, mobile='0' * 10, email='s0@example.com',
+            password=make_password('pw'),
+        )
+        self.bus_pass = BusPass.objects.create(student=student, route=route, semester='Semester-1', expiry_date=date(2099, 6, 30))
+
+    def upload(self, name, content):
+        self.bus_pass.payment_receipt.save(name, ContentFile(content), save=False)
+        BusPass.objects.filter(pk=self.bus_pass.pk).update(payment_receipt=self.bus_pass.payment_receipt.name)
+        return make_receipt_thumbnail(self.bus_pass)
+
+    def photo(self, color):
+        from PIL import Image
+        buffer = BytesIO()
+        Image.new('RGB', (2000, 1500), color).save(buffer, format='JPEG')
+        return buffer.getvalue()
+
+    def test_thumbnail_is_downscaled(self):
+        from PIL import Image
+        self.assertTrue(self.upload('receipt.jpg', self.photo('white')))
+        thumbnail = BusPass.objects.get(pk=self.bus_pass.pk).receipt_thumbnail
+        with thumbnail.open('rb') as f:
+            self.assertLessEqual(max(Image.open(f).size), max(THUMBNAIL_SIZE))
+
+    def test_new_receipt_gets_a_new_thumbnail_name(self):
+        self.upload('receipt.jpg', self.photo('white'))
+        first = BusPass.objects.get(pk=self.bus_pass.pk).receipt_thumbnail.name
+        self.bus_pass.payment_receipt.delete(save=False)
+        self.upload('receipt.jpg', self.photo('black'))
+        second = BusPass.objects.get(pk=self.bus_pass.pk).receipt_thumbnail.name
+        self.assertNotEqual(first, second)
+        self.assertFalse(self.bus_pass.receipt_thumbnail.storage.exists(first))
+
+    def test_pdf_receipts_are_skipped(self):
+        self.assertFalse(self.upload('receipt.pdf', b'%PDF-1.4'))
+        self.assertFalse(BusPass.objects.get(pk=self.bus_pass.pk).receipt_thumbnail)
+
+
+class PricingTests(MediaTestCase):
+    """Quotes add Decimal prices, follow price changes and reject unpriced or broken selections"""
+
+    def setUp(self):
+        cache.clear()
+        for tenant_cache in _tenant_caches.values():
+            tenant_cache.clear()
+        self.route = Route.objects.create(name='Route 0', source='A', destination='B')
+        for semester, price in (('Semester-1', '0.10'), ('Semester-2', '0.20'), ('Semester-3', '100.05')):
+            RoutePrice.objects.create(route=self.route, semester=semester, price=price)
+
+    def test_quote_is_decimal_exact(self):
+        result = quote(self.route.pk, ['Semester-1', 'Semester-2', 'Semester-1'])
+        self.assertEqual(result['semesters'], ['Semester-1', 'Semester-2'])
+        self.assertEqual(result['total'], Decimal('0.30'))
+        with self.assertRaises(PriceNotFound) as raised:
+            quote(self.route.pk, ['Semester-3', 'Semester-4'])
+        self.assertEqual(raised.exception.semesters, ['Semester-4'])
+
+    def test_quote_follows_price_changes(self):
+        self.assertEqual(quote(self.route.pk, ['Semester-3'])['total'], Decimal('100.05'))
+        price = RoutePrice.objects.get(semester='Semester-3')
+        price.price = Decimal('90.00')
+        with self.captureOnCommitCallbacks(execute=True):
+            price.save()
+        self.assertEqual(quote(self.route.pk, ['Semester-3'])['total'], Decimal('90.00'))
+
+    def test_quote_view(self):
+        url = f'/routes/quote/?route={self.route.pk}&semesters=Semester-2&semesters=Semester-3'
+        self.assertEqual(self.client.get(url).json()['total'], '100.25')
+        # Semester-1 and Semester-3 skip a semester
+        self.assertEqual(self.client.get(f'/routes/quote/?route={self.route.pk}&semesters=Semester-1&semesters=Semester-3').status_code, 400)
+        self.assertEqual(self.client.get(f'/routes/quote/?route={self.route.pk}&semesters=Semester-4').status_code, 404)
+        self.assertEqual(self.client.get('/routes/quote/?route=x&semesters=Semester-1').status_code, 400)
+
+    def test_price_map_is_cacheable(self):
+        response = self.client.get('/routes/prices.json')
+        self.assertEqual(response.json(), {str(self.route.pk): {'Semester-1': '0.10', 'Semester-2': '0.20', 'Semester-3': '100.05'}})
+        self.assertIn('public', response['Cache-Control'])
+        self.assertEqual(self.client.get('/routes/prices.json', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            RoutePrice.objects.create(route=self.route, semester='Semester-4', price='1.00')
+        response = self.client.get('/routes/prices.json', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.json()[str(self.route.pk)]['Semester-4'], '1.00')
+
+
+class RouteCatalogCacheTests(MediaTestCase):
+    """The apply page's route fragments are rendered once per catalog version"""
+
+    def setUp(self):
+        cache.clear()
+        for tenant_cache in _tenant_caches.values():
+            tenant_cache.clear()
+        self.route = Route.objects.create(name='Route 0', source='A', destination='B')
+        RoutePrice.objects.create(route=self.route, semester='Semester-1', price='100.00')
+        student = Student.objects.create(
+            id='S0', fullname='Student 0', class_name='FY', clgid=0, address='Address', route1='Route 0',
+            date_of_birth=date(2005, 1, 1), aadhar='0' * 12, mobile='0' * 10, email='s0@example.com',
+            password=make_password('pw'),
+        )
+        self.client.post('/login/', {'login_identifier': student.id, 'password': 'pw'})
+
+    def catalog_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/apply/')
+        self.assertEqual(response.status_code, 200)
+        return response, [query['sql'] for query in queries if 'buspass_routeprice' in query['sql']]
+
+    def test_fragments_are_reused_until_the_catalog_changes(self):
+        response, queries = self.catalog_queries()
+        self.assertContains(response, 'Route 0')
+        self.assertTrue(queries)
+        response, queries = self.catalog_queries()
+        self.assertContains(response, 'Route 0')
+        self.assertEqual(queries, [])
+        self.route.name = 'Route 9'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.route.save()
+        response, queries = self.catalog_queries()
+        self.assertContains(response, 'Route 9')
+        self.assertNotContains(response, 'Route 0')
+
+
+class RouteSuggestionTests(MediaTestCase):
+    """Addresses are matched to the pickup points of active routes"""
+
+    def setUp(self):
+        cache.clear()
+        for tenant_cache in _tenant_caches.values():
+            tenant_cache.clear()
+        self.kothrud = Route.objects.create(name='Kothrud', source='Kothrud Depot', destination='College', arrival_time_at_source='07:30')
+        RouteStop.objects.create(route=self.kothrud, sequence=1, name='Karve Nagar', arrival_time='07:40')
+        self.hadapsar = Route.objects.create(name='Hadapsar', source='Hadapsar Gaon', destination='College')
+        RouteStop.objects.create(route=self.hadapsar, sequence=1, name='Magarpatta City', arrival_time='08:15')
+        RouteStop.objects.create(route=self.hadapsar, sequence=2, name='Karve Road', arrival_time='08:30')
+
+    def test_whole_stop_name_ranks_first(self):
+        suggestions = suggest_routes('Flat 4, Shanti Society, near Magarpatta City, Pune')
+        # Two points per word of the matched stop name, plus one per word no other route shares
+        self.assertEqual(suggestions[0], {
+            'route_id': self.hadapsar.pk, 'route_name': 'Hadapsar', 'stop': 'Magarpatta City', 'arrival_time': '08:15', 'score': 6,
+        })
+
+    def test_shared_words_are_weighted_by_rarity(self):
+        # 'karve' is on both routes, 'nagar' only on Kothrud's
+        suggestions = suggest_routes('12 Karve Nagar')
+        self.assertEqual([suggestion['route_id'] for suggestion in suggestions], [self.kothrud.pk, self.hadapsar.pk])
+        self.assertEqual(suggestions[0]['stop'], 'Karve Nagar')
+        self.assertEqual(suggest_routes('Road no 5, Sector 7'), [])
+
+    def test_inactive_routes_and_new_stops_follow_the_catalog(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            RouteStop.objects.create(route=self.kothrud, sequence=2, name='Warje Malwadi', arrival_time='07:50')
+        self.assertEqual(suggest_routes('Warje Malwadi')[0]['route_id'], self.kothrud.pk)
+        self.kothrud.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.kothrud.save()
+        self.assertEqual(suggest_routes('Warje Malwadi'), [])
+
+
+class RidershipTests(MediaTestCase):
+    """Boardings are bucketed per local day, route and hour, and past days are served from the cache"""
+
+    def setUp(self):
+        cache.clear()
+        for tenant_cache in _tenant_caches.values():
+            tenant_cache.clear()
+        self.today = timezone.localdate()
+        self.yesterday = self.today - timedelta(days=1)
+        self.routes = [Route.objects.create(name=f'Route {i}', source='A', destination='B') for i in range(2)]
+        self.passes = []
+        for i, route in enumerate([self.routes[0], self.routes[1], self.routes[1]]):
+            student = Student.objects.create(
+                id=f'S{i}', fullname=f'Student {i}', class_name='FY', clgid=i, address='Address', route1=route.name,
+                date_of_birth=date(2005, 1, 1), aadhar=f'{i:012d}', mobile=f'{i:010d}', email=f's{i}@example.com',
+                password=make_password('pw'),
+            )
+            self.passes.append(BusPass.objects.create(
+                student=student, route=route, semester='Semester-1', expiry_date=date(2099, 6, 30), status='approved',
+            ))
+
+    def at(self, day, hour, minute=0):
+        return timezone.make_aware(datetime(day.year, day.month, day.day, hour, minute))
+
+    def record(self):
+        return record_scans([
+            (self.passes[0].pk, self.at(self.yesterday, 8, 5), True),
+            (self.passes[0].pk, self.at(self.yesterday, 8, 55), True),
+            (self.passes[0].pk, self.at(self.today, 17, 30), True),
+            (self.passes[1].pk, self.at(self.yesterday, 8, 20), True),
+            # Refused at boarding: not a ride, and the pass still counts as unused
+            (self.passes[2].pk, self.at(self.yesterday, 9, 0), False),
+        ], batch_size=2)
+
+    def test_report(self):
+        self.assertEqual(self.record(), 5)
+        report = ridership_report(self.yesterday, self.today)
+        self.assertEqual(report['total_boardings'], 4)
+        self.assertEqual(report['peak_hour'], 8)
+        self.assertEqual(
+            [(route['name'], route['total'], route['peak_hour'], route['daily']) for route in report['routes']],
+            [('Route 0', 3, 8, [2, 1]), ('Route 1', 1, 8, [1, 0])],
+        )
+        self.assertEqual(report['daily_rows'], [(self.yesterday, [2, 1]), (self.today, [1, 0])])
+        self.assertEqual([bus_pass.pk for bus_pass in report['unused_passes']], [self.passes[2].pk])
+
+    def test_past_days_are_cached_until_new_scans_arrive(self):
+        self.record()
+        self.assertEqual(get_daily_counts(self.yesterday, self.yesterday)[self.yesterday][self.routes[0].pk][8], 2)
+        with self.assertNumQueries(0):
+            get_daily_counts(self.yesterday, self.yesterday)
+        record_scans([(self.passes[0].pk, self.at(self.yesterday, 8, 30), True)])
+        self.assertEqual(get_daily_counts(self.yesterday, self.yesterday)[self.yesterday][self.routes[0].pk][8], 3)
+
+
+class CachingTests(MediaTestCase):
+    """The SQLite cache is shared between instances, and versioned values are computed once per version"""
+
+    def setUp(self):
+        cache.clear()
+
+    def sqlite_cache(self, max_entries=300):
+        return SQLiteCache(os.path.join(self.media_root, 'cache.sqlite3'), {'OPTIONS': {'MAX_ENTRIES': max_entries}})
+
+    def test_sqlite_cache_is_shared_between_workers(self):
+        first, second = self.sqlite_cache(), self.sqlite_cache()
+        first.set('a', {'value': 1})
+        first.set_many({'b': 2, 'c': 3})
+        self.assertEqual(second.get('a'), {'value': 1})
+        self.assertEqual(second.get_many(['a', 'b', 'missing']), {'a': {'value': 1}, 'b': 2})
+        self.assertFalse(second.add('b', 20))
+        self.assertEqual(second.incr('b', 5), 7)
+        self.assertEqual(first.get('b'), 7)
+        second.delete_many(['a', 'b'])
+        self.assertIsNone(first.get('a'))
+        with self.assertRaises(ValueError):
+            first.incr('a')
+
+    def test_sqlite_cache_expiry_and_culling(self):
+        cache_backend = self.sqlite_cache(max_entries=4)
+        now = time.time()
+        with mock.patch('buspass.cache_backends.time.time', return_value=now):
+            cache_backend.set('short', 1, timeout=10)
+            cache_backend.set('forever', 2, timeout=None)
+        with mock.patch('buspass.cache_backends.time.time', return_value=now + 11):
+            self.assertIsNone(cache_backend.get('short'))
+            # add() may take over an expired key
+            self.assertTrue(cache_backend.add('short', 3))
+        with mock.patch('buspass.cache_backends.CULL_EVERY', 1):
+            for i in range(6):
+                cache_backend.set(f'key{i}', i, timeout=60 + i)
+        self.assertLessEqual(len(cache_backend.get_many([f'key{i}' for i in range(6)] + ['short', 'forever'])), 4)
+        # Entries without a timeout are culled last
+        self.assertEqual(cache_backend.get('forever'), 2)
+
+    def test_get_or_compute_once_per_version(self):
+        reset_metrics()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return len(calls)
+
+        self.assertEqual(get_or_compute('test', 'value', compute, 60), 1)
+        self.assertEqual(get_or_compute('test', 'value', compute, 60), 1)
+        bump_versions(['test'])
+        self.assertEqual(get_or_compute('test', 'value', compute, 60), 2)
+        self.assertEqual(get_metrics()['test'], {'hits': 1, 'misses': 2, 'waits': 0, 'computes': 2})
+
+    def test_waits_for_another_workers_recompute(self):
+        version = get_version('test')
+        cache.add(f'buspass:test:{version}:value:lock', 1)
+        # Another worker finishes its computation while this one polls
+        sleep = mock.Mock(side_effect=lambda seconds: cache.set(f'buspass:test:{version}:value', 'theirs'))
+        with mock.patch('buspass.caching.time.sleep', sleep):
+            self.assertEqual(get_or_compute('test', 'value', lambda: 'mine', 60), 'theirs')
+        with mock.patch('buspass.caching.RECOMPUTE_WAIT', 0):
+            # Past the wait the value is computed here rather than blocking the request
+            self.assertEqual(get_or_compute('test', 'other', lambda: 'mine', 60), 'mine')
+
+
+class SeedingTests(MediaTestCase):
+    """The seeder is reproducible and leaves the derived tables consistent with its rows"""
+
+    SIZES = {'tenants': 2, 'routes': 3, 'students': 20, 'passes': 50, 'applications': 6, 'as_of': date(2026, 8, 15)}
+
+    def snapshot(self):
+        return (
+            list(Student.unscoped.order_by('pk').values_list('pk', 'tenant__slug', 'fullname', 'route1', 'created_at')),
+            list(BusPass.unscoped.order_by('pk').values_list('pk', 'student_id', 'semester', 'status', 'expiry_date', 'created_at')),
+            list(MultiSemesterBusPassApplication.unscoped.order_by('pk').values_list('pk', 'semesters', 'total_amount', 'status')),
+        )
+
+    def test_same_seed_same_rows(self):
+        with transaction.atomic():
+            Seeder(seed=7, **self.SIZES).run()
+            first = self.snapshot()
+            transaction.set_rollback(True)
+        Seeder(seed=7, **self.SIZES).run()
+        self.assertEqual(self.snapshot(), first)
+        self.assertEqual([len(rows) for rows in first], [20, 50, 6])
+
+    def test_rows_are_consistent(self):
+        Seeder(seed=3, **self.SIZES).run()
+        self.assertEqual(
+            set(Student.unscoped.values_list('tenant__slug', flat=True)), {settings.DEFAULT_TENANT_SLUG, 'campus-2'},
+        )
+        # Passes and applications belong to their student's campus and route
+        self.assertFalse(BusPass.unscoped.exclude(tenant=F('student__tenant')).exists())
+        self.assertFalse(BusPass.unscoped.exclude(route__tenant=F('student__tenant')).exists())
+        for application in MultiSemesterBusPassApplication.unscoped.all():
+            prices = RoutePrice.unscoped.filter(route=application.route_id, semester__in=json.loads(application.semesters))
+            self.assertEqual(application.total_amount, sum(price.price for price in prices))
+        self.assertTrue(RouteSeatCounter.unscoped.exists())
+        for counter in RouteSeatCounter.unscoped.select_related('route'):
+            approved = BusPass.unscoped.filter(route=counter.route_id, semester=counter.semester, status='approved').count()
+            self.assertEqual(counter.seats_taken, approved)
+            self.assertLessEqual(counter.seats_taken, counter.route.capacity)
+        self.assertEqual(StudentPassSummary.objects.count(), 20)
+
+
+class MediaServingTests(MediaTestCase):
+    """Media is only served to staff and the owning student, with Range and sendfile support"""
+
+    def setUp(self):
+        route = Route.objects.create(name='Route 0', source='A', destination='B')
+        self.students = []
+        for i in range(2):
+            self.students.append(Student.objects.create(
+                id=f'S{i}', fullname=f'Student {i}', class_name='FY', clgid=i, address='Address', route1='Route 0',
+                date_of_birth=date(2005, 1, 1), aadhar=f'{i:012d}', mobile=f'{i:010d}', email=f's{i}@example.com',
+                password=make_password('pw'),
+            ))
+        bus_pass = BusPass.objects.create(student=self.students[0], route=route, semester='Semester-1', expiry_date=date(2099, 6, 30))
+        bus_pass.payment_receipt.save('my receipt.pdf', ContentFile(b'0123456789'), save=False)
+        BusPass.objects.filter(pk=bus_pass.pk).update(payment_receipt=bus_pass.payment_receipt.name)
+        self.path = bus_pass.payment_receipt.name
+        self.url = '/media/' + self.path
+
+    def login_student(self, student):
+        self.client.post('/login/', {'login_identifier': student.id, 'password': 'pw'})
+
+    def test_only_the_owner_can_fetch(self):
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.login_student(self.students[1])
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.client.logout()
+        self.login_student(self.students[0])
+        response = self.client.get(self.url)
+        self.assertEqual(b''.join(response.streaming_content), b'0123456789')
+        self.assertEqual(response['Cache-Control'], IMMUTABLE_CACHE_CONTROL)
+
+    def test_range_requests(self):
+        self.login_student(self.students[0])
+        response = self.client.get(self.url, HTTP_RANGE='bytes=2-5')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 2-5/10')
+        self.assertEqual(b''.join(response.streaming_content), b'2345')
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-3')
+        self.assertEqual(b''.join(response.streaming_content), b'789')
+        response = self.client.get(self.url, HTTP_RANGE='bytes=20-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */10')
+
+    @override_settings(MEDIA_SENDFILE_BACKEND='x-accel-redirect', MEDIA_ACCEL_REDIRECT_PREFIX='/protected-media/')
+    def test_x_accel_redirect_path_is_quoted(self):
+        self.login_student(self.students[0])
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/' + self.path.replace(' ', '%20'))
+        self.assertEqual(response.content, b'')
+
+
+class FrozenDate(date):
+    @classmethod
+    def today(cls):
+        return cls(2026, 8, 15)
+
+
+@mock.patch('buspass.utils.date', FrozenDate)
+class ExpiryTests(MediaTestCase):
+    """The sweeper only expires passes whose semester has really ended"""
+
+    def setUp(self):
+        self.route = Route.objects.create(name='Route 0', source='A', destination='B')
+        self.student = Student.objects.create(
+            id='S0', fullname='Student 0', class_name='FY', clgid=0, address='Address', route1='Route 0',
+            date_of_birth=date(2005, 1, 1), aadhar='0' * 12, mobile='0' * 10, email='s0@example.com',
+            password=make_password('pw'),
+        )
+
+    def test_odd_semester_issued_after_june_runs_to_next_june(self):
+        self.assertEqual(get_semester_expiry_date('Semester-1'), date(2027, 6, 30))
+        self.assertEqual(get_semester_expiry_date('Semester-2'), date(2026, 12, 31))
+        self.assertEqual(get_semester_expiry_date('Semester-1', 2026), date(2026, 6, 30))
+
+    def test_sweeper_keeps_passes_issued_after_the_june_cutoff(self):
+        new = BusPass.objects.create(
+            student=self.student, route=self.route, semester='Semester-1',
+            expiry_date=get_semester_expiry_date('Semester-1'), status='approved',
+        )
+        generate_qr_code(new)
+        old = BusPass.objects.create(
+            student=self.student, route=self.route, semester='Semester-3', expiry_date=date(2026, 6, 30), status='approved',
+        )
+        self.assertEqual(expire_passes(today=FrozenDate.today()), 1)
+        new.refresh_from_db()
+        self.assertEqual((new.status, BusPass.objects.get(pk=old.pk).status), ('approved', 'expired'))
+        self.assertTrue(os.path.exists(new.qr_code.path))
+
+
+class StudentSummaryTests(MediaTestCase):
+    """The dashboard summary follows pass changes and rolls over to the next pass on expiry"""
+
+    def setUp(self):
+        self.route = Route.objects.create(name='Route 0', source='A', destination='B')
+        self.student = Student.objects.create(
+            id='S0', fullname='Student 0', class_name='FY', clgid=0, address='Address', route1='Route 0',
+            date_of_birth=date(2005, 1, 1), aadhar='0' * 12, mobile='0' * 10, email='s0@example.com',
+            password=make_password('pw'),
+        )
+
+    def create_pass(self, semester, expiry_date, status='approved'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return BusPass.objects.create(student=self.student, route=self.route, semester=semester, expiry_date=expiry_date, status=status)
+
+    def summary(self):
+        return get_student_summary(Student.objects.select_related('pass_summary__current_pass__route').get(pk=self.student.pk))
+
+    def test_counts_follow_pass_changes(self):
+        self.create_pass('Semester-1', date(2026, 12, 31))
+        pending = self.create_pass('Semester-2', date(2027, 6, 30), 'pending')
+        with self.captureOnCommitCallbacks(execute=True):
+            MultiSemesterBusPassApplication.objects.create(student=self.student, route=self.route, semesters='["Semester-3"]', total_amount='100.00')
+        summary = StudentPassSummary.objects.get(student=self.student)
+        self.assertEqual(
+            (summary.total_passes, summary.approved_passes, summary.pending_passes, summary.total_applications, summary.pending_applications),
+            (2, 1, 1, 1, 1),
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            pending.delete()
+        self.assertEqual(StudentPassSummary.objects.get(student=self.student).pending_passes, 0)
+
+    @mock.patch('buspass.summaries.date', FrozenDate)
+    def test_current_pass_rolls_over_after_expiry(self):
+        first = self.create_pass('Semester-1', date(2026, 8, 20))
+        second = self.create_pass('Semester-2', date(2027, 1, 31))
+        self.assertEqual(self.summary().current_pass_id, first.pk)
+        with mock.patch.object(FrozenDate, 'today', classmethod(lambda cls: cls(2026, 9, 1))):
+            summary = self.summary()
+        self.assertEqual((summary.current_pass_id, summary.next_expiry), (second.pk, date(2027, 1, 31)))
+
+    def test_rebuild_all_summaries(self):
+        self.create_pass('Semester-1', date(2099, 6, 30))
+        StudentPassSummary.objects.all().delete()
+        self.assertEqual(rebuild_all_summaries(batch_size=1), 1)
+        self.assertEqual(StudentPassSummary.objects.get(student=self.student).approved_passes, 1)
+
+
+class MigrationDataTests(MediaTestCase):
+    """Data steps that clear old rows out of the way of a new constraint"""
+
+    def setUp(self):
+        self.route = Route.objects.create(name='Route 0', source='A', destination='B')
+        self.student = Student.objects.create(
+            id='S0', fullname='Student 0', class_name='FY', clgid=0, address='Address', route1='Route 0',
+            date_of_birth=date(2005, 1, 1), aadhar='0' * 12, mobile='0' * 10, email='s0@example.com',
+            password=make_password('pw'),
+        )
+
+    def run_data_step(self, migration, function):
+        getattr(importlib.import_module(f'buspass.migrations.{migration}'), function)(apps, None)
+
+    def drop_constraint(self, name):
+        # Partial unique constraints are indexes; the drop is rolled back with the test
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP INDEX {connection.ops.quote_name(name)}')
+
+    def create_pass(self, status, minutes_ago):
+        bus_pass = BusPass.objects.create(
+            student=self.student, route=self.route, semester='Semester-1', expiry_date=date(2099, 6, 30), status=status,
+        )
+        BusPass.objects.filter(pk=bus_pass.pk).update(created_at=timezone.now() - timedelta(minutes=minutes_ago))
+        return bus_pass
+
+    def test_duplicate_approved_passes_are_rejected(self):
+        self.drop_constraint('unique_active_pass_per_semester')
+        kept = self.create_pass('approved', 30)
+        extra = self.create_pass('approved', 20)
+        pending = self.create_pass('pending', 40)
+        self.assertEqual(get_seats_taken(self.route.pk, 'Semester-1'), 2)
+        self.run_data_step('0011_apply_idempotency', 'reject_duplicate_passes')
+        statuses = dict(BusPass.objects.values_list('pk', 'status'))
+        self.assertEqual(statuses, {kept.pk: 'approved', extra.pk: 'rejected', pending.pk: 'rejected'})
+        self.assertEqual(get_seats_taken(self.route.pk, 'Semester-1'), 1)
+
+    def test_duplicate_pending_applications_are_rejected(self):
+        self.drop_constraint('unique_pending_application')
+        applications = [
+            MultiSemesterBusPassApplication.objects.create(
+                student=self.student, route=self.route, semesters=semesters, total_amount='100.00',
+            )
+            for semesters in ('["Semester-1", "Semester-2"]', '["Semester-1", "Semester-2"]', '["Semester-1"]')
+        ]
+        MultiSemesterBusPassApplication.objects.filter(pk=applications[1].pk).update(created_at=timezone.now() + timedelta(minutes=1))
+        self.run_data_step('0020_integrity_constraints', 'normalize_application_semesters')
+        self.run_data_step('0020_integrity_constraints', 'reject_duplicate_pending_applications')
+        statuses = [MultiSemesterBusPassApplication.objects.get(pk=application.pk).status for application in applications]
+        self.assertEqual(statuses, ['pending', 'rejected', 'pending'])
+
+
+class ArchiveTests(MediaTestCase):
+    """Archiving and restoring keeps every column, including who rejected a pass and its file paths"""
+
+    def setUp(self):
+        self.staff = User.objects.create_user('staff', password='pw', is_staff=True)
+        self.route = Route.objects.create(name='Route 0', source='A', destination='B')
+        self.student = Student.objects.create(
+            id='S0', fullname='Student 0', class_name='FY', clgid=0, address='Address', route1='Route 0',
+            date_of_birth=date(2005, 1, 1), aadhar='0' * 12, mobile='0' * 10, email='s0@example.com',
+            password=make_password('pw'),
+        )
+        self.rejected_at = timezone.now() - timedelta(days=30)
+
+    def columns(self, row, fields):
+        return {field: getattr(row, field) for field in fields}
+
+    def round_trip(self, live_model, archived_model, archive, restore, **extra):
+        obj = live_model.objects.create(
+            student=self.student, route=self.route, status='rejected', payment_receipt='receipts/S0/receipt.pdf',
+            receipt_thumbnail='receipts/S0/thumb.jpg', idempotency_key=uuid.uuid4(), notes='Blurry receipt', **extra,
+        )
+        reject = live_model.objects.filter(pk=obj.pk)
+        reject.update(rejected_by=self.staff, rejected_at=self.rejected_at, created_at=self.rejected_at - timedelta(days=1))
+        obj.refresh_from_db()
+        fields = [field.attname for field in live_model._meta.concrete_fields if field.name != 'tenant']
+        before = self.columns(obj, fields)
+
+        with mock.patch('django.db.models.signals.post_delete.send') as post_delete:
+            self.assertEqual(archive(live_model.objects.all()), 1)
+        post_delete.assert_not_called()
+        self.assertFalse(live_model.objects.exists())
+        self.assertEqual(self.columns(archived_model.objects.get(), fields), before)
+
+        self.assertEqual(restore(archived_model.objects.all()), 1)
+        self.assertFalse(archived_model.objects.exists())
+        restored = live_model.objects.get()
+        self.assertEqual(self.columns(restored, fields), before)
+        self.assertEqual(restored.tenant_id, self.student.tenant_id)
+
+    def test_pass_round_trip(self):
+        self.round_trip(
+            BusPass, ArchivedBusPass, archive_passes, restore_passes,
+            semester='Semester-1', expiry_date=date(2020, 6, 30), qr_code='qr_codes/bus_pass_qr_S0.png',
+        )
+
+    def test_application_round_trip(self):
+        self.round_trip(
+            MultiSemesterBusPassApplication, ArchivedMultiSemesterApplication, archive_applications, restore_applications,
+            semesters='["Semester-1", "Semester-2"]', total_amount='100.00',
+        )
+
+
+def _url_names(patterns):
+    for pattern in patterns:
+        if isinstance(pattern, URLPattern):
+            yield pattern.name
+        else:
+            yield from _url_names(pattern.url_patterns)
+
+
+class QueryRegressionTests(MediaTestCase):
+    """Query counts, repeated queries and full table scans of every page, against query_baseline.json
+
+    Each page is requested once with empty caches, so template-driven N+1
+    queries show up, inside a savepoint that is rolled back afterwards.
+    """
+
+    # url name: (who asks, method, URL kwargs, query string); kwargs and query
+    # strings are built from the fixture objects named in them
+    PAGES = {
+        'home': ('anonymous', 'get', {}, ''),
+        'student_login': ('anonymous', 'get', {}, ''),
+        'student_dashboard': ('student', 'get', {}, ''),
+        'pass_events': ('student', 'get', {}, ''),
+        'apply_bus_pass': ('student', 'get', {}, ''),
+        'upload_payment_receipt': ('student', 'get', {'pass_id': 'pending_pass'}, ''),
+        'upload_multi_semester_payment_receipt': ('student', 'get', {'application_id': 'pending_application'}, ''),
+        'download_bus_pass': ('student', 'get', {'pass_id': 'approved_pass'}, ''),
+        'logout': ('student', 'get', {}, ''),
+        'admin_reports': ('staff', 'get', {}, ''),
+        'route_price_map': ('anonymous', 'get', {}, ''),
+        'price_quote': ('anonymous', 'get', {}, 'route={route}&semesters=Semester-1&semesters=Semester-2'),
+        'student_autocomplete': ('staff', 'get', {}, 'q=Patil'),
+        'review_queue': ('staff', 'get', {}, ''),
+        'review_decision': ('staff', 'post', {'kind': 'bus_pass', 'object_id': 'pending_pass', 'action': 'approve'}, ''),
+        'api-root': ('anonymous', 'get', {}, ''),
+        'api-route-list': ('anonymous', 'get', {}, ''),
+        'api-route-detail': ('anonymous', 'get', {'pk': 'route'}, ''),
+        'api-student-list': ('staff', 'get', {}, ''),
+        'api-student-detail': ('staff', 'get', {'pk': 'student'}, ''),
+        'api-pass-list': ('staff', 'get', {}, ''),
+        'api-pass-detail': ('staff', 'get', {'pk': 'approved_pass'}, ''),
+        'api-application-list': ('staff', 'get', {}, ''),
+        'api-application-detail': ('staff', 'get', {'pk': 'pending_application'}, ''),
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        Seeder(seed=0, routes=4, students=30, passes=90, applications=15).run()
+        cls.staff = User.objects.create_superuser('staff', 'staff@example.com', 'pw')
+        cls.approved_pass = BusPass.objects.filter(status='approved').order_by('student_id', 'pk').first()
+        cls.student = cls.approved_pass.student
+        cls.route = cls.approved_pass.route
+        live = set(cls.student.bus_passes.filter(status__in=['pending', 'approved']).values_list('semester', flat=True))
+        cls.pending_pass = BusPass.objects.create(
+            student=cls.student, route=cls.route, semester=min(set(SEMESTERS) - live), expiry_date=date(2099, 12, 31),
+        )
+        cls.pending_application = MultiSemesterBusPassApplication.objects.create(
+            student=cls.student, route=cls.route, semesters='["Semester-5", "Semester-6"]', total_amount='100.00',
+        )
+
+    def client_for(self, role):
+        client = Client()
+        if role == 'student':
+            client.post('/login/', {'login_identifier': self.student.pk, 'password': DEFAULT_PASSWORD})
+        elif role == 'staff':
+            client.force_login(self.staff)
+        return client
+
+    def profile(self, client, method, url):
+        cache.clear()
+        for tenant_cache in _tenant_caches.values():
+            tenant_cache.clear()
+        with transaction.atomic():
+            with QueryProfile() as profile:
+                response = getattr(client, method)(url)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+            transaction.set_rollback(True)
+        return profile.summary()
+
+    def test_queries_match_baseline(self):
+        self.assertEqual(set(_url_names(urls.urlpatterns)), set(self.PAGES), 'Add new URLs to QueryRegressionTests.PAGES')
+        # Resolve the host's tenant once, as a running worker already has
+        Client().get('/')
+
+        results = {}
+        for name, (role, method, kwargs, query) in self.PAGES.items():
+            url = reverse(name, kwargs={key: getattr(self, value).pk if hasattr(self, value) else value for key, value in kwargs.items()})
+            if query:
+                url += '?' + query.format(route=self.route.pk)
+            results[f'{method.upper()} {name} [{role}]'] = self.profile(self.client_for(role), method, url)
+
+        for model, model_admin in admin.site._registry.items():
+            prefix = f'admin:{model._meta.app_label}_{model._meta.model_name}'
+            obj = model._default_manager.order_by('pk').first()
+            pages = [('changelist', reverse(f'{prefix}_changelist')), ('add', reverse(f'{prefix}_add'))]
+            if obj is not None:
+                pages.append(('change', reverse(f'{prefix}_change', args=[obj.pk])))
+            for page, url in pages:
+                results[f'GET admin {model._meta.label_lower} {page}'] = self.profile(self.client_for('staff'), 'get', url)
+
+        if os.environ.get('UPDATE_QUERY_BASELINE'):
+            save_baseline(results)
+            return
+        regressions = compare_to_baseline(results, load_baseline())
+        self.assertFalse(regressions, 'Query regressions:\n' + '\n'.join(regressions))
@@ -1,14 +1,22 @@
-from django.urls import path
+from django.urls import include, path
 from . import views
+from .api import router as api_router
 
 urlpatterns = [
     path('', views.home, name='home'),
     path('login/', views.student_login, name='student_login'),
     path('dashboard/', views.student_dashboard, name='student_dashboard'),
+    path('dashboard/events/', views.pass_events, name='pass_events'),
     path('apply/', views.apply_bus_pass, name='apply_bus_pass'),
     path('upload_receipt/<uuid:pass_id>/', views.upload_payment_receipt, name='upload_payment_receipt'),
     path('upload_multi_semester_receipt/<uuid:application_id>/', views.upload_multi_semester_payment_receipt, name='upload_multi_semester_payment_receipt'),
     path('download_pass/<uuid:pass_id>/', views.download_bus_pass, name='download_bus_pass'),
     path('logout/', views.logout_view, name='logout'),
     path('admin_reports/', views.admin_reports, name='admin_reports'),
+    path('routes/prices.json', views.route_price_map, name='route_price_map'),
+    path('routes/quote/', views.price_quote, name='price_quote'),
+    path('students/autocomplete/', views.student_autocomplete, name='student_autocomplete'),
+    path('api/', include(api_router.urls)),
+    path('review/', views.review_queue, name='review_queue'),
+    path('review/<str:kind>/<uuid:object_id>/<str:action>/', views.review_decision, name='review_decision'),
 ]
\ No newline at end of file
@@ -0,0 +1,109 @@
+import json
+from contextlib import contextmanager
+from datetime import date
+from io import BytesIO
+from django.core.files import File
+
+
+SEMESTERS = ['Semester-1', 'Semester-2', 'Semester-3', 'Semester-4', 'Semester-5', 'Semester-6']
+# Every run of consecutive semesters in the JSON form stored on multi-semester
+# applications; a database check constraint allows exactly these values
+CONTINUOUS_SEMESTER_RUNS = [
+    json.dumps(SEMESTERS[start:end]) for start in range(len(SEMESTERS)) for end in range(start + 1, len(SEMESTERS) + 1)
+]
+
+
+def dump_semesters(semesters):
+    """Return the stored JSON for a semester selection, in semester order
+
+    The result is in CONTINUOUS_SEMESTER_RUNS only if the selection is a
+    run of consecutive semesters.
+    """
+    order = {semester: index for index, semester in enumerate(SEMESTERS)}
+    return json.dumps(sorted(set(semesters), key=lambda semester: order.get(semester, len(SEMESTERS))))
+
+
+def get_semester_expiry_date(semester, year=None):
+    """Return the expiry date of a pass for the given semester
+
+    Without a year the pass runs to the first end of that semester on or
+    after today, so an odd-semester pass issued in August expires next June
+    rather than on the June 30 just gone.
+    """
+    today = date.today()
+    expiry_year = year or today.year
+    if semester in ('Semester-1', 'Semester-3', 'Semester-5'):
+        # Odd semesters: Jan-June, expiry at end of June
+        expiry = date(expiry_year, 6, 30)
+    elif semester in ('Semester-2', 'Semester-4', 'Semester-6'):
+        # Even semesters: July-Dec, expiry at end of December
+        expiry = date(expiry_year, 12, 31)
+    else:
+        # Default to the end of the current month
+        expiry_month = today.month
+        if expiry_month in [1, 3, 5, 7, 8, 10, 12]:
+            expiry_day = 31
+        elif expiry_month in [4, 6, 9, 11]:
+            expiry_day = 30
+        else:  # February
+            expiry_day = 29 if expiry_year % 4 == 0 else 28
+        expiry = date(expiry_year, expiry_month, expiry_day)
+    if year is None and expiry < today:
+        expiry = expiry.replace(year=expiry.year + 1)
+    return expiry
+
+
+def parse_semesters(semesters):
+    """Return the semester list stored as JSON on a multi-semester application"""
+    try:
+        semesters_list = json.loads(semesters)
+    except (json.JSONDecodeError, TypeError):
+        return []
+    return semesters_list if isinstance(semesters_list, list) else []
+
+
+def generate_qr_code(bus_pass):
+    """Generate the QR code image for a bus pass and save it on the model"""
+    # Imported lazily: qrcode pulls in PIL, which most requests never need
+    import qrcode
+
+    student = bus_pass.student
+    qr_data = f"{bus_pass.id}|{student.id}|{student.fullname}|{bus_pass.route.name}|{bus_pass.semester}|{bus_pass.expiry_date}"
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=4,
+        border=4,
+    )
+    qr.add_data(qr_data)
+    qr.make(fit=True)
+
+    img = qr.make_image(fill_color="black", back_color="white")
+
+    buffer = BytesIO()
+    img.save(buffer, format='PNG')
+    buffer.seek(0)
+
+    qr_filename = f'bus_pass_qr_{bus_pass.id}.png'
+    bus_pass.qr_code.save(qr_filename, File(buffer), save=True)
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """Let bulk_create keep the created_at/issue_date values set on the objects
+
+    auto_now and auto_now_add fields would otherwise all get the current
+    time, e.g. a seeded dataset created in one minute has useless date
+    plans. The switch is process-wide, so it is meant for management
+    commands, not request handlers.
+    """
+    fields = [field for model in models for field in model._meta.concrete_fields if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now = auto_now
+            field.auto_now_add = auto_now_add
@@ -1,50 +1,67 @@
 from django.shortcuts import render, get_object_or_404, redirect
+from django.template.loader import render_to_string
 from django.contrib.auth import authenticate, login
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import HttpResponse, JsonResponse
-from django.views.decorators.http import require_http_methods
+from django.http import HttpResponse, JsonResponse, Http404, StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.views.decorators.http import require_http_methods, require_POST, condition
+from django.views.decorators.cache import cache_control
 from django.views.decorators.csrf import csrf_exempt
+from django.db import IntegrityError, transaction
 from django.db.models import Q
 from django.utils import timezone
 from datetime import date, datetime, timedelta
-from .models import Student, Route, RoutePrice, BusPass, MultiSemesterBusPassApplication
+from .models import Student, Route, BusPass, MultiSemesterBusPassApplication
+from .capacity import is_route_full, add_to_waitlist, get_seat_map
+from .utils import get_semester_expiry_date, generate_qr_code, parse_semesters, dump_semesters, CONTINUOUS_SEMESTER_RUNS
+from .search import search_students
+from .summaries import get_student_summary, student_cache_namespace, STUDENT_CACHE_TIMEOUT
+from .caching import get_or_compute, get_version
+from .media import serve_media_file
+from .catalog import get_active_routes, get_catalog_version, get_price_map, CATALOG_CACHE_TIMEOUT
+from .pricing import quote, PriceNotFound
+from .suggestions import suggest_routes
+from .ridership import ridership_report
+from .jobs import queue_receipt_processing
+from .approvals import approve_passes, reject_passes, approve_applications, reject_applications
+from .thumbnails import receipt_is_image
+from .events import stream_status_events, get_student_statuses, format_event
+from asgiref.sync import sync_to_async
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.models import User
-import qrcode
 from io import BytesIO
-from django.core.files import File
 from django.conf import settings
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib import colors
-from reportlab.lib.units import inch
 import os
+import uuid
 from django.contrib.auth.hashers import make_password, check_password
 
 
-def are_semesters_continuous(semesters_list):
-    """Check if the selected semesters are continuous (e.g., Semester-1 and Semester-2, not Semester-1 and Semester-3)"""
-    # Convert semester strings to numbers for comparison
-    semester_numbers = []
-    for sem in semesters_list:
-        try:
-            # Extract number from 'Semester-X'
-            num = int(sem.split('-')[1])
-            semester_numbers.append(num)
-        except (IndexError, ValueError):
-            return False
-    
-    # Sort the numbers
-    semester_numbers.sort()
-    
-    # Check if they are consecutive
-    for i in range(1, len(semester_numbers)):
-        if semester_numbers[i] != semester_numbers[i-1] + 1:
-            return False
-    
-    return True
+def parse_idempotency_key(value):
+    try:
+        return uuid.UUID(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def redirect_to_existing_pass(request, bus_pass):
+    messages.info(request, f'You already have a {bus_pass.get_status_display().lower()} bus pass for {bus_pass.semester} on this route.')
+    if bus_pass.status == 'pending':
+        return redirect('upload_payment_receipt', pass_id=bus_pass.id)
+    return redirect('student_dashboard')
+
+
+def redirect_to_existing_submission(request, student, idempotency_key):
+    """Return a redirect to the pass or application already created with this key, if any"""
+    bus_pass = BusPass.objects.filter(idempotency_key=idempotency_key, student=student).first()
+    if bus_pass:
+        messages.info(request, 'This application was already submitted.')
+        return redirect('upload_payment_receipt', pass_id=bus_pass.id)
+    application = MultiSemesterBusPassApplication.objects.filter(idempotency_key=idempotency_key, student=student).first()
+    if application:
+        messages.info(request, 'This application was already submitted.')
+        return redirect('upload_multi_semester_payment_receipt', application_id=application.id)
+    return None
 
 
 def student_login(request):
@@ -100,28 +117,64 @@ def student_dashboard(request):
         messages.error(request, 'Please login first!')
         return redirect('student_login')
     
-    student = get_object_or_404(Student, id=student_id)
-    
-    # Get student's bus passes
-    bus_passes = BusPass.objects.filter(student=student)
-    
-    # Count passes by status
-    total_passes = bus_passes.count()
-    approved_passes = bus_passes.filter(status='approved').count()
-    pending_passes = bus_passes.filter(status='pending').count()
-    rejected_passes = bus_passes.filter(status='rejected').count()
+    # Student and precomputed pass summary come back in a single query
+    student = get_object_or_404(
+        Student.objects.select_related('route', 'pass_summary__current_pass__route'), id=student_id
+    )
+    summary = get_student_summary(student)
     
     context = {
         'student': student,
-        'bus_passes': bus_passes,
-        'total_passes': total_passes,
-        'approved_passes': approved_passes,
-        'pending_passes': pending_passes,
-        'rejected_passes': rejected_passes,
+        'summary': summary,
+        'pass_history': render_pass_history(student.id),
+        'total_passes': summary.total_passes,
+        'approved_passes': summary.approved_passes,
+        'pending_passes': summary.pending_passes,
+        'rejected_passes': summary.rejected_passes,
     }
     return render(request, 'buspass/student_dashboard.html', context)
 
 
+def render_pass_history(student_id):
+    """The dashboard's pass table, cached until the student's passes or the route catalog change"""
+    def render_table():
+        bus_passes = BusPass.objects.filter(student_id=student_id).select_related('route')
+        return render_to_string('buspass/pass_history.html', {'bus_passes': bus_passes})
+
+    return get_or_compute(
+        student_cache_namespace(student_id), f'pass_history:{get_catalog_version()}', render_table, STUDENT_CACHE_TIMEOUT,
+    )
+
+
+def _logged_in_student_id(request):
+    if not request.session.get('student_logged_in'):
+        return None
+    return request.session.get('student_id')
+
+
+def _status_snapshot(student_id):
+    # Without ASGI a stream would pin a worker thread, so send the current
+    # statuses and let EventSource reconnect later instead
+    yield 'retry: 30000\n\n'
+    yield format_event('snapshot', get_student_statuses(student_id))
+
+
+async def pass_events(request):
+    """Server-sent events with the logged-in student's pass and application status changes"""
+    student_id = await sync_to_async(_logged_in_student_id)(request)
+    if not student_id:
+        return HttpResponse(status=403)
+    if isinstance(request, ASGIRequest):
+        content = stream_status_events(student_id)
+    else:
+        content = await sync_to_async(lambda: list(_status_snapshot(student_id)))()
+    response = StreamingHttpResponse(content, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx-style proxies from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 def logout_view(request):
     request.session.flush()
     messages.success(request, 'You have been logged out successfully!')
@@ -139,14 +192,21 @@ def apply_bus_pass(request):
         messages.error(request, 'Please login first!')
         return redirect('student_login')
     
-    student = get_object_or_404(Student, id=student_id)
+    student = get_object_or_404(Student.objects.select_related('route'), id=student_id)
     
-    routes = Route.objects.filter(is_active=True)
-    route_prices = RoutePrice.objects.filter(route__in=routes)
+    # Lazy: only evaluated when the cached route fragments need re-rendering
+    routes = get_active_routes()
     
     if request.method == 'POST':
         route_id = request.POST.get('route')
         application_type = request.POST.get('application_type', 'single')
+        idempotency_key = parse_idempotency_key(request.POST.get('idempotency_key'))
+        
+        # A repeated submission of the same form (double click, retry) goes to what it created
+        if idempotency_key:
+            response = redirect_to_existing_submission(request, student, idempotency_key)
+            if response:
+                return response
         
         route = get_object_or_404(Route, id=route_id)
         
@@ -162,77 +222,42 @@ def apply_bus_pass(request):
             
             # Get the price for this route and semester
             try:
-                route_price = RoutePrice.objects.get(route=route, semester=semester)
-                total_amount = float(route_price.price)
-            except RoutePrice.DoesNotExist:
+                total_amount = quote(route.id, selected_semesters)['total']
+            except PriceNotFound:
                 messages.error(request, 'Price not found for selected route and semester!')
                 return redirect('apply_bus_pass')
             
-            # Calculate expiry date based on the semester
-            year = date.today().year
-            if semester == 'Semester-1':
-                # Semester 1: Jan-June, expiry at end of June
-                expiry_month = 6
-                expiry_day = 30
-            elif semester == 'Semester-2':
-                # Semester 2: July-Dec, expiry at end of December
-                expiry_month = 12
-                expiry_day = 31
-            elif semester == 'Semester-3':
-                # For demonstration - could be different months
-                expiry_month = 6
-                expiry_day = 30
-            elif semester == 'Semester-4':
-                expiry_month = 12
-                expiry_day = 31
-            elif semester == 'Semester-5':
-                expiry_month = 6
-                expiry_day = 30
-            elif semester == 'Semester-6':
-                expiry_month = 12
-                expiry_day = 31
-            else:
-                # Default to current month
-                expiry_month = date.today().month
-                if expiry_month in [1, 3, 5, 7, 8, 10, 12]:
-                    expiry_day = 31
-                elif expiry_month in [4, 6, 9, 11]:
-                    expiry_day = 30
-                else:  # February
-                    expiry_day = 29 if year % 4 == 0 else 28
-            
-            expiry_date = date(year, expiry_month, expiry_day)
-            
-            # Create the bus pass
-            bus_pass = BusPass.objects.create(
-                student=student,
-                route=route,
-                semester=semester,
-                expiry_date=expiry_date,
-                status='pending',
-            )
+            # Routes that are already full put the student on the waitlist instead
+            if is_route_full(route, semester):
+                entry, created = add_to_waitlist(student, route, semester)
+                if created:
+                    messages.warning(request, f'{route.name} is full for {semester}. You have been added to the waitlist and will get a pass application automatically when a seat frees up.')
+                else:
+                    messages.info(request, f'You are already on the waitlist for {route.name} ({semester}).')
+                return redirect('student_dashboard')
             
-            # Generate QR code
-            qr_data = f"{bus_pass.id}|{student.id}|{student.fullname}|{route.name}|{semester}|{expiry_date}"
-            qr = qrcode.QRCode(
-                version=1,
-                error_correction=qrcode.constants.ERROR_CORRECT_L,
-                box_size=4,
-                border=4,
-            )
-            qr.add_data(qr_data)
-            qr.make(fit=True)
-            
-            img = qr.make_image(fill_color="black", back_color="white")
-            
-            # Save QR code to the bus pass model
-            buffer = BytesIO()
-            img.save(buffer, format='PNG')
-            buffer.seek(0)
-            
-            # Create a filename for the QR code
-            qr_filename = f'bus_pass_qr_{bus_pass.id}.png'
-            bus_pass.qr_code.save(qr_filename, File(buffer), save=True)
+            # Only one live pass per route and semester; unique_active_pass_per_semester
+            # rejects the insert and the student is sent to the pass they already have
+            try:
+                with transaction.atomic():
+                    # Create the bus pass and its QR code together
+                    bus_pass = BusPass.objects.create(
+                        student=student,
+                        route=route,
+                        semester=semester,
+                        expiry_date=get_semester_expiry_date(semester),
+                        status='pending',
+                        idempotency_key=idempotency_key,
+                    )
+                    generate_qr_code(bus_pass)
+            except IntegrityError:
+                # An earlier or concurrent submission holds the seat; send the student to its pass
+                existing_pass = BusPass.objects.filter(
+                    student=student, route=route, semester=semester, status__in=['pending', 'approved']
+                ).first()
+                if existing_pass is None:
+                    raise
+                return redirect_to_existing_pass(request, existing_pass)
             
             messages.success(request, f'Bus pass application submitted successfully for {semester}! Please upload payment receipt to complete the process.')
             return redirect('upload_payment_receipt', pass_id=bus_pass.id)
@@ -244,39 +269,61 @@ def apply_bus_pass(request):
                 messages.error(request, 'Please select at least one semester!')
                 return redirect('apply_bus_pass')
             
-            # Validate that semesters are continuous
-            if not are_semesters_continuous(selected_semesters):
+            # Validate that semesters are continuous, by the rule the database enforces
+            semesters_json = dump_semesters(selected_semesters)
+            if semesters_json not in CONTINUOUS_SEMESTER_RUNS:
                 messages.error(request, 'Please select continuous semesters only! For example: Semester-1 and Semester-2, but not Semester-1 and Semester-3.')
                 return redirect('apply_bus_pass')
             
-            # Calculate total amount
-            total_amount = 0
-            for semester in selected_semesters:
-                try:
-                    route_price = RoutePrice.objects.get(route=route, semester=semester)
-                    total_amount += float(route_price.price)
-                except RoutePrice.DoesNotExist:
-                    messages.error(request, f'Price not found for selected route and semester {semester}!')
-                    return redirect('apply_bus_pass')
+            # Calculate total amount from the same quote the apply page shows
+            try:
+                total_amount = quote(route.id, selected_semesters)['total']
+            except PriceNotFound as exc:
+                messages.error(request, f'Price not found for selected route and semester {", ".join(exc.semesters)}!')
+                return redirect('apply_bus_pass')
             
-            # Create multi-semester application
-            import json
+            seats_available = get_seat_map([route]).get(route.id, {})
+            full_semesters = [semester for semester in selected_semesters if seats_available.get(semester, route.capacity) <= 0]
+            if full_semesters:
+                messages.error(request, f'{route.name} has no seats left for {", ".join(full_semesters)}. Please apply for those semesters individually to join the waitlist.')
+                return redirect('apply_bus_pass')
             
-            application = MultiSemesterBusPassApplication.objects.create(
-                student=student,
-                route=route,
-                semesters=json.dumps(selected_semesters),
-                total_amount=total_amount,
-                status='pending',
-            )
+            # Create multi-semester application; a second pending one for the same
+            # semesters is turned away by the unique_pending_application constraint
+            try:
+                with transaction.atomic():
+                    application = MultiSemesterBusPassApplication.objects.create(
+                        student=student,
+                        route=route,
+                        semesters=semesters_json,
+                        total_amount=total_amount,
+                        status='pending',
+                        idempotency_key=idempotency_key,
+                    )
+            except IntegrityError:
+                response = redirect_to_existing_submission(request, student, idempotency_key)
+                if response:
+                    return response
+                existing_application = MultiSemesterBusPassApplication.objects.filter(
+                    student=student, route=route, semesters=semesters_json, status='pending'
+                ).first()
+                if existing_application is None:
+                    raise
+                messages.info(request, 'You already have a pending application for these semesters.')
+                return redirect('upload_multi_semester_payment_receipt', application_id=existing_application.id)
             
             messages.success(request, f'Multi-semester bus pass application submitted successfully for {len(selected_semesters)} semesters! Total amount: ₹{total_amount}. Please upload payment receipt to complete the process.')
             return redirect('upload_multi_semester_payment_receipt', application_id=application.id)
     
     context = {
         'student': student,
+        'idempotency_key': uuid.uuid4(),
         'routes': routes,
-        'route_prices': route_prices,
+        'catalog_version': get_catalog_version(),
+        'catalog_cache_timeout': CATALOG_CACHE_TIMEOUT,
+        'seat_map': get_seat_map(Route.objects.filter(is_active=True)),
+        'route_suggestions': suggest_routes(student.address),
+        'assigned_route': student.route if student.route and student.route.is_active else None,
     }
     return render(request, 'buspass/apply_bus_pass.html', context)
 
@@ -307,6 +354,7 @@ def upload_payment_receipt(request, pass_id):
         
         bus_pass.payment_receipt = receipt
         bus_pass.save()
+        queue_receipt_processing(bus_pass)
         
         messages.success(request, 'Payment receipt uploaded successfully! Your application is now pending for approval.')
         return redirect('student_dashboard')
@@ -343,6 +391,7 @@ def upload_multi_semester_payment_receipt(request, application_id):
         
         application.payment_receipt = receipt
         application.save()
+        queue_receipt_processing(application)
         
         messages.success(request, 'Payment receipt uploaded successfully! Your multi-semester application is now pending for approval.')
         return redirect('student_dashboard')
@@ -353,23 +402,20 @@ def upload_multi_semester_payment_receipt(request, application_id):
     return render(request, 'buspass/upload_multi_semester_receipt.html', context)
 
 
-def download_bus_pass(request, pass_id):
-    # Custom login check since we're using session-based auth for students
-    if not request.session.get('student_logged_in'):
-        messages.error(request, 'Please login first!')
-        return redirect('student_login')
-    
+def _bus_pass_pdf_etag(request, pass_id):
+    # Built from the same versions as the cached PDF, so revalidating needs no query;
+    # any change to the student's passes or profile, or to the routes, moves them on
     student_id = request.session.get('student_id')
-    if not student_id:
-        messages.error(request, 'Please login first!')
-        return redirect('student_login')
-    
-    student = get_object_or_404(Student, id=student_id)
-    bus_pass = get_object_or_404(BusPass, id=pass_id, student=student)
-    
-    if bus_pass.status != 'approved':
-        messages.error(request, 'Bus pass is not approved yet!')
-        return redirect('student_dashboard')
+    if not request.session.get('student_logged_in') or not student_id:
+        return None
+    return f'pass-{pass_id}-{get_version(student_cache_namespace(student_id))}-{get_catalog_version()}'
+
+
+def render_pass_pdf(bus_pass):
+    """Draw the printable pass as PDF bytes"""
+    # reportlab is imported here so workers don't pay for it until the first download
+    from reportlab.pdfgen import canvas
+    from reportlab.lib.pagesizes import letter
     
     # Create PDF
     buffer = BytesIO()
@@ -433,6 +479,34 @@ def download_bus_pass(request, pass_id):
     # Get the value of the BytesIO buffer and write it to the response
     pdf = buffer.getvalue()
     buffer.close()
+    return pdf
+
+
+@cache_control(private=True, max_age=0)
+@condition(etag_func=_bus_pass_pdf_etag)
+def download_bus_pass(request, pass_id):
+    # Custom login check since we're using session-based auth for students
+    if not request.session.get('student_logged_in'):
+        messages.error(request, 'Please login first!')
+        return redirect('student_login')
+    
+    student_id = request.session.get('student_id')
+    if not student_id:
+        messages.error(request, 'Please login first!')
+        return redirect('student_login')
+    
+    student = get_object_or_404(Student, id=student_id)
+    bus_pass = get_object_or_404(BusPass.objects.select_related('student', 'route'), id=pass_id, student=student)
+    
+    if bus_pass.status != 'approved':
+        messages.error(request, 'Bus pass is not approved yet!')
+        return redirect('student_dashboard')
+    
+    # Rendered once per pass until the student, the pass or its route changes
+    pdf = get_or_compute(
+        student_cache_namespace(student.id), f'pass_pdf:{bus_pass.id}:{get_catalog_version()}',
+        lambda: render_pass_pdf(bus_pass), STUDENT_CACHE_TIMEOUT,
+    )
     
     response = HttpResponse(content_type='application/pdf')
     response['Content-Disposition'] = f'attachment; filename="bus_pass_{bus_pass.id}.pdf"'
@@ -450,7 +524,169 @@ def home(request):
     return render(request, 'buspass/home.html')
 
 
+def student_can_access_media(student_id, path):
+    # A student may only fetch the QR codes and receipts attached to their own passes
+    if BusPass.objects.filter(student_id=student_id).filter(Q(qr_code=path) | Q(payment_receipt=path)).exists():
+        return True
+    return MultiSemesterBusPassApplication.objects.filter(student_id=student_id, payment_receipt=path).exists()
+
+
+def serve_media(request, path):
+    if not request.user.is_staff:
+        student_id = request.session.get('student_id')
+        if not request.session.get('student_logged_in') or not student_id:
+            raise Http404('File not found')
+        if not student_can_access_media(student_id, path):
+            raise Http404('File not found')
+    return serve_media_file(request, path)
+
+
+def _price_map_etag(request):
+    return f'catalog-{get_catalog_version()}'
+
+
+@cache_control(public=True, max_age=CATALOG_CACHE_TIMEOUT)
+@condition(etag_func=_price_map_etag)
+def route_price_map(request):
+    # Served under a ?v=<catalog version> URL so browsers can keep it until prices change
+    return JsonResponse(get_price_map())
+
+
+def _price_quote_etag(request):
+    # Quotes only change with the catalog; the query string picks the quote
+    return f'quote-{get_catalog_version()}-{request.GET.urlencode()}'
+
+
+@cache_control(public=True, max_age=CATALOG_CACHE_TIMEOUT)
+@condition(etag_func=_price_quote_etag)
+def price_quote(request):
+    # ?route=<id>&semesters=Semester-1&semesters=Semester-2
+    route_id = request.GET.get('route', '')
+    semesters = request.GET.getlist('semesters')
+    if not route_id.isdigit() or not semesters:
+        return JsonResponse({'error': 'route and at least one semesters value are required'}, status=400)
+    if dump_semesters(semesters) not in CONTINUOUS_SEMESTER_RUNS:
+        return JsonResponse({'error': 'Semesters must be valid and continuous'}, status=400)
+    try:
+        result = quote(route_id, semesters)
+    except PriceNotFound as exc:
+        return JsonResponse({'error': f'No price for {", ".join(exc.semesters)}'}, status=404)
+    return JsonResponse({
+        'route': result['route'],
+        'semesters': result['semesters'],
+        'prices': {semester: str(price) for semester, price in result['prices'].items()},
+        'total': str(result['total']),
+    })
+
+
+@staff_member_required
+def student_autocomplete(request):
+    # JSON lookup for the transport office, backed by the student search index
+    try:
+        limit = min(int(request.GET.get('limit', 20)), 50)
+    except ValueError:
+        limit = 20
+    students = search_students(request.GET.get('q', ''), limit=limit)
+    results = [
+        {
+            'id': student.id,
+            'fullname': student.fullname,
+            'class_name': student.class_name,
+            'mobile': student.mobile,
+            'email': student.email,
+        }
+        for student in students
+    ]
+    return JsonResponse({'results': results})
+
+
+# Receipts shown per review page, and how many upcoming receipts the page preloads
+REVIEW_QUEUE_SIZE = 100
+REVIEW_PREFETCH_COUNT = 5
+
+
+def _review_item(kind, obj, description):
+    return {
+        'kind': kind,
+        'id': str(obj.pk),
+        'student_id': obj.student.id,
+        'student_name': obj.student.fullname,
+        'route': obj.route.name,
+        'description': description,
+        'created_at': obj.created_at,
+        'receipt_url': obj.payment_receipt.url,
+        'thumbnail_url': obj.receipt_thumbnail.url if obj.receipt_thumbnail else '',
+        'is_image': receipt_is_image(obj),
+        'duplicate': obj.receipt_duplicate,
+    }
+
+
+@staff_member_required
+def review_queue(request):
+    # Oldest pending passes and applications that already have a receipt uploaded
+    passes = (
+        BusPass.objects.filter(status='pending').exclude(payment_receipt='').exclude(payment_receipt__isnull=True)
+        .select_related('student', 'route').order_by('created_at')[:REVIEW_QUEUE_SIZE]
+    )
+    applications = (
+        MultiSemesterBusPassApplication.objects.filter(status='pending').exclude(payment_receipt='').exclude(payment_receipt__isnull=True)
+        .select_related('student', 'route').order_by('created_at')[:REVIEW_QUEUE_SIZE]
+    )
+    items = [_review_item('bus_pass', bus_pass, bus_pass.semester) for bus_pass in passes]
+    items += [
+        _review_item('multi_semester', application, f"{', '.join(parse_semesters(application.semesters))} (₹{application.total_amount})")
+        for application in applications
+    ]
+    items.sort(key=lambda item: item['created_at'])
+    context = {
+        'items': items[:REVIEW_QUEUE_SIZE],
+        'prefetch_count': REVIEW_PREFETCH_COUNT,
+    }
+    return render(request, 'buspass/review_queue.html', context)
+
+
+REVIEW_ACTIONS = {
+    ('bus_pass', 'approve'): (BusPass, lambda queryset, user: approve_passes(queryset, user)[0]),
+    ('bus_pass', 'reject'): (BusPass, reject_passes),
+    ('multi_semester', 'approve'): (MultiSemesterBusPassApplication, lambda queryset, user: approve_applications(queryset, user)[0]),
+    ('multi_semester', 'reject'): (MultiSemesterBusPassApplication, reject_applications),
+}
+
+
+@staff_member_required
+@require_POST
+def review_decision(request, kind, object_id, action):
+    if (kind, action) not in REVIEW_ACTIONS:
+        raise Http404('Unknown review action')
+    model, decide = REVIEW_ACTIONS[(kind, action)]
+    # Only pending rows change, so a repeated keystroke is harmless
+    updated = decide(model.objects.filter(pk=object_id), request.user)
+    return JsonResponse({'updated': updated})
+
+
+REPORT_PERIODS = {'weekly': 7, 'monthly': 30, 'quarterly': 91, 'yearly': 365}
+
+
+@staff_member_required
 def admin_reports(request):
-    # This view would be for admin reports (to be implemented)
-    return render(request, 'buspass/admin_reports.html')
+    # Ridership for the chosen dates, or for the report period ending today
+    report_type = request.GET.get('report_type', 'monthly')
+    last_day = timezone.localdate()
+    first_day = last_day - timedelta(days=REPORT_PERIODS.get(report_type, 30) - 1)
+    try:
+        if request.GET.get('start_date'):
+            first_day = date.fromisoformat(request.GET['start_date'])
+        if request.GET.get('end_date'):
+            last_day = date.fromisoformat(request.GET['end_date'])
+    except ValueError:
+        messages.error(request, 'Please enter valid dates!')
+    if first_day > last_day or (last_day - first_day).days >= 366:
+        messages.error(request, 'Reports cover between one day and one year.')
+        last_day = timezone.localdate()
+        first_day = last_day - timedelta(days=29)
+    context = {
+        'report': ridership_report(first_day, last_day),
+        'report_type': report_type,
+    }
+    return render(request, 'buspass/admin_reports.html', context)
 
@@ -0,0 +1,54 @@
+import time
+from django.db import connections
+from django.template.loader import get_template
+from .catalog import get_catalog_version, get_price_map
+from .models import Tenant
+from .pricing import get_price_matrix
+from .suggestions import get_route_index
+from .tenancy import tenant_context
+
+# Templates rendered on the hot student paths, compiled once before workers fork
+WARM_TEMPLATES = [
+    'base.html',
+    'buspass/home.html',
+    'buspass/login.html',
+    'buspass/student_dashboard.html',
+    'buspass/apply_bus_pass.html',
+    'buspass/upload_receipt.html',
+    'buspass/upload_multi_semester_receipt.html',
+]
+
+
+def warm_up(import_pdf_libraries=True):
+    """Compile templates, prime each active campus's route catalog and optionally import reportlab/qrcode
+
+    Meant to run in the gunicorn master with preload_app so forked workers share
+    the result. Returns the time spent on each step in milliseconds.
+    """
+    timings = {}
+
+    start = time.perf_counter()
+    for template_name in WARM_TEMPLATES:
+        get_template(template_name)
+    timings['templates'] = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    # Requests are always served for a campus, so the unscoped catalog is left cold
+    for tenant in Tenant.objects.filter(is_active=True):
+        with tenant_context(tenant):
+            version = get_catalog_version()
+            get_price_map(version)
+            get_price_matrix(version)
+            get_route_index(version)
+    timings['route_catalog'] = (time.perf_counter() - start) * 1000
+
+    if import_pdf_libraries:
+        start = time.perf_counter()
+        import qrcode  # noqa: F401
+        import reportlab.pdfgen.canvas  # noqa: F401
+        timings['pdf_libraries'] = (time.perf_counter() - start) * 1000
+
+    # Connections must not be shared with the forked workers
+    connections.close_all()
+    return timings
+
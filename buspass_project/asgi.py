@@ -2,6 +2,8 @@
 ASGI config for buspass_project project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Production runs it under gunicorn with uvicorn workers so the student
+dashboard's server-sent event streams stay open without a thread each.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
@@ -11,7 +11,9 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
 from pathlib import Path
+from urllib.parse import unquote, urlsplit
 from decouple import config
+from django.core.exceptions import ImproperlyConfigured
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -40,12 +42,14 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'colorfield',
     'admin_interface',
+    'rest_framework',
     'buspass',  # Our bus pass management app
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'buspass.tenancy.TenantMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -60,8 +64,20 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],  # This was the correct configuration
-        'APP_DIRS': True,
+        # APP_DIRS is replaced by the explicit loaders below
+        'APP_DIRS': False,
         'OPTIONS': {
+            # Compiled templates are kept in memory for the life of the worker;
+            # in DEBUG the filesystem loaders are used directly so edits show up
+            'loaders': [
+                'django.template.loaders.filesystem.Loader',
+                'django.template.loaders.app_directories.Loader',
+            ] if DEBUG else [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -86,6 +102,23 @@ DATABASES = {
     }
 }
 
+# A postgres:// URL (Render sets one for its PostgreSQL databases) replaces the
+# SQLite file, so the web service and the job/notification workers share one database
+DATABASE_URL = config('DATABASE_URL', default='')
+if DATABASE_URL:
+    database_url = urlsplit(DATABASE_URL)
+    if database_url.scheme not in ('postgres', 'postgresql'):
+        raise ImproperlyConfigured('DATABASE_URL must be a postgres:// URL')
+    DATABASES['default'] = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': database_url.path.lstrip('/'),
+        'USER': unquote(database_url.username or ''),
+        'PASSWORD': unquote(database_url.password or ''),
+        'HOST': database_url.hostname or '',
+        'PORT': database_url.port or '',
+        'CONN_MAX_AGE': config('DATABASE_CONN_MAX_AGE', default=60, cast=int),
+    }
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -131,12 +164,85 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
 # Additional WhiteNoise settings
+# collectstatic writes .br (needs the Brotli package) and .gz variants next to
+# each file; hashed names are served with far-future immutable caching
 WHITENOISE_USE_FINDERS = True
 
 # Media files (User uploads)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# How buspass.media hands authorized media files to the client:
+# '' streams them from Django, 'x-accel-redirect' offloads to nginx (internal
+# location at MEDIA_ACCEL_REDIRECT_PREFIX) and 'x-sendfile' to Apache/lighttpd
+MEDIA_SENDFILE_BACKEND = config('MEDIA_SENDFILE_BACKEND', default='')
+MEDIA_ACCEL_REDIRECT_PREFIX = config('MEDIA_ACCEL_REDIRECT_PREFIX', default='/protected-media/')
+
+# Campuses are picked by Tenant.domain; other hosts (and rows created outside
+# a request) belong to this tenant, which single-campus deployments use alone
+DEFAULT_TENANT_SLUG = config('DEFAULT_TENANT_SLUG', default='default')
+
+# Shared cache for the route catalog, dashboards and pass PDFs. 'sqlite' (one
+# file on the host) and 'file' are shared by all gunicorn workers; 'redis'
+# needs the redis package and REDIS_URL; 'locmem' is per process, which is
+# enough for runserver and tests
+CACHE_BACKEND = config('CACHE_BACKEND', default='locmem' if DEBUG else 'sqlite')
+CACHE_DIR = config('CACHE_DIR', default=str(BASE_DIR / '.cache'))
+CACHE_MAX_ENTRIES = config('CACHE_MAX_ENTRIES', default=10000, cast=int)
+CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'buspass{tenant}'),
+    'file': ('django.core.cache.backends.filebased.FileBasedCache', str(Path(CACHE_DIR) / 'files{tenant}')),
+    'sqlite': ('buspass.cache_backends.SQLiteCache', str(Path(CACHE_DIR) / 'cache{tenant}.sqlite3')),
+    'redis': ('django.core.cache.backends.redis.RedisCache', config('REDIS_URL', default='redis://127.0.0.1:6379/1')),
+}
+if CACHE_BACKEND not in CACHE_BACKENDS:
+    raise ImproperlyConfigured(f"CACHE_BACKEND must be one of {', '.join(CACHE_BACKENDS)}")
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND][0],
+        'LOCATION': CACHE_BACKENDS[CACHE_BACKEND][1].format(tenant=''),
+        'OPTIONS': {'MAX_ENTRIES': CACHE_MAX_ENTRIES},
+    },
+}
+if CACHE_BACKEND == 'redis':
+    # Redis evicts by itself and rejects unknown options
+    del CACHES['default']['OPTIONS']
+
+# Every tenant gets its own instance of the cache, LOCATION formatted with the
+# tenant slug, so one campus's semester-start surge can't cull another's entries
+# (Redis has one keyspace; there only the key prefix differs)
+TENANT_CACHE = {
+    'BACKEND': CACHE_BACKENDS[CACHE_BACKEND][0],
+    'LOCATION': CACHE_BACKENDS[CACHE_BACKEND][1].replace('{tenant}', '-{tenant}'),
+    'OPTIONS': {'MAX_ENTRIES': config('TENANT_CACHE_MAX_ENTRIES', default=1000, cast=int)},
+}
+if CACHE_BACKEND == 'redis':
+    del TENANT_CACHE['OPTIONS']
+
+# `expire_passes --media archive` moves the QR codes and receipts of expired
+# passes into zip files here, outside the served MEDIA_ROOT
+PASS_ARCHIVE_ROOT = config('PASS_ARCHIVE_ROOT', default=str(BASE_DIR / 'archive'))
+
+
+# Status change notifications (buspass.notifications): comma separated channels
+# out of email, sms and file. Each channel sends at most NOTIFICATION_RATE_LIMIT
+# messages per second from a dispatcher.
+NOTIFICATION_CHANNELS = config('NOTIFICATION_CHANNELS', default='email', cast=lambda v: [s.strip() for s in v.split(',')])
+NOTIFICATION_RATE_LIMIT = config('NOTIFICATION_RATE_LIMIT', default=5, cast=float)
+NOTIFICATION_SMS_URL = config('NOTIFICATION_SMS_URL', default='')
+NOTIFICATION_FILE_PATH = config('NOTIFICATION_FILE_PATH', default=str(BASE_DIR / 'notifications.log'))
+DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='buspass@localhost')
+
+# Read-only JSON API under /api/ (buspass.api)
+REST_FRAMEWORK = {
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'rest_framework.authentication.SessionAuthentication',
+    ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'rest_framework.renderers.JSONRenderer',
+    ],
+}
+
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
@@ -17,13 +17,11 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
-from django.conf.urls.static import static
+from buspass.views import serve_media
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('buspass.urls')),
+    # Media files are checked per student and then streamed or handed to the web server
+    path(settings.MEDIA_URL.strip('/') + '/<path:path>', serve_media, name='serve_media'),
 ]
-
-# Serve media files during development
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -0,0 +1,17 @@
+"""Gunicorn settings for the bus pass service.
+
+Set BUSPASS_WARMUP=True to load the app in the master process and warm it up
+once before workers are forked (templates, each campus's route catalog, PDF/QR libraries).
+"""
+
+from decouple import config as env_config
+
+preload_app = env_config('BUSPASS_WARMUP', default=False, cast=bool)
+
+
+def when_ready(server):
+    if not preload_app:
+        return
+    from buspass.warmup import warm_up
+    timings = warm_up()
+    server.log.info('Warm-up finished: %s', ', '.join(f'{step} {ms:.0f}ms' for step, ms in timings.items()))